@@ -0,0 +1,135 @@
+"""Micro-benchmark harness with stored baselines and a noise-aware regression gate.
+
+Run with ``python -m pytest benchmarks``. Each repeat times the benchmark right
+after a fixed pure-Python calibration loop and records the ratio of the two, so
+baselines compare across machines of different speed and frequency drift during
+the run cancels out. The result is the median ratio over the repeats.
+
+A benchmark fails only when its median exceeds the baseline by more than the
+tolerance stored in ``baselines.json`` (overridable with ``--benchmark-tolerance``)
+plus the spread measured in that run, and keeps doing so on re-measurement.
+Record new baselines with ``--benchmark-update``.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import statistics
+import timeit
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+DEFAULT_TOLERANCE = 0.5
+_REPEATS = 21
+# A median over the limit is measured again this many times before it counts.
+_CONFIRMATIONS = 2
+# How many standard errors of the measured median widen the limit.
+_NOISE_SIGMAS = 3.0
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--benchmark-update",
+        action="store_true",
+        default=False,
+        help="Overwrite benchmarks/baselines.json with the measured results.",
+    )
+    group.addoption(
+        "--benchmark-tolerance",
+        type=float,
+        default=None,
+        help="Allowed slowdown over baseline as a fraction (0.5 = 50%% slower).",
+    )
+
+
+def _calibration_loop() -> int:
+    total = 0
+    for index in range(10_000):
+        total += index % 7
+    return total
+
+
+_CALIBRATION = timeit.Timer(_calibration_loop)
+
+
+def _relative_timings(func: Callable[[], object], number: int | None = None) -> list[float]:
+    """Per-call cost of ``func`` in calibration units, one ratio per repeat."""
+    timer = timeit.Timer(func)
+    if number is None:
+        # autorange() targets 0.2 s; many ~50 ms samples give a steadier median.
+        number = max(1, timer.autorange()[0] // 4)
+    ratios = []
+    for _ in range(_REPEATS):
+        calibration = _CALIBRATION.timeit(number=5) / 5
+        ratios.append(timer.timeit(number=number) / number / calibration)
+    return ratios
+
+
+class Measurement:
+    def __init__(self, ratios: list[float]) -> None:
+        self.median = statistics.median(ratios)
+        quartiles = statistics.quantiles(ratios, n=4)
+        # Standard error of the median (sigma estimated from the IQR), relative to it;
+        # a noisy run widens its own limit.
+        sigma = (quartiles[2] - quartiles[0]) / 1.349
+        self.noise = 1.2533 * sigma / math.sqrt(len(ratios)) / self.median
+
+
+class BenchmarkRecorder:
+    def __init__(self, config: pytest.Config) -> None:
+        self.update = config.getoption("--benchmark-update")
+        data = json.loads(BASELINES_PATH.read_text("utf-8")) if BASELINES_PATH.exists() else {}
+        self.tolerance: float = config.getoption("--benchmark-tolerance") or data.get(
+            "tolerance", DEFAULT_TOLERANCE
+        )
+        self.baselines: dict[str, float] = data.get("benchmarks", {})
+        self.results: dict[str, float] = {}
+
+    def limit(self, baseline: float, measurement: Measurement) -> float:
+        return baseline * (1 + self.tolerance + _NOISE_SIGMAS * measurement.noise)
+
+    def __call__(self, name: str, func: Callable[[], object], number: int | None = None) -> float:
+        measurement = Measurement(_relative_timings(func, number))
+        self.results[name] = measurement.median
+        baseline = self.baselines.get(name)
+        if self.update or baseline is None:
+            return measurement.median
+
+        for _ in range(_CONFIRMATIONS):
+            if measurement.median <= self.limit(baseline, measurement):
+                return measurement.median
+            retry = Measurement(_relative_timings(func, number))
+            if retry.median < measurement.median:
+                measurement = retry
+                self.results[name] = retry.median
+
+        limit = self.limit(baseline, measurement)
+        if measurement.median > limit:
+            pytest.fail(
+                f"{name}: {measurement.median:.5f} calibration units per call, "
+                f"baseline {baseline:.5f} (+{measurement.median / baseline - 1:.0%}, "
+                f"limit +{limit / baseline - 1:.0%}: tolerance {self.tolerance:.0%} "
+                f"plus {_NOISE_SIGMAS:g} x {measurement.noise:.1%} noise)"
+            )
+        return measurement.median
+
+    def save(self) -> None:
+        merged = {**self.baselines, **self.results}
+        payload = {
+            "tolerance": self.tolerance,
+            "benchmarks": {name: round(value, 6) for name, value in sorted(merged.items())},
+        }
+        BASELINES_PATH.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+
+
+@pytest.fixture(scope="session")
+def bench(request: pytest.FixtureRequest) -> Iterator[BenchmarkRecorder]:
+    recorder = BenchmarkRecorder(request.config)
+    yield recorder
+    if recorder.update:
+        recorder.save()
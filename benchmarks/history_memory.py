@@ -0,0 +1,100 @@
+"""Compare per-session memory of pydantic history vs the compact ring buffer.
+
+Usage:
+    python benchmarks/history_memory.py --sessions 100000 --turns 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+from pydantic import BaseModel, ConfigDict, Field
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.botinho.history import ConversationData  # noqa: E402
+from src.botinho.models import ConversationMessage  # noqa: E402
+
+# Categories are rebuilt per turn (``"".join``) like strings decoded from requests.
+CATEGORIES = ("procedimentos_ti", "problemas_tecnicos", "politicas_empresa", "conversa_geral")
+
+
+class LegacyConversationData(BaseModel):
+    """Shape of the session model before the ring buffer (pydantic + list slicing)."""
+
+    criado_em: datetime
+    ultima_categoria: str | None = None
+    historico: list[ConversationMessage] = Field(default_factory=list)
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+def build_legacy(sessions: int, turns: int) -> dict[str, LegacyConversationData]:
+    store: dict[str, LegacyConversationData] = {}
+    for index in range(sessions):
+        conversation = LegacyConversationData(criado_em=datetime.now(timezone.utc))
+        for turn in range(turns):
+            conversation.historico.append(
+                ConversationMessage(
+                    usuario=f"pergunta {index}-{turn}",
+                    bot=f"resposta {index}-{turn}",
+                    categoria="".join(CATEGORIES[turn % len(CATEGORIES)]),
+                    timestamp=datetime.now(timezone.utc),
+                )
+            )
+            conversation.historico = conversation.historico[-20:]
+            conversation.ultima_categoria = conversation.historico[-1].categoria
+        store[f"session_{index}"] = conversation
+    return store
+
+
+def build_compact(sessions: int, turns: int) -> dict[str, ConversationData]:
+    store: dict[str, ConversationData] = {}
+    for index in range(sessions):
+        conversation = ConversationData()
+        for turn in range(turns):
+            conversation.add_turn(
+                f"pergunta {index}-{turn}",
+                f"resposta {index}-{turn}",
+                "".join(CATEGORIES[turn % len(CATEGORIES)]),
+            )
+        store[f"session_{index}"] = conversation
+    return store
+
+
+def measure(builder: Callable[[int, int], dict], sessions: int, turns: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    store = builder(sessions, turns)
+    gc.collect()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    legacy = measure(build_legacy, args.sessions, args.turns)
+    compact = measure(build_compact, args.sessions, args.turns)
+    saved = legacy - compact
+
+    print(f"sessions={args.sessions} turns_per_session={args.turns}")
+    for label, total in (("pydantic history", legacy), ("ring buffer", compact), ("saved", saved)):
+        per_session = total / args.sessions
+        print(f"{label:<17}: {total / 1024 / 1024:9.1f} MiB ({per_session:7.0f} B/session)")
+    print(f"reduction        : {saved / legacy:.0%}")
+
+
+if __name__ == "__main__":
+    main()
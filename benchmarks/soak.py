@@ -0,0 +1,273 @@
+"""Memory soak test: drive /api/chat with many distinct sessions and clients.
+
+Requests go straight through the ASGI app (all middleware included) with a
+fake model client, each from a new client IP and, every ``--turns`` requests,
+a new session id. After ``--warmup`` requests the bounded stores should be at
+their caps; from then on ``tracemalloc`` and RSS are sampled, and the run fails
+when traced memory keeps growing by more than ``--threshold`` bytes per request.
+
+Usage:
+    python benchmarks/soak.py --requests 100000 --warmup 30000 --threshold 32
+    python benchmarks/soak.py --requests 1000000 --output soak.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+MESSAGES = (
+    "oi, tudo bem?",
+    "como resetar minha senha?",
+    "meu computador está muito lento desde ontem e o outlook não abre direito",
+    "qual a política de home office para o time de vendas neste trimestre?",
+    "a impressora do terceiro andar está mostrando erro 0x45",
+)
+
+
+class _FakeResult:
+    __slots__ = ("text",)
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class _FakeChat:
+    """Holds its history like an SDK chat object does."""
+
+    def __init__(self, history: list) -> None:  # noqa: ANN001
+        self.history = history
+
+    async def send_message(self, message: str) -> _FakeResult:
+        return _FakeResult(f"Resposta simulada ({len(self.history)} turnos anteriores).")
+
+
+class FakeModelClient:
+    model_name = "soak-fake"
+    available = True
+
+    async def create_chat(self, history: list, model=None, generation_overrides=None):  # noqa: ANN001, ANN201
+        return _FakeChat(history)
+
+
+class AsgiDriver:
+    """Minimal in-process HTTP client: one ASGI call per request, no sockets."""
+
+    def __init__(self, app) -> None:  # noqa: ANN001
+        self.app = app
+
+    async def post_json(self, path: str, payload: dict[str, Any], client_ip: str) -> int:
+        body = json.dumps(payload).encode("utf-8")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode("ascii"),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"host", b"soak.local"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+            ],
+            "client": (client_ip, 50000),
+            "server": ("soak.local", 80),
+        }
+        sent = False
+        done = asyncio.Event()
+        status = 0
+
+        async def receive() -> dict[str, Any]:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                done.set()
+
+        await self.app(scope, receive, send)
+        done.set()
+        return status
+
+
+def client_ip(index: int) -> str:
+    return f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}"
+
+
+def rss_bytes() -> int | None:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak, not current, RSS (KiB on Linux); still flags monotonic growth.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def slope(points: list[tuple[int, int]]) -> float:
+    """Least-squares growth in bytes per request."""
+    if len(points) < 2:
+        return 0.0
+    count = len(points)
+    mean_x = sum(x for x, _ in points) / count
+    mean_y = sum(y for _, y in points) / count
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def top_sites(
+    before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int
+) -> list[dict[str, Any]]:
+    ignore = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    )
+    diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    sites = []
+    for stat in diff:
+        if stat.size_diff <= 0:
+            continue
+        frame = stat.traceback[0]
+        sites.append(
+            {
+                "site": f"{frame.filename}:{frame.lineno}",
+                "size_diff_bytes": stat.size_diff,
+                "count_diff": stat.count_diff,
+            }
+        )
+        if len(sites) >= limit:
+            break
+    return sites
+
+
+async def soak(args: argparse.Namespace) -> dict[str, Any]:
+    from src.botinho import main as app_module
+
+    app_module.chat_service.model_client = FakeModelClient()
+    driver = AsgiDriver(app_module.app)
+    statuses: dict[int, int] = {}
+    samples: list[dict[str, Any]] = []
+    baseline: tracemalloc.Snapshot | None = None
+    started = time.perf_counter()
+
+    for index in range(args.requests):
+        payload = {
+            "message": MESSAGES[index % len(MESSAGES)],
+            "session_id": f"soak-{index // args.turns}",
+        }
+        status = await driver.post_json("/api/chat", payload, client_ip(index))
+        statuses[status] = statuses.get(status, 0) + 1
+
+        done = index + 1
+        if done < args.warmup or (done - args.warmup) % args.sample_every:
+            continue
+        gc.collect()
+        traced, _peak = tracemalloc.get_traced_memory()
+        samples.append({"requests": done, "traced_bytes": traced, "rss_bytes": rss_bytes()})
+        if baseline is None:
+            baseline = tracemalloc.take_snapshot()
+
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    final = tracemalloc.take_snapshot()
+    traced_growth = slope([(s["requests"], s["traced_bytes"]) for s in samples])
+    rss_points = [(s["requests"], s["rss_bytes"]) for s in samples if s["rss_bytes"] is not None]
+
+    return {
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "requests_per_second": round(args.requests / elapsed, 1),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "conversations": len(app_module.chat_service.conversations),
+        "evicted_sessions": app_module.chat_service.evicted_sessions,
+        "traced_growth_bytes_per_request": round(traced_growth, 2),
+        "rss_growth_bytes_per_request": round(slope(rss_points), 2) if rss_points else None,
+        "threshold_bytes_per_request": args.threshold,
+        "samples": samples,
+        "top_allocation_sites": top_sites(baseline, final, args.top) if baseline else [],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--warmup", type=int, default=30_000)
+    parser.add_argument("--sample-every", type=int, default=5_000)
+    parser.add_argument("--turns", type=int, default=2, help="requests per session id")
+    parser.add_argument("--max-sessions", type=int, default=10_000)
+    parser.add_argument("--max-clients", type=int, default=10_000)
+    parser.add_argument("--threshold", type=float, default=32.0, help="bytes per request")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--frames", type=int, default=1, help="tracemalloc traceback depth")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    if args.warmup >= args.requests:
+        parser.error("--warmup must be smaller than --requests")
+
+    # Read by the settings when src.botinho.main is imported; explicit env wins.
+    os.environ.setdefault("BOTINHO_MAX_SESSIONS", str(args.max_sessions))
+    os.environ.setdefault("BOTINHO_RATE_LIMIT_MAX_CLIENTS", str(args.max_clients))
+    os.environ.setdefault("BOTINHO_QUOTA_SCHEDULER_ENABLED", "false")
+    os.environ.setdefault("BOTINHO_LOG_LEVEL", "WARNING")
+
+    tracemalloc.start(args.frames)
+    report = asyncio.run(soak(args))
+    tracemalloc.stop()
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(
+        f"requests={report['requests']} warmup={report['warmup']} "
+        f"rps={report['requests_per_second']} statuses={report['statuses']}"
+    )
+    print(
+        f"conversations={report['conversations']} "
+        f"evicted_sessions={report['evicted_sessions']}"
+    )
+    for sample in report["samples"]:
+        rss = sample["rss_bytes"]
+        rss_text = f"{rss / 1024 / 1024:8.1f} MiB" if rss is not None else "     n/a"
+        print(
+            f"  {sample['requests']:>9} req  traced {sample['traced_bytes'] / 1024 / 1024:8.1f} MiB"
+            f"  rss {rss_text}"
+        )
+    print("top allocation sites since warm-up:")
+    for site in report["top_allocation_sites"]:
+        size_kib = site["size_diff_bytes"] / 1024
+        print(f"  {size_kib:10.1f} KiB  {site['count_diff']:>8}  {site['site']}")
+
+    growth = report["traced_growth_bytes_per_request"]
+    verdict = "FAIL" if growth > args.threshold else "ok"
+    print(f"steady-state growth: {growth:.1f} B/request (threshold {args.threshold:.0f}) {verdict}")
+    return 1 if growth > args.threshold else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Micro-benchmarks for the pure-Python ChatService hot paths."""
+
+import pytest
+
+from src.botinho.knowledge_base import CATEGORY_KEYWORDS, KNOWLEDGE_BASE, SYNONYMS
+from src.botinho.services.chat_service import ChatService, genai_types
+from src.botinho.services.knowledge_matcher import KnowledgeMatcher
+
+pytestmark = pytest.mark.benchmark
+
+MESSAGES = (
+    "Olá, bom dia! Tudo bem?",
+    "Preciso resetar minha senha do portal corporativo urgentemente",
+    "Meu   computador está muito lento desde ontem e o outlook não abre",
+    "Qual é a política de home office para o time de vendas neste trimestre?",
+    "A impressora do terceiro andar está sem tinta e mostrando erro 0x45",
+    "Como faço para pedir acesso ao sistema financeiro? Meu gestor já aprovou.",
+    "Não consigo conectar na vpn quando estou no hotel, a internet cai sempre",
+    "Gostaria de entender melhor como funciona o backup dos meus arquivos pessoais",
+)
+
+
+class _NoopModelClient:
+    model_name = "benchmark"
+    available = False
+
+
+def _large_knowledge_base(topics_per_category: int = 150) -> dict[str, dict[str, str]]:
+    """Original knowledge base padded with synthetic topics to a realistic size."""
+    expanded = {category: dict(topics) for category, topics in KNOWLEDGE_BASE.items()}
+    for category, topics in expanded.items():
+        for index in range(topics_per_category):
+            topics[f"topico{index}_{category[:4]}{index}"] = f"Procedimento sintético {index}."
+    return expanded
+
+
+@pytest.fixture(scope="module")
+def service() -> ChatService:
+    return ChatService(model_client=_NoopModelClient())
+
+
+@pytest.fixture(scope="module")
+def large_service() -> ChatService:
+    matcher = KnowledgeMatcher(_large_knowledge_base(), CATEGORY_KEYWORDS, SYNONYMS)
+    return ChatService(model_client=_NoopModelClient(), knowledge_matcher=matcher)
+
+
+def test_normalize(bench):
+    bench("normalize", lambda: [ChatService._normalize(message) for message in MESSAGES])
+
+
+def test_detect_category(bench, service):
+    bench("detect_category", lambda: [service.detect_category(message) for message in MESSAGES])
+
+
+def test_search_knowledge(bench, service):
+    bench("search_knowledge", lambda: [service.search_knowledge(message) for message in MESSAGES])
+
+
+def test_search_knowledge_large_base(bench, large_service):
+    bench(
+        "search_knowledge_large_base",
+        lambda: [large_service.search_knowledge(message) for message in MESSAGES],
+    )
+
+
+@pytest.mark.skipif(genai_types is None, reason="google-genai not installed")
+def test_build_gemini_history_full(bench, service):
+    _session_id, conversation = service.get_or_create_conversation("bench-history")
+    for index in range(service.history_capacity):
+        conversation.add_turn(MESSAGES[index % len(MESSAGES)], "Resposta " * 40, "conversa_geral")
+
+    bench("build_gemini_history_full", lambda: service._build_gemini_history(conversation))
+
+
+def test_get_or_create_conversation_existing(bench):
+    service = ChatService(model_client=_NoopModelClient())
+    for index in range(100_000):
+        service.get_or_create_conversation(f"session_{index}")
+    session_ids = [f"session_{index}" for index in range(0, 100_000, 997)]
+
+    bench(
+        "get_or_create_conversation_existing",
+        lambda: [service.get_or_create_conversation(session_id) for session_id in session_ids],
+    )
+
+
+def test_get_or_create_conversation_new(bench):
+    service = ChatService(model_client=_NoopModelClient())
+
+    bench("get_or_create_conversation_new", lambda: service.get_or_create_conversation(None))
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import os
 import sys
 from pathlib import Path
 
@@ -13,19 +14,24 @@ SRC_DIR = ROOT_DIR / "src"
 if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
+from botinho.server import WORKERS_ENV, uvicorn_options  # noqa: E402
 from botinho.settings import get_settings  # noqa: E402
 
 settings = get_settings()
 
 
 if __name__ == "__main__":
+    options = uvicorn_options(settings)
     browser_host = settings.host
     print(f"Servidor iniciando em bind {settings.host}:{settings.port}")
     print(f"Abra no navegador: http://{browser_host}:{settings.port}")
 
-    uvicorn.run(
-        "botinho.main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=settings.environment == "development",
-    )
\ No newline at end of file
+    if "workers" in options:
+        # Workers are spawned after this point and inherit the resolved count.
+        os.environ[WORKERS_ENV] = str(options["workers"])
+        print(
+            f"Modo produção: {options['workers']} workers, loop={options['loop']}, "
+            f"http={options['http']}"
+        )
+
+    uvicorn.run("botinho.main:app", **options)
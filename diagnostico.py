@@ -2,14 +2,24 @@
 """
 🔍 Script de Diagnóstico - Botinho
 Verifica se o ambiente está configurado corretamente
+
+Uso:
+    python diagnostico.py                          # verificação do ambiente
+    python diagnostico.py --perf                   # autoteste de desempenho (JSON)
+    python diagnostico.py --perf --output perf.json
 """
 
+import argparse
+import asyncio
 import importlib
+import json
 import os
+import platform
 import socket
 import subprocess
 import sys
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 
 
 def print_header():
@@ -56,7 +66,7 @@ def verificar_dependencias():
     dependencias = {
         "fastapi": "Framework web",
         "uvicorn": "Servidor ASGI",
-        "google.generativeai": "API Google Gemini"
+        "google.genai": "API Google Gemini"
     }
     
     status = True
@@ -152,6 +162,184 @@ def verificar_conectividade():
         print(f"   ⚠️  Erro de conectividade: {e}")
         return False
 
+# -- Autoteste de desempenho (--perf) ------------------------------------------
+
+AMOSTRAS_MENSAGENS = [
+    "Como faço para resetar minha senha?",
+    "O wifi está caindo toda hora",
+    "Qual a política de férias?",
+    "Meu computador está muito lento hoje",
+    "Oi, tudo bem?",
+]
+
+
+def _resumo_ms(amostras):
+    """Resumo estatístico (ms) de uma lista de durações em segundos."""
+    ordenadas = sorted(amostras)
+    if not ordenadas:
+        return {}
+
+    def percentil(p):
+        return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))] * 1000
+
+    return {
+        "amostras": len(ordenadas),
+        "min_ms": round(ordenadas[0] * 1000, 3),
+        "p50_ms": round(percentil(0.50), 3),
+        "p95_ms": round(percentil(0.95), 3),
+        "p99_ms": round(percentil(0.99), 3),
+        "max_ms": round(ordenadas[-1] * 1000, 3),
+    }
+
+
+def medir_importacao(repeticoes=3):
+    """Tempo de importação a frio de src.botinho.main em um interpretador novo."""
+    codigo = (
+        "import time; t = time.perf_counter(); import src.botinho.main; "
+        "print(time.perf_counter() - t)"
+    )
+    amostras = []
+    for _ in range(repeticoes):
+        result = subprocess.run(
+            [sys.executable, "-c", codigo],
+            capture_output=True,
+            text=True,
+            timeout=120,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        if result.returncode != 0:
+            return {"erro": result.stderr.strip().splitlines()[-1:]}
+        amostras.append(float(result.stdout.strip().splitlines()[-1]))
+    return _resumo_ms(amostras)
+
+
+async def medir_jitter_loop(amostras=200, intervalo=0.005):
+    """Atraso do event loop em relação ao timer agendado (jitter)."""
+    atrasos = []
+    for _ in range(amostras):
+        esperado = time.perf_counter() + intervalo
+        await asyncio.sleep(intervalo)
+        atrasos.append(max(0.0, time.perf_counter() - esperado))
+    return {"intervalo_ms": intervalo * 1000, **_resumo_ms(atrasos)}
+
+
+def medir_matcher(repeticoes=2000):
+    """Tempo de construção do KnowledgeMatcher e de busca por mensagem."""
+    from src.botinho.services.knowledge_matcher import KnowledgeMatcher
+
+    construcoes = []
+    for _ in range(20):
+        inicio = time.perf_counter()
+        matcher = KnowledgeMatcher()
+        construcoes.append(time.perf_counter() - inicio)
+
+    normalizadas = [" ".join(msg.lower().split()) for msg in AMOSTRAS_MENSAGENS]
+    buscas = []
+    for indice in range(repeticoes):
+        mensagem = normalizadas[indice % len(normalizadas)]
+        inicio = time.perf_counter()
+        matcher.detect_category(mensagem)
+        matcher.match(mensagem)
+        buscas.append(time.perf_counter() - inicio)
+    return {"construcao": _resumo_ms(construcoes), "busca": _resumo_ms(buscas)}
+
+
+class _SessaoFalsa:
+    async def send_message(self, message):
+        class _Resultado:
+            text = "Resposta de diagnóstico"
+
+        return _Resultado()
+
+
+class _ClienteModeloFalso:
+    model_name = "diagnostico-fake"
+    available = True
+
+    async def create_chat(self, history):
+        return _SessaoFalsa()
+
+
+async def medir_chat_service(repeticoes=500):
+    """Latência de ida e volta do ChatService com um cliente de modelo falso."""
+    from src.botinho.services.chat_service import ChatService
+
+    service = ChatService(model_client=_ClienteModeloFalso())
+    latencias = []
+    for indice in range(repeticoes):
+        mensagem = AMOSTRAS_MENSAGENS[indice % len(AMOSTRAS_MENSAGENS)]
+        inicio = time.perf_counter()
+        await service.converse(mensagem, session_id=f"diag_{indice % 50}")
+        latencias.append(time.perf_counter() - inicio)
+    return _resumo_ms(latencias)
+
+
+async def medir_gemini_ttft(api_key, modelo_principal):
+    """Tempo até o primeiro token (e total) do Gemini real para cada modelo de fallback."""
+    from src.botinho.services.chat_service import GeminiClient
+
+    resultados = {}
+    for modelo in GeminiClient._build_model_candidates(modelo_principal):
+        client = GeminiClient(api_key=api_key, model_name=modelo)
+        try:
+            await client.start()
+            chat = await client.create_chat(history=[])
+            inicio = time.perf_counter()
+            primeiro = None
+            stream = await chat.send_message_stream(message="Responda apenas: ok")
+            async for chunk in stream:
+                if primeiro is None and getattr(chunk, "text", None):
+                    primeiro = time.perf_counter() - inicio
+            total = time.perf_counter() - inicio
+            resultados[modelo] = {
+                "ttft_ms": round((primeiro or total) * 1000, 1),
+                "total_ms": round(total * 1000, 1),
+            }
+        except Exception as e:
+            resultados[modelo] = {"erro": str(e)[:300]}
+        finally:
+            await client.close()
+    return resultados
+
+
+async def _coletar_perf():
+    from src.botinho.settings import get_settings
+
+    settings = get_settings()
+    relatorio = {
+        "gerado_em": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "implementacao": platform.python_implementation(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "importacao_app": medir_importacao(),
+        "jitter_event_loop": await medir_jitter_loop(),
+        "knowledge_matcher": medir_matcher(),
+        "chat_service_fake": await medir_chat_service(),
+    }
+    if settings.gemini_api_key:
+        relatorio["gemini_ttft"] = await medir_gemini_ttft(
+            settings.gemini_api_key, settings.gemini_model
+        )
+    else:
+        relatorio["gemini_ttft"] = {"ignorado": "GEMINI_API_KEY não configurada"}
+    return relatorio
+
+
+def executar_perf(saida=None):
+    """Executa o autoteste de desempenho e emite um relatório JSON."""
+    print("⏱️  Executando autoteste de desempenho...", file=sys.stderr)
+    relatorio = asyncio.run(_coletar_perf())
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if saida:
+        with open(saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+        print(f"✅ Relatório salvo em {saida}", file=sys.stderr)
+    else:
+        print(texto)
+    return relatorio
+
+
 def main():
     """Função principal"""
     print_header()
@@ -182,8 +370,17 @@ def main():
     print("\n📞 Suporte: https://github.com/ESousa97/imersao-dev-agentes-ai-google")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diagnóstico do Botinho")
+    parser.add_argument(
+        "--perf", action="store_true", help="executa o autoteste de desempenho (relatório JSON)"
+    )
+    parser.add_argument("--output", help="arquivo para salvar o relatório JSON do --perf")
+    args = parser.parse_args()
     try:
-        main()
+        if args.perf:
+            executar_perf(args.output)
+        else:
+            main()
     except KeyboardInterrupt:
         print("\n\n⏹️  Diagnóstico interrompido pelo usuário")
     except Exception as e:
@@ -0,0 +1,226 @@
+"""Static asset pipeline: content-hashed URLs, precompression and conditional GETs."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import IdentityResponder
+from starlette.types import Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+_TEXT_SUFFIXES = {".html", ".css", ".js", ".json", ".svg", ".txt", ".map"}
+_REWRITE_SUFFIXES = {".html", ".css", ".js"}
+_STATIC_REFERENCE = re.compile(r"""(?P<prefix>["'(])/static/(?P<path>[^"'()?#\s]+)""")
+
+
+@dataclass(frozen=True, slots=True)
+class StaticAsset:
+    path: str
+    hashed_path: str
+    media_type: str
+    digest: str
+    identity: bytes
+    gzip: bytes | None = None
+    br: bytes | None = None
+
+    def encoded(self, accept_encoding: str) -> tuple[bytes, str | None]:
+        """Pick the smallest representation the client accepts."""
+        qualities = _encoding_qualities(accept_encoding)
+        if self.br is not None and _accepts(qualities, "br"):
+            return self.br, "br"
+        if self.gzip is not None and _accepts(qualities, "gzip"):
+            return self.gzip, "gzip"
+        return self.identity, None
+
+
+class NegotiatedGZipMiddleware(GZipMiddleware):
+    """``GZipMiddleware`` that honours ``q=0`` in ``Accept-Encoding``.
+
+    Starlette compresses whenever "gzip" appears anywhere in the header, so
+    ``gzip;q=0`` (an explicit refusal) would still get a gzip body.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and not accepts_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), "gzip"
+        ):
+            await IdentityResponder(self.app, self.minimum_size)(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+class StaticAssetManifest:
+    """In-memory catalogue of the web UI assets built once at startup.
+
+    Every file under ``directory`` is fingerprinted with a short SHA-256 digest,
+    exposed under a content-hashed URL (``css/app.<digest>.css``) and, for text
+    assets above ``min_compress_size`` bytes, precompressed to gzip and brotli
+    (when the optional ``brotli`` package is installed). References to
+    ``/static/...`` inside HTML, CSS and JS files are rewritten to the hashed URLs
+    so browsers can cache them forever and only revalidate ``index.html``.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        precompress: bool = True,
+        min_compress_size: int = 512,
+    ) -> None:
+        self.directory = directory
+        self.precompress = precompress
+        self.min_compress_size = min_compress_size
+        self._assets: dict[str, StaticAsset] = {}
+        self._hashed: dict[str, StaticAsset] = {}
+        self.build()
+
+    def build(self) -> None:
+        files = sorted(path for path in self.directory.rglob("*") if path.is_file())
+        # Leaf assets first, HTML last, so references resolve to already hashed URLs.
+        files.sort(key=lambda path: (path.suffix == ".html", path.suffix in _REWRITE_SUFFIXES))
+
+        self._assets.clear()
+        self._hashed.clear()
+        for file_path in files:
+            logical = file_path.relative_to(self.directory).as_posix()
+            content = file_path.read_bytes()
+            if file_path.suffix in _REWRITE_SUFFIXES:
+                content = self._rewrite_references(content)
+            asset = self._make_asset(logical, content)
+            self._assets[logical] = asset
+            self._hashed[asset.hashed_path] = asset
+
+    def url_for(self, path: str) -> str:
+        asset = self._assets.get(path)
+        return f"/static/{asset.hashed_path}" if asset else f"/static/{path}"
+
+    def get(self, path: str) -> StaticAsset | None:
+        return self._assets.get(path)
+
+    def response(self, path: str, request: Request) -> Response:
+        """Serve ``path`` (hashed or logical) honouring ETag and Accept-Encoding."""
+        asset = self._hashed.get(path)
+        immutable = asset is not None
+        if asset is None:
+            asset = self._assets.get(path)
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+        return self.asset_response(asset, request, immutable=immutable)
+
+    @staticmethod
+    def asset_response(asset: StaticAsset, request: Request, immutable: bool = False) -> Response:
+        body, encoding = asset.encoded(request.headers.get("accept-encoding", ""))
+        # Identity bodies may still be gzipped on the fly by NegotiatedGZipMiddleware,
+        # so their tag is weak; precompressed ones are byte-exact per encoding.
+        etag = f'"{asset.digest}-{encoding}"' if encoding else f'W/"{asset.digest}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+
+        if _etag_matches(request.headers.get("if-none-match", ""), asset.digest):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=asset.media_type, headers=headers)
+
+    def _rewrite_references(self, content: bytes) -> bytes:
+        text = content.decode("utf-8")
+
+        def _replace(match: re.Match[str]) -> str:
+            asset = self._assets.get(match.group("path"))
+            if asset is None:
+                return match.group(0)
+            return f"{match.group('prefix')}/static/{asset.hashed_path}"
+
+        return _STATIC_REFERENCE.sub(_replace, text).encode("utf-8")
+
+    def _make_asset(self, logical: str, content: bytes) -> StaticAsset:
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        path = Path(logical)
+        hashed_path = path.with_name(f"{path.stem}.{digest}{path.suffix}").as_posix()
+        media_type = mimetypes.guess_type(logical)[0] or "application/octet-stream"
+        if path.suffix in _TEXT_SUFFIXES and "charset" not in media_type:
+            media_type = f"{media_type}; charset=utf-8"
+
+        gzip_body: bytes | None = None
+        br_body: bytes | None = None
+        if (
+            self.precompress
+            and path.suffix in _TEXT_SUFFIXES
+            and len(content) >= self.min_compress_size
+        ):
+            gzip_body = _smaller_or_none(gzip.compress(content, compresslevel=9, mtime=0), content)
+            if brotli is not None:
+                br_body = _smaller_or_none(brotli.compress(content, quality=11), content)
+
+        return StaticAsset(
+            path=logical,
+            hashed_path=hashed_path,
+            media_type=media_type,
+            digest=digest,
+            identity=content,
+            gzip=gzip_body,
+            br=br_body,
+        )
+
+
+def accepts_encoding(accept_encoding: str, coding: str) -> bool:
+    """Whether an ``Accept-Encoding`` header allows ``coding`` (``q=0`` refuses it)."""
+    return _accepts(_encoding_qualities(accept_encoding), coding)
+
+
+def _encoding_qualities(accept_encoding: str) -> dict[str, float]:
+    qualities: dict[str, float] = {}
+    for token in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in token.split(";"))
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value.strip())
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities
+
+
+def _accepts(qualities: dict[str, float], coding: str) -> bool:
+    return qualities.get(coding, qualities.get("*", 0.0)) > 0
+
+
+def _smaller_or_none(compressed: bytes, original: bytes) -> bytes | None:
+    return compressed if len(compressed) < len(original) else None
+
+
+def _etag_matches(if_none_match: str, digest: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        tag = candidate.strip().removeprefix("W/").strip('"')
+        if tag.split("-", 1)[0] == digest:
+            return True
+    return False
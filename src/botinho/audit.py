@@ -0,0 +1,132 @@
+"""Append-only JSONL audit log fed by an in-memory queue and flushed in batches."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from time import monotonic
+from typing import Any
+
+
+class AuditLog:
+    """Write-behind audit sink for conversation exchanges.
+
+    ``record`` never blocks the event loop: entries go to a bounded queue and a
+    background task writes them in batches (by ``batch_size`` or every
+    ``flush_interval`` seconds) on a worker thread. When the queue is full the
+    entry is dropped and counted, as is every entry of a batch that fails to
+    serialize, rotate or write; the writer logs the error and keeps running. The
+    active file is rotated and gzip-compressed when it exceeds ``max_bytes`` or
+    when the UTC date changes.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        queue_size: int = 10_000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.logger = logger or logging.getLogger("botinho.audit")
+        self.dropped = 0
+        self.written = 0
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=queue_size)
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._file_date: str | None = None
+
+    def record(self, entry: dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def stats(self) -> dict[str, int]:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run(), name="botinho-audit-writer")
+
+    async def stop(self) -> None:
+        """Drain every queued entry to disk and stop the writer task."""
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            if batch:
+                try:
+                    await asyncio.to_thread(self._write_batch, batch)
+                except Exception:  # noqa: BLE001
+                    self.dropped += len(batch)
+                    self.logger.exception("Falha ao gravar lote de auditoria (%d)", len(batch))
+            if self._stopping.is_set() and self._queue.empty():
+                return
+
+    async def _collect_batch(self) -> list[dict[str, Any]]:
+        batch: list[dict[str, Any]] = []
+        deadline = monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self._stopping.is_set():
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                break
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    # -- File handling (runs on a worker thread) -----------------------------------
+
+    def _write_batch(self, batch: list[dict[str, Any]]) -> None:
+        payload = "".join(
+            json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in batch
+        ).encode("utf-8")
+        self._rotate_if_needed(len(payload))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as handle:
+            handle.write(payload)
+        self.written += len(batch)
+
+    def _rotate_if_needed(self, incoming: int) -> None:
+        today = datetime.now(timezone.utc).strftime("%Y%m%d")
+        if not self.path.exists():
+            self._file_date = today
+            return
+        if self._file_date is None:
+            mtime = datetime.fromtimestamp(self.path.stat().st_mtime, tz=timezone.utc)
+            self._file_date = mtime.strftime("%Y%m%d")
+
+        size = self.path.stat().st_size
+        if self._file_date == today and (size == 0 or size + incoming <= self.max_bytes):
+            return
+
+        stamp = datetime.now(timezone.utc).strftime("%H%M%S%f")
+        rotated_name = f"{self.path.stem}-{self._file_date}-{stamp}{self.path.suffix}"
+        rotated = self.path.with_name(rotated_name)
+        self.path.rename(rotated)
+        with rotated.open("rb") as source, gzip.open(f"{rotated}.gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        rotated.unlink()
+        self._file_date = today
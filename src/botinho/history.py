@@ -0,0 +1,146 @@
+"""Compact in-memory conversation state.
+
+Sessions live for the lifetime of the worker, so their per-object overhead adds
+up. History is kept as ``__slots__`` records in a fixed-capacity ring buffer
+with epoch-float timestamps and interned category names. It is converted to
+the pydantic API models (``ConversationMessage``) only at the API boundary.
+"""
+
+from __future__ import annotations
+
+import sys
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from time import time
+from typing import overload
+
+from .models import ConversationMessage
+from .usage import TurnUsage, UsageTotals
+
+
+class HistoryRecord:
+    __slots__ = ("usuario", "bot", "categoria", "timestamp", "usage")
+
+    def __init__(
+        self,
+        usuario: str,
+        bot: str,
+        categoria: str | None,
+        timestamp: float | None = None,
+        usage: TurnUsage | None = None,
+    ) -> None:
+        self.usuario = usuario
+        self.bot = bot
+        self.categoria = sys.intern(categoria) if categoria else None
+        self.timestamp = time() if timestamp is None else timestamp
+        self.usage = usage
+
+    def to_message(self) -> ConversationMessage:
+        return ConversationMessage(
+            usuario=self.usuario,
+            bot=self.bot,
+            categoria=self.categoria,
+            timestamp=datetime.fromtimestamp(self.timestamp, tz=timezone.utc),
+            usage=self.usage.to_dict() if self.usage is not None else None,
+        )
+
+
+class HistoryRing:
+    """Ring of at most ``capacity`` records; appending past capacity drops the oldest.
+
+    The backing list grows with the first turns and is then overwritten in place,
+    so short sessions do not pay for unused slots and long ones never copy.
+    """
+
+    __slots__ = ("_items", "_start", "_capacity")
+
+    def __init__(self, capacity: int = 20) -> None:
+        self._items: list[HistoryRecord] = []
+        self._start = 0
+        self._capacity = max(1, capacity)
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def append(self, record: HistoryRecord) -> None:
+        if len(self._items) < self._capacity:
+            self._items.append(record)
+        else:
+            self._items[self._start] = record
+            self._start = (self._start + 1) % self._capacity
+
+    def last(self, count: int) -> list[HistoryRecord]:
+        """Return the newest ``count`` records, oldest first."""
+        size = len(self._items)
+        count = max(0, min(count, size))
+        first = self._start + size - count
+        return [self._items[(first + offset) % size] for offset in range(count)]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    def __iter__(self) -> Iterator[HistoryRecord]:
+        return iter(self.last(len(self._items)))
+
+    @overload
+    def __getitem__(self, index: int) -> HistoryRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[HistoryRecord]: ...
+
+    def __getitem__(self, index: int | slice) -> HistoryRecord | list[HistoryRecord]:
+        size = len(self._items)
+        if isinstance(index, slice):
+            return self.last(size)[index]
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("history index out of range")
+        return self._items[(self._start + index) % size]
+
+
+class ConversationData:
+    __slots__ = (
+        "criado_em",
+        "atualizado_em",
+        "ultima_categoria",
+        "historico",
+        "usage",
+        "recently_used",
+    )
+
+    def __init__(self, criado_em: float | None = None, history_capacity: int = 20) -> None:
+        self.criado_em = time() if criado_em is None else criado_em
+        self.atualizado_em = self.criado_em
+        self.ultima_categoria: str | None = None
+        self.historico = HistoryRing(history_capacity)
+        # Cumulative over the whole session (not just the ring); created on first model call.
+        self.usage: UsageTotals | None = None
+        # Set on every lookup and cleared by the session store's eviction scans.
+        self.recently_used = False
+
+    def add_turn(
+        self, usuario: str, bot: str, categoria: str | None, usage: TurnUsage | None = None
+    ) -> HistoryRecord:
+        record = HistoryRecord(usuario, bot, categoria, usage=usage)
+        self.historico.append(record)
+        self.ultima_categoria = record.categoria
+        self.atualizado_em = record.timestamp
+        if usage is not None:
+            if self.usage is None:
+                self.usage = UsageTotals()
+            self.usage.add(usage)
+        return record
+
+    def tokens_used(self) -> int:
+        return self.usage.total_tokens if self.usage is not None else 0
+
+    def created_at(self) -> datetime:
+        return datetime.fromtimestamp(self.criado_em, tz=timezone.utc)
+
+    def messages(self) -> list[ConversationMessage]:
+        return [record.to_message() for record in self.historico]
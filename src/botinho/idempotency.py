@@ -0,0 +1,131 @@
+"""Bounded TTL store backing ``Idempotency-Key`` replays for ``/api/chat``."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used with a different request payload."""
+
+
+@dataclass(slots=True)
+class _Entry:
+    fingerprint: str
+    future: asyncio.Future[Any]
+    expires_at: float
+
+
+def fingerprint(payload: Any) -> str:
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def valid_key(key: str) -> bool:
+    return 0 < len(key) <= MAX_KEY_LENGTH and key.isprintable()
+
+
+class IdempotencyStore:
+    """Run each idempotency key at most once and replay its result until it expires.
+
+    Keys are scoped to the client that sent them (``scope``), so another client
+    reusing the same key never receives someone else's stored response. A repeat
+    of a key whose original request is still running awaits the same pending
+    future; a repeat after completion gets the stored result back. Failed runs
+    are forgotten so the client can retry them. At most ``max_entries`` keys are
+    kept, each for ``ttl_seconds`` after it started; the oldest completed entry
+    is evicted first and pending ones never are, so a full store cannot run a
+    request twice.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600.0, max_entries: int = 10_000) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.replayed = 0
+        self.conflicts = 0
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+
+    async def run(
+        self,
+        key: str,
+        request_fingerprint: str,
+        factory: Callable[[], Awaitable[Any]],
+        scope: str = "",
+    ) -> tuple[Any, bool]:
+        """Return ``(result, replayed)`` for ``key``, running ``factory`` only once.
+
+        If the run being awaited is cancelled (its client went away), the waiter
+        takes over and runs ``factory`` itself.
+        """
+        scoped_key = (scope, key)
+        self._purge_expired()
+        while (entry := self._entries.get(scoped_key)) is not None:
+            if entry.fingerprint != request_fingerprint:
+                self.conflicts += 1
+                raise IdempotencyConflict(key)
+            if not entry.future.done():
+                # Unlike ``shield``, ``wait`` returns (rather than raises) when the
+                # original run is cancelled, and cancelling the waiter leaves it alone.
+                await asyncio.wait({entry.future})
+            if not entry.future.cancelled():
+                self.replayed += 1
+                return entry.future.result(), True
+
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._entries[scoped_key] = _Entry(
+            request_fingerprint, future, monotonic() + self.ttl_seconds
+        )
+        self._evict_completed()
+
+        try:
+            result = await factory()
+        except BaseException as exc:
+            if (entry := self._entries.get(scoped_key)) is not None and entry.future is future:
+                del self._entries[scoped_key]
+            if isinstance(exc, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(exc)
+                # Waiters (if any) re-raise it; mark retrieved to avoid loop warnings.
+                future.exception()
+            raise
+        future.set_result(result)
+        return result, False
+
+    def _evict_completed(self) -> None:
+        while len(self._entries) > self.max_entries:
+            completed = (key for key, entry in self._entries.items() if entry.future.done())
+            oldest = next(completed, None)
+            if oldest is None:
+                # Everything left is in flight; it is evicted once it finishes.
+                return
+            del self._entries[oldest]
+
+    def _purge_expired(self) -> None:
+        now = monotonic()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now:
+                break
+            if not entry.future.done():
+                self._entries.move_to_end(key)
+                break
+            del self._entries[key]
+
+    def stats(self) -> dict[str, Any]:
+        pending = sum(1 for entry in self._entries.values() if not entry.future.done())
+        return {
+            "entries": len(self._entries),
+            "pending": pending,
+            "replayed": self.replayed,
+            "conflicts": self.conflicts,
+        }
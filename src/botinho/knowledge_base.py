@@ -79,3 +79,12 @@ SYNONYMS: dict[str, set[str]] = {
     "impressora": {"printer", "imprimir"},
     "sistema_lento": {"pc lento", "computador lento", "maquina lenta", "máquina lenta"},
 }
+
+
+def compact_knowledge_text(knowledge_base: dict[str, dict[str, str]] = KNOWLEDGE_BASE) -> str:
+    """Render the whole knowledge base as one compact block for model context."""
+    lines = ["Base de conhecimento corporativo:"]
+    for category, topics in knowledge_base.items():
+        lines.append(f"[{category}]")
+        lines.extend(f"- {text}" for text in topics.values())
+    return "\n".join(lines)
@@ -0,0 +1,431 @@
+"""Offline-compiled, memory-mapped knowledge index.
+
+``python -m src.botinho.knowledge_index build`` compiles ``KNOWLEDGE_BASE``,
+``CATEGORY_KEYWORDS`` and ``SYNONYMS`` into a versioned binary file. Workers open
+it with ``mmap`` (read-only), so the OS page cache holds one copy shared by every
+process. Opening it only reads the header; terms, postings and texts are read from
+the mapping when a message needs them.
+
+Layout (little-endian)::
+
+    header    magic, version, longest term, source digest, section counts and offsets
+    categories  (name_off u32, name_len u32)                       * n
+    topics      (category u16, n_tokens u16, key_off u32, key_len u32,
+                 text_off u32, text_len u32)                        * n
+    syn_groups  (category u16)                                      * n
+    buckets     (first term index u32)                              * 257, by first byte
+    pairs       bitmap of the first two bytes of every term          8192 bytes
+    terms       (term_off u32, term_len u16, post_off u32, post_n u16) * n, sorted by bytes
+    postings    (kind u8, a u16, b u16)                             * n
+    strings     UTF-8 blob
+
+``MappedKnowledgeMatcher`` has the same interface and the same substring
+semantics as ``KnowledgeMatcher``, so enabling the index never changes an answer.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from pathlib import Path
+
+from .knowledge_base import CATEGORY_KEYWORDS, KNOWLEDGE_BASE, SYNONYMS
+from .services.knowledge_matcher import (
+    _SYNONYM_CONFIDENCE,
+    SYNONYM_CATEGORIES,
+    TOPIC_SYNONYMS,
+    KnowledgeMatch,
+    KnowledgeMatcher,
+)
+
+MAGIC = b"BKIX"
+VERSION = 3
+DEFAULT_INDEX_PATH = Path("data/knowledge.idx")
+
+# source_digest() of the knowledge base in this build. Indexes are accepted only when
+# they were compiled from it; tests fail until it is updated after the sources change.
+SOURCE_DIGEST = bytes.fromhex("8cddb4f2fbe5d0cb1fc3c62586ec1bc4a51779c375edad22b2ccc7c5aa19250f")
+
+_HEADER = struct.Struct("<4sHH32s4I8I")
+_CATEGORY = struct.Struct("<II")
+_TOPIC = struct.Struct("<HHIIII")
+_SYN_GROUP = struct.Struct("<H")
+_BUCKET = struct.Struct("<II")
+_TERM = struct.Struct("<IHIH")
+_TERM_STRING = struct.Struct("<IH")
+_PAIRS_SIZE = 65536 // 8
+_POSTING = struct.Struct("<BHH")
+
+KIND_CATEGORY_KEYWORD = 1
+KIND_SYNONYM_CATEGORY = 2
+KIND_TOPIC_TOKEN = 3
+KIND_TOPIC_ALIAS = 4
+
+
+def source_digest(
+    knowledge_base: dict[str, dict[str, str]] = KNOWLEDGE_BASE,
+    category_keywords: dict[str, set[str]] = CATEGORY_KEYWORDS,
+    synonyms: dict[str, set[str]] = SYNONYMS,
+) -> bytes:
+    """Digest of everything the index is compiled from (order-sensitive)."""
+    canonical = [
+        knowledge_base,
+        {category: sorted(words) for category, words in category_keywords.items()},
+        {term: sorted(aliases) for term, aliases in synonyms.items()},
+        TOPIC_SYNONYMS,
+        SYNONYM_CATEGORIES,
+    ]
+    return hashlib.sha256(json.dumps(canonical, ensure_ascii=False).encode("utf-8")).digest()
+
+
+def build_index(
+    knowledge_base: dict[str, dict[str, str]] = KNOWLEDGE_BASE,
+    category_keywords: dict[str, set[str]] = CATEGORY_KEYWORDS,
+    synonyms: dict[str, set[str]] = SYNONYMS,
+) -> bytes:
+    strings = bytearray()
+
+    def intern(text: str) -> tuple[int, int]:
+        encoded = text.encode("utf-8")
+        offset = len(strings)
+        strings.extend(encoded)
+        return offset, len(encoded)
+
+    categories: list[str] = list(category_keywords)
+    for name in [*knowledge_base, *SYNONYM_CATEGORIES.values()]:
+        if name not in categories:
+            categories.append(name)
+    category_ids = {name: index for index, name in enumerate(categories)}
+
+    postings: dict[bytes, list[tuple[int, int, int]]] = {}
+
+    def post(term: str, kind: int, a: int, b: int = 0) -> None:
+        entries = postings.setdefault(term.encode("utf-8"), [])
+        if (kind, a, b) not in entries:
+            entries.append((kind, a, b))
+
+    for category, keywords in category_keywords.items():
+        for keyword in keywords:
+            post(keyword, KIND_CATEGORY_KEYWORD, category_ids[category])
+
+    syn_groups: list[int] = []
+    for base_term, aliases in synonyms.items():
+        if base_term not in SYNONYM_CATEGORIES:
+            continue
+        for alias in aliases:
+            post(alias, KIND_SYNONYM_CATEGORY, len(syn_groups))
+        syn_groups.append(category_ids[SYNONYM_CATEGORIES[base_term]])
+
+    topics: list[bytes] = []
+    for category, entries in knowledge_base.items():
+        for topic_key, text in entries.items():
+            topic_id = len(topics)
+            tokens = topic_key.split("_")
+            for position, token in enumerate(tokens):
+                post(token, KIND_TOPIC_TOKEN, topic_id, position)
+            for alias in synonyms.get(TOPIC_SYNONYMS.get(topic_key, ""), ()):
+                post(alias, KIND_TOPIC_ALIAS, topic_id)
+            topics.append(
+                _TOPIC.pack(category_ids[category], len(tokens), *intern(topic_key), *intern(text))
+            )
+
+    category_blob = b"".join(_CATEGORY.pack(*intern(name)) for name in categories)
+    sorted_terms = sorted(postings)
+    buckets = [0] * 257
+    for term in sorted_terms:
+        buckets[term[0] + 1] += 1
+    for first_byte in range(256):
+        buckets[first_byte + 1] += buckets[first_byte]
+    # A one-byte term precedes any second byte, including the end of the text (0).
+    pairs = bytearray(_PAIRS_SIZE)
+    for term in sorted_terms:
+        seconds = term[1:2] or range(256)
+        for second in seconds:
+            pair = term[0] << 8 | second
+            pairs[pair >> 3] |= 1 << (pair & 7)
+    term_blob = bytearray()
+    posting_blob = bytearray()
+    for term in sorted_terms:
+        offset, length = intern(term.decode("utf-8"))
+        entries = postings[term]
+        term_blob += _TERM.pack(offset, length, len(posting_blob) // _POSTING.size, len(entries))
+        for entry in entries:
+            posting_blob += _POSTING.pack(*entry)
+
+    sections = [
+        category_blob,
+        b"".join(topics),
+        b"".join(_SYN_GROUP.pack(category) for category in syn_groups),
+        struct.pack("<257I", *buckets),
+        bytes(pairs),
+        bytes(term_blob),
+        bytes(posting_blob),
+        bytes(strings),
+    ]
+    offsets = []
+    cursor = _HEADER.size
+    for section in sections:
+        offsets.append(cursor)
+        cursor += len(section)
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        max((len(term) for term in sorted_terms), default=0),
+        source_digest(knowledge_base, category_keywords, synonyms),
+        len(categories),
+        len(topics),
+        len(syn_groups),
+        len(postings),
+        *offsets,
+    )
+    return header + b"".join(sections)
+
+
+def write_index(path: Path, data: bytes) -> None:
+    """Write atomically so workers holding the old file keep a valid mapping."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+class MappedKnowledgeMatcher:
+    """``KnowledgeMatcher`` interface served from a memory-mapped index file.
+
+    Nothing beyond the header is copied out of the mapping. For every byte offset
+    of the message whose first two bytes begin some term (a bitmap lookup), the
+    terms starting there are found by binary search in the sorted term table,
+    within the bucket of the first byte. Only the postings of terms that occur are
+    read.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with self.path.open("rb") as handle:
+            self._mm = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._load()
+        except (ValueError, struct.error):
+            self._mm.close()
+            raise
+
+    def _load(self) -> None:
+        if len(self._mm) < _HEADER.size:
+            raise ValueError(f"{self.path}: arquivo de índice truncado")
+        (
+            magic,
+            version,
+            self._max_term_bytes,
+            self.source_digest,
+            self._n_categories,
+            self._n_topics,
+            self._n_syn_groups,
+            self._n_terms,
+            self._categories_off,
+            self._topics_off,
+            self._syn_groups_off,
+            self._buckets_off,
+            self._pairs_off,
+            self._terms_off,
+            self._postings_off,
+            self._strings_off,
+        ) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path}: formato de índice não suportado ({magic!r} v{version})")
+        if self._strings_off > len(self._mm):
+            raise ValueError(f"{self.path}: arquivo de índice truncado")
+        self._last: tuple[str, list[tuple[str, list[tuple[int, int, int]]]]] = ("", [])
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_off + offset
+        return self._mm[start : start + length].decode("utf-8")
+
+    def _term_bytes(self, term_id: int) -> bytes:
+        offset, length = _TERM_STRING.unpack_from(self._mm, self._terms_off + term_id * _TERM.size)
+        start = self._strings_off + offset
+        return self._mm[start : start + length]
+
+    def _term_ids_at(self, window: bytes) -> list[int]:
+        """Ids of the terms ``window`` starts with."""
+        lo, hi = _BUCKET.unpack_from(self._mm, self._buckets_off + window[0] * 4)
+        found = []
+        terms = range(lo, hi)
+        probe = window
+        while probe:
+            position = bisect_right(terms, probe, key=self._term_bytes)
+            if not position:
+                break
+            term_id = lo + position - 1
+            term = self._term_bytes(term_id)
+            if window.startswith(term):
+                found.append(term_id)
+                probe = window[: len(term) - 1]
+                continue
+            # A shorter term that is a prefix of the window also prefixes ``term``.
+            shared = 0
+            while term[shared] == window[shared]:
+                shared += 1
+            probe = window[:shared]
+        return found
+
+    def _postings(self, normalized: str) -> list[tuple[str, list[tuple[int, int, int]]]]:
+        """Terms occurring in ``normalized`` with their postings."""
+        # detect_category and match run back to back on the same message.
+        if normalized == self._last[0]:
+            return self._last[1]
+        encoded = normalized.encode("utf-8") + b"\0"
+        mm = self._mm
+        pairs_off = self._pairs_off
+        width = self._max_term_bytes
+        term_ids = set()
+        for start in range(len(encoded) - 1):
+            pair = encoded[start] << 8 | encoded[start + 1]
+            if mm[pairs_off + (pair >> 3)] >> (pair & 7) & 1:
+                term_ids.update(self._term_ids_at(encoded[start : start + width]))
+        found = []
+        for term_id in sorted(term_ids):
+            offset, length, post_index, count = _TERM.unpack_from(
+                self._mm, self._terms_off + term_id * _TERM.size
+            )
+            base = self._postings_off + post_index * _POSTING.size
+            found.append(
+                (
+                    self._string(offset, length),
+                    [
+                        _POSTING.unpack_from(self._mm, base + index * _POSTING.size)
+                        for index in range(count)
+                    ],
+                )
+            )
+        self._last = (normalized, found)
+        return found
+
+    def _category_name(self, category_id: int) -> str:
+        return self._string(
+            *_CATEGORY.unpack_from(self._mm, self._categories_off + category_id * _CATEGORY.size)
+        )
+
+    def detect_category(self, normalized: str) -> str:
+        keyword_hits = set()
+        synonym_hits = set()
+        for _term, postings in self._postings(normalized):
+            for kind, a, _b in postings:
+                if kind == KIND_CATEGORY_KEYWORD:
+                    keyword_hits.add(a)
+                elif kind == KIND_SYNONYM_CATEGORY:
+                    synonym_hits.add(a)
+        if keyword_hits:
+            return self._category_name(min(keyword_hits))
+        if synonym_hits:
+            group = min(synonym_hits)
+            (category_id,) = _SYN_GROUP.unpack_from(
+                self._mm, self._syn_groups_off + group * _SYN_GROUP.size
+            )
+            return self._category_name(category_id)
+        return "conversa_geral"
+
+    def match(self, normalized: str) -> KnowledgeMatch | None:
+        token_hits: set[int] = set()
+        alias_hits: set[int] = set()
+        topic_terms: dict[int, list[str]] = {}
+        for term, postings in self._postings(normalized):
+            for kind, a, _b in postings:
+                if kind == KIND_TOPIC_TOKEN:
+                    token_hits.add(a)
+                elif kind == KIND_TOPIC_ALIAS:
+                    alias_hits.add(a)
+                else:
+                    continue
+                topic_terms.setdefault(a, []).append(term)
+        if not token_hits and not alias_hits:
+            return None
+
+        topic_id = min(token_hits | alias_hits)
+        category_id, _n_tokens, key_off, key_len, text_off, text_len = _TOPIC.unpack_from(
+            self._mm, self._topics_off + topic_id * _TOPIC.size
+        )
+        return KnowledgeMatch(
+            self._category_name(category_id),
+            self._string(key_off, key_len),
+            self._string(text_off, text_len),
+            normalized,
+            tuple(topic_terms[topic_id]),
+            1.0 if topic_id in token_hits else _SYNONYM_CONFIDENCE,
+        )
+
+
+def load_knowledge_matcher(
+    path: str | Path | None, logger: logging.Logger | None = None
+) -> KnowledgeMatcher | MappedKnowledgeMatcher:
+    """Open the compiled index at ``path``, falling back to the in-process matcher.
+
+    The index is rejected when missing, unreadable or compiled from a different
+    knowledge base than the one in this build (stale index). Freshness is checked
+    against the ``SOURCE_DIGEST`` stamp, so opening the index never hashes the
+    knowledge base.
+    """
+    logger = logger or logging.getLogger("botinho.knowledge")
+    if not path:
+        return KnowledgeMatcher()
+    try:
+        matcher = MappedKnowledgeMatcher(Path(path))
+    except (OSError, ValueError, struct.error) as exc:
+        logger.warning("Índice de conhecimento indisponível (%s); usando matcher em memória.", exc)
+        return KnowledgeMatcher()
+    if matcher.source_digest != SOURCE_DIGEST:
+        matcher.close()
+        logger.warning(
+            "Índice de conhecimento %s desatualizado; recompile com "
+            "`python -m src.botinho.knowledge_index build`. Usando matcher em memória.",
+            path,
+        )
+        return KnowledgeMatcher()
+    return matcher
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compila o índice da base de conhecimento.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compila o índice")
+    build.add_argument("--output", type=Path, default=DEFAULT_INDEX_PATH)
+    info = commands.add_parser("info", help="mostra o cabeçalho de um índice")
+    info.add_argument("path", type=Path, nargs="?", default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        data = build_index()
+        write_index(args.output, data)
+        print(f"Índice gravado em {args.output} ({len(data)} bytes, v{VERSION})")
+        return
+
+    matcher = MappedKnowledgeMatcher(args.path)
+    try:
+        print(
+            json.dumps(
+                {
+                    "path": str(args.path),
+                    "version": VERSION,
+                    "bytes": len(matcher._mm),
+                    "categories": matcher._n_categories,
+                    "topics": matcher._n_topics,
+                    "terms": matcher._n_terms,
+                    "up_to_date": matcher.source_digest == SOURCE_DIGEST,
+                },
+                indent=2,
+            )
+        )
+    finally:
+        matcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Event-loop lag and in-flight request monitoring for load shedding."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+from time import monotonic
+from typing import Any
+
+
+class LoadMonitor:
+    """Track event-loop lag and in-flight chats to decide when to shed load.
+
+    A background task sleeps ``interval`` seconds in a loop and measures how late
+    it wakes up: that delay is the time other callbacks kept the loop busy. The
+    smoothed lag (EWMA) and the number of in-flight chats are compared against
+    their thresholds by ``overloaded``; callers answer immediately instead of
+    queueing more work behind an already saturated loop.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        max_lag_ms: float = 250.0,
+        max_in_flight: int = 256,
+        retry_after_seconds: int = 5,
+        smoothing: float = 0.3,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.interval = interval
+        self.max_lag_ms = max_lag_ms
+        self.max_in_flight = max_in_flight
+        self.retry_after_seconds = retry_after_seconds
+        self.smoothing = smoothing
+        self.logger = logger or logging.getLogger("botinho.load")
+        self.lag_ms = 0.0
+        self.smoothed_lag_ms = 0.0
+        self.max_observed_lag_ms = 0.0
+        self.in_flight = 0
+        self.shed = 0
+        self._task: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="botinho-loop-lag-monitor")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        was_overloaded = False
+        while True:
+            expected = monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record_lag(max(0.0, monotonic() - expected) * 1000)
+            overloaded = self.overloaded()
+            if overloaded != was_overloaded:
+                self.logger.warning(
+                    "Carga %s: lag=%.1fms em andamento=%d",
+                    "alta, descartando requisições" if overloaded else "normalizada",
+                    self.smoothed_lag_ms,
+                    self.in_flight,
+                )
+                was_overloaded = overloaded
+
+    def record_lag(self, lag_ms: float) -> None:
+        self.lag_ms = lag_ms
+        self.smoothed_lag_ms += self.smoothing * (lag_ms - self.smoothed_lag_ms)
+        self.max_observed_lag_ms = max(self.max_observed_lag_ms, lag_ms)
+
+    def overloaded(self) -> bool:
+        return self.smoothed_lag_ms > self.max_lag_ms or self.in_flight >= self.max_in_flight
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "loop_lag_ms": round(self.lag_ms, 3),
+            "loop_lag_smoothed_ms": round(self.smoothed_lag_ms, 3),
+            "loop_lag_max_ms": round(self.max_observed_lag_ms, 3),
+            "in_flight": self.in_flight,
+            "overloaded": self.overloaded(),
+            "shed": self.shed,
+        }
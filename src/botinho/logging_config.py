@@ -0,0 +1,189 @@
+"""Non-blocking logging setup and throttling for noisy upstream warnings.
+
+Handlers attached to the root logger only enqueue records; a ``QueueListener``
+thread formats them and writes to stderr, so a slow terminal or log collector
+never stalls the event loop. Records are dropped (and counted) when the bounded
+queue is full instead of blocking the caller.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import re
+import sys
+from collections import OrderedDict
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from time import monotonic
+from typing import Any
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+_DIGITS = re.compile(r"\d+")
+
+_listener: QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with timestamp, level, logger and message."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """``QueueHandler`` that drops records on a full queue instead of erroring."""
+
+    def __init__(self, log_queue: queue.Queue[logging.LogRecord]) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback here, but leave formatting to the listener.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _StderrHandler(logging.StreamHandler):
+    """Write to whatever ``sys.stderr`` is at emit time (it may be swapped by runners)."""
+
+    def __init__(self) -> None:
+        super().__init__(sys.stderr)
+
+    @property
+    def stream(self):  # noqa: ANN201
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value) -> None:  # noqa: ANN001
+        pass
+
+
+def configure_logging(level: str = "INFO", fmt: str = "text", queue_size: int = 10_000) -> None:
+    """Route root logging through a bounded queue drained by a listener thread.
+
+    Safe to call again: the previous listener is flushed and replaced.
+    """
+    global _listener
+    stop_logging()
+
+    stream_handler = _StderrHandler()
+    formatter = JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+    stream_handler.setFormatter(formatter)
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=max(1, queue_size))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread.
+
+    The listener's handlers are attached to the root logger directly, so records
+    emitted after shutdown are still written (synchronously).
+    """
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, DroppingQueueHandler):
+            root.removeHandler(handler)
+    for handler in listener.handlers:
+        root.addHandler(handler)
+
+
+def dropped_records() -> int:
+    return sum(
+        handler.dropped
+        for handler in logging.getLogger().handlers
+        if isinstance(handler, DroppingQueueHandler)
+    )
+
+
+def truncate(text: str, limit: int) -> str:
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"{text[:limit]}… (+{len(text) - limit} caracteres)"
+
+
+class ThrottledLogger:
+    """Deduplicate repeated warnings, emitting each distinct one at most every ``interval``.
+
+    Warnings are keyed by a caller-supplied signature; repeats inside the window
+    are counted and reported with the next emission of the same signature.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        interval: float = 60.0,
+        max_chars: int = 300,
+        max_keys: int = 256,
+    ) -> None:
+        self.logger = logger
+        self.interval = interval
+        self.max_chars = max_chars
+        self.max_keys = max_keys
+        self.suppressed_total = 0
+        self._seen: OrderedDict[str, list[float | int]] = OrderedDict()
+
+    @staticmethod
+    def signature(error_text: str) -> str:
+        """Group errors that differ only in numbers (retry delays, quotas, ids)."""
+        return _DIGITS.sub("#", error_text[:120])
+
+    def truncate(self, text: str) -> str:
+        return truncate(text, self.max_chars)
+
+    def warning(self, key: str, msg: str, *args: Any, error_text: str = "") -> None:
+        now = monotonic()
+        entry = self._seen.get(key)
+        if entry is not None and now - entry[0] < self.interval:
+            entry[1] += 1
+            self.suppressed_total += 1
+            return
+
+        suppressed = int(entry[1]) if entry is not None else 0
+        self._seen[key] = [now, 0]
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.max_keys:
+            self._seen.popitem(last=False)
+
+        if error_text:
+            msg += " erro=%s"
+            args = (*args, self.truncate(error_text))
+        if suppressed:
+            msg += " (%d ocorrências repetidas suprimidas)"
+            args = (*args, suppressed)
+        self.logger.warning(msg, *args)
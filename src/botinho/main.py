@@ -2,36 +2,197 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable
+from contextlib import aclosing, asynccontextmanager
 from pathlib import Path
+from time import monotonic
+from typing import Any, TypeVar
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, Response
+from pydantic import ValidationError
 
+from .assets import NegotiatedGZipMiddleware, StaticAssetManifest
+from .audit import AuditLog
+from .idempotency import IdempotencyConflict, IdempotencyStore, fingerprint, valid_key
+from .knowledge_base import compact_knowledge_text
+from .knowledge_index import load_knowledge_matcher
+from .load_shedding import LoadMonitor
+from .logging_config import configure_logging, dropped_records, stop_logging
 from .models import ChatRequest, ErrorEnvelope
-from .security import RateLimitMiddleware, SecurityHeadersMiddleware
+from .profiling import PROFILE_FORMATS, ProfilingMiddleware, RequestProfiler
+from .security import (
+    RateLimitMiddleware,
+    SecurityHeadersMiddleware,
+    SlidingWindowRateLimiter,
+    header_token_matches,
+)
+from .server import per_worker_path
 from .services.chat_service import ChatService, GeminiClient
+from .services.router import ModelRouter
+from .services.scheduler import QuotaScheduler
 from .settings import get_settings
+from .tracing import BatchSpanExporter, Tracer, TracingMiddleware
 
 settings = get_settings()
 
-logging.basicConfig(
-    level=getattr(logging, settings.log_level.upper(), logging.INFO),
-    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-)
+configure_logging(settings.log_level, settings.log_format, settings.log_queue_size)
 logger = logging.getLogger("botinho")
+# Set by the production launcher; processes sharing the box split quotas and files.
+workers = max(1, settings.server_workers)
+
+model_client = GeminiClient(
+    api_key=settings.gemini_api_key,
+    model_name=settings.gemini_model,
+    pool_size=settings.gemini_http_pool_size,
+    keepalive_expiry=settings.gemini_http_keepalive_expiry,
+    connect_timeout=settings.gemini_connect_timeout,
+    request_timeout=settings.gemini_request_timeout,
+    http2=settings.gemini_http2,
+    logger=logging.getLogger("botinho.gemini"),
+    context_cache=settings.gemini_context_cache,
+    cache_ttl_seconds=settings.gemini_cache_ttl_seconds,
+    cached_knowledge=compact_knowledge_text() if settings.gemini_cache_knowledge else None,
+    cache_retry_seconds=settings.gemini_cache_retry_seconds,
+)
+audit_log = (
+    AuditLog(
+        per_worker_path(Path(settings.audit_log_path), workers),
+        queue_size=settings.audit_log_queue_size,
+        batch_size=settings.audit_log_batch_size,
+        flush_interval=settings.audit_log_flush_interval,
+        max_bytes=settings.audit_log_max_bytes,
+        logger=logging.getLogger("botinho.audit"),
+    )
+    if settings.audit_log_enabled
+    else None
+)
+quota_scheduler = (
+    QuotaScheduler(
+        rpm_limits=settings.gemini_rpm_limits,
+        tpm_limits=settings.gemini_tpm_limits,
+        default_rpm=settings.gemini_default_rpm,
+        default_tpm=settings.gemini_default_tpm,
+        burst_seconds=settings.quota_burst_seconds,
+        max_wait_seconds=settings.quota_max_wait_seconds,
+        workers=workers,
+    )
+    if settings.quota_scheduler_enabled
+    else None
+)
+model_router = (
+    ModelRouter(
+        light_model=settings.router_light_model,
+        max_words=settings.router_max_words,
+        max_history=settings.router_max_history,
+        knowledge_max_output_tokens=settings.router_knowledge_max_output_tokens,
+        greeting_max_output_tokens=settings.router_greeting_max_output_tokens,
+    )
+    if settings.router_enabled
+    else None
+)
+tracer = Tracer(
+    exporter=BatchSpanExporter(
+        file_path=(
+            per_worker_path(Path(settings.tracing_export_path), workers)
+            if settings.tracing_export_path
+            else None
+        ),
+        endpoint=settings.tracing_otlp_endpoint,
+        service_name=settings.tracing_service_name,
+        batch_size=settings.tracing_batch_size,
+        flush_interval=settings.tracing_flush_interval,
+        logger=logging.getLogger("botinho.tracing"),
+    ),
+    enabled=settings.tracing_enabled,
+    sample_rate=settings.tracing_sample_rate,
+)
+chat_service = ChatService(
+    model_client=model_client,
+    logger=logger,
+    audit_log=audit_log,
+    knowledge_matcher=load_knowledge_matcher(
+        settings.knowledge_index_path, logging.getLogger("botinho.knowledge")
+    ),
+    fast_path_thresholds=settings.fast_path_thresholds if settings.fast_path_enabled else None,
+    fast_path_max_words=settings.fast_path_max_words,
+    scheduler=quota_scheduler,
+    history_capacity=settings.history_max_turns,
+    max_sessions=settings.max_sessions,
+    session_ttl_seconds=settings.session_ttl_seconds,
+    router=model_router,
+    tracer=tracer,
+    upstream_log_interval=settings.log_upstream_error_interval_seconds,
+    max_error_chars=settings.log_max_error_chars,
+    session_token_budget=settings.session_token_budget,
+    budget_mode=settings.session_budget_mode,
+    budget_model=settings.session_budget_model,
+)
+load_monitor = LoadMonitor(
+    interval=settings.load_monitor_interval_seconds,
+    max_lag_ms=settings.load_shed_max_lag_ms,
+    max_in_flight=settings.load_shed_max_in_flight,
+    retry_after_seconds=settings.load_shed_retry_after_seconds,
+    logger=logging.getLogger("botinho.load"),
+)
+# Shared by all /ws/chat connections (the HTTP rate-limit middleware never sees them),
+# so reconnecting or opening new sessions does not reset a client's budget.
+ws_rate_limiter = SlidingWindowRateLimiter(
+    settings.ws_rate_limit_messages,
+    settings.ws_rate_limit_window_seconds,
+    settings.rate_limit_max_clients,
+)
+idempotency_store = (
+    IdempotencyStore(
+        ttl_seconds=settings.idempotency_ttl_seconds,
+        max_entries=settings.idempotency_max_entries,
+    )
+    if settings.idempotency_enabled
+    else None
+)
+profiler = RequestProfiler(
+    enabled=settings.profiling_enabled,
+    sample_rate=settings.profiling_sample_rate,
+    token=settings.admin_token,
+    max_profiles=settings.profiling_max_profiles,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    await model_client.start(
+        warm_up=settings.gemini_warm_up,
+        warm_up_connections=settings.gemini_warm_up_connections,
+    )
+    if audit_log is not None:
+        await audit_log.start()
+    await load_monitor.start()
+    if tracer.enabled:
+        await tracer.exporter.start()
+    try:
+        yield
+    finally:
+        await load_monitor.stop()
+        if tracer.enabled:
+            await tracer.exporter.stop()
+        if audit_log is not None:
+            await audit_log.stop()
+        await model_client.close()
+        stop_logging()
 
-model_client = GeminiClient(api_key=settings.gemini_api_key, model_name=settings.gemini_model)
-chat_service = ChatService(model_client=model_client, logger=logger)
 
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="Assistente virtual com FastAPI e Google Gemini.",
+    lifespan=lifespan,
 )
 
 app.add_middleware(SecurityHeadersMiddleware)
@@ -39,6 +200,7 @@ app.add_middleware(
     RateLimitMiddleware,
     requests_limit=settings.rate_limit_requests,
     window_seconds=settings.rate_limit_window_seconds,
+    max_clients=settings.rate_limit_max_clients,
 )
 app.add_middleware(
     CORSMiddleware,
@@ -47,9 +209,22 @@ app.add_middleware(
     allow_methods=["GET", "POST"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    NegotiatedGZipMiddleware,
+    minimum_size=settings.gzip_minimum_size,
+    compresslevel=settings.gzip_compress_level,
+)
+if profiler.enabled:
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+if tracer.enabled:
+    app.add_middleware(TracingMiddleware, tracer=tracer)
 
 static_dir = Path(__file__).parent / "static"
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+static_assets = StaticAssetManifest(
+    static_dir,
+    precompress=settings.static_precompress,
+    min_compress_size=settings.static_compress_min_size,
+)
 
 
 @app.exception_handler(RequestValidationError)
@@ -67,7 +242,9 @@ async def request_validation_exception_handler(request: Request, exc: RequestVal
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     envelope = ErrorEnvelope(error={"code": "http_error", "message": str(exc.detail)})
-    return JSONResponse(status_code=exc.status_code, content=envelope.model_dump())
+    return JSONResponse(
+        status_code=exc.status_code, content=envelope.model_dump(), headers=exc.headers
+    )
 
 
 @app.exception_handler(Exception)
@@ -79,9 +256,134 @@ async def generic_exception_handler(request: Request, exc: Exception):
     return JSONResponse(status_code=500, content=envelope.model_dump())
 
 
+def require_admin(request: Request) -> None:
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Recurso não encontrado")
+    if not header_token_matches(request.headers.get("x-botinho-admin-token"), settings.admin_token):
+        raise HTTPException(status_code=403, detail="Acesso administrativo negado")
+
+
+CLIENT_CLOSED_REQUEST = 499
+
+_T = TypeVar("_T")
+
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away before its response was ready."""
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _cancel_on_disconnect(request: Request, awaitable: Awaitable[_T]) -> _T:
+    """Await ``awaitable`` but cancel it if the client disconnects first.
+
+    Cancellation reaches the in-flight Gemini call, so no quota or concurrency
+    is spent on answers nobody will read.
+    """
+    work = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        work.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if work.done():
+        return work.result()
+
+    work.cancel()
+    try:
+        # Still returns normally if the turn finished before seeing the cancellation.
+        return await work
+    except asyncio.CancelledError:
+        raise ClientDisconnected from None
+
+
+def _decode_frame(message: dict[str, Any]) -> Any:
+    """JSON payload of a raw ``websocket.receive`` message.
+
+    Text and binary (UTF-8) frames are both accepted; ``ValueError`` when the
+    payload is not valid JSON.
+    """
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    text = message.get("text")
+    if text is None:
+        text = (message.get("bytes") or b"").decode("utf-8")
+    return json.loads(text)
+
+
+def _invalid_frame(errors: list[Any]) -> dict[str, Any]:
+    return {
+        "type": "error",
+        "code": "validation_error",
+        "message": "Payload inválido",
+        "details": {"errors": jsonable_encoder(errors)},
+    }
+
+
+async def _stream_until_disconnect(
+    websocket: WebSocket,
+    events: AsyncIterator[dict[str, Any]],
+    pending: deque[dict[str, Any]],
+    max_pending: int,
+) -> bool:
+    """Send ``events`` while still reading the socket; ``False`` if the connection ended.
+
+    A disconnect mid-turn cancels the stream (and the upstream Gemini call);
+    other frames received meanwhile are queued in ``pending``. A client that
+    queues more than ``max_pending`` frames is closed with code 1008.
+    """
+
+    async def forward() -> None:
+        async with aclosing(events):
+            async for event in events:
+                await websocket.send_json(jsonable_encoder(event))
+
+    async def stop_sender() -> None:
+        sender.cancel()
+        await asyncio.wait({sender})
+        if not sender.cancelled():
+            sender.exception()  # the turn is abandoned; a send error is moot
+
+    sender = asyncio.ensure_future(forward())
+    receiver: asyncio.Future[dict[str, Any]] | None = None
+    try:
+        while True:
+            receiver = asyncio.ensure_future(websocket.receive())
+            await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if not receiver.done():
+                receiver.cancel()
+                sender.result()
+                return True
+            message = receiver.result()
+            if message["type"] == "websocket.disconnect":
+                await stop_sender()
+                return False
+            if len(pending) >= max_pending:
+                await stop_sender()
+                logger.warning("Cliente WebSocket excedeu %d frames pendentes.", max_pending)
+                await websocket.close(code=1008, reason="too many pending messages")
+                return False
+            pending.append(message)
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+        sender.cancel()
+
+
 @app.get("/")
-async def index() -> FileResponse:
-    return FileResponse(static_dir / "index.html")
+async def index(request: Request) -> Response:
+    return static_assets.asset_response(static_assets.get("index.html"), request)
+
+
+@app.api_route("/static/{asset_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_asset(asset_path: str, request: Request) -> Response:
+    return static_assets.response(asset_path, request)
 
 
 @app.get("/health")
@@ -90,14 +392,167 @@ async def health() -> dict[str, str]:
 
 
 @app.post("/api/chat")
-async def chat_endpoint(payload: dict):
+async def chat_endpoint(payload: dict, http_request: Request):
     request = ChatRequest.model_validate(payload)
 
     if not request.message.strip():
         raise HTTPException(status_code=400, detail="Mensagem não pode estar vazia")
 
-    result = await chat_service.converse(request.message, request.session_id)
-    return JSONResponse(jsonable_encoder(result))
+    async def run_turn() -> dict:
+        with load_monitor.track():
+            result = await chat_service.converse(request.message, request.session_id)
+        return jsonable_encoder(result)
+
+    async def respond() -> JSONResponse:
+        # Shed ahead of the idempotency store so a degraded answer is never replayed.
+        if load_monitor.overloaded():
+            load_monitor.shed += 1
+            if settings.load_shed_mode == "reject":
+                raise HTTPException(
+                    status_code=503,
+                    detail="Servidor sobrecarregado. Tente novamente em instantes.",
+                    headers={"Retry-After": str(load_monitor.retry_after_seconds)},
+                )
+            return JSONResponse(
+                jsonable_encoder(chat_service.fallback_reply(request.message, request.session_id))
+            )
+
+        idempotency_key = http_request.headers.get("idempotency-key")
+        if idempotency_key is None or idempotency_store is None:
+            return JSONResponse(await run_turn())
+
+        if not valid_key(idempotency_key):
+            raise HTTPException(status_code=400, detail="Idempotency-Key inválida")
+        try:
+            body, replayed = await idempotency_store.run(
+                idempotency_key,
+                fingerprint({"message": request.message, "session_id": request.session_id}),
+                run_turn,
+                # Keys are per client: a replay carries the original session_id.
+                scope=http_request.client.host if http_request.client else "unknown",
+            )
+        except IdempotencyConflict:
+            raise HTTPException(
+                status_code=422, detail="Idempotency-Key já utilizada com outro payload"
+            ) from None
+        headers = {"Idempotent-Replayed": "true"} if replayed else None
+        return JSONResponse(body, headers=headers)
+
+    if not settings.cancel_on_disconnect:
+        return await respond()
+    try:
+        return await _cancel_on_disconnect(http_request, respond())
+    except ClientDisconnected:
+        logger.info("Cliente desconectou durante /api/chat; turno cancelado.")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    """Persistent chat bound to one conversation, streaming responses as they arrive.
+
+    Client frames: ``{"message": "..."}`` or ``{"type": "pong"}``. Server frames:
+    ``session``, ``chunk``, ``done``, ``error`` and ``ping`` events.
+    """
+    origin = websocket.headers.get("origin")
+    if origin and origin not in settings.cors_allowed_origins:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    session_id, _conversation = chat_service.get_or_create_conversation(
+        websocket.query_params.get("session_id") or None
+    )
+    await websocket.send_json({"type": "session", "session_id": session_id})
+
+    client_ip = websocket.client.host if websocket.client else "unknown"
+    last_activity = monotonic()
+    # Frames that arrived while a response was streaming, handled in order afterwards.
+    pending: deque[dict[str, Any]] = deque()
+    try:
+        while True:
+            try:
+                if pending:
+                    message = pending.popleft()
+                else:
+                    message = await asyncio.wait_for(
+                        websocket.receive(), timeout=settings.ws_heartbeat_interval_seconds
+                    )
+            except asyncio.TimeoutError:
+                if monotonic() - last_activity >= settings.ws_idle_timeout_seconds:
+                    await websocket.close(code=1000, reason="idle timeout")
+                    return
+                await websocket.send_json({"type": "ping"})
+                continue
+
+            last_activity = monotonic()
+            try:
+                frame = _decode_frame(message)
+            except ValueError as exc:
+                await websocket.send_json(
+                    _invalid_frame([{"type": "json_invalid", "msg": str(exc)}])
+                )
+                continue
+            if not isinstance(frame, dict):
+                await websocket.send_json(
+                    _invalid_frame([{"type": "dict_type", "msg": "Frame must be a JSON object"}])
+                )
+                continue
+            if frame.get("type") == "pong":
+                continue
+
+            try:
+                request = ChatRequest.model_validate({**frame, "session_id": session_id})
+            except ValidationError as exc:
+                await websocket.send_json(_invalid_frame(exc.errors()))
+                continue
+
+            if not (
+                ws_rate_limiter.allow(f"ip:{client_ip}")
+                and ws_rate_limiter.allow(f"session:{session_id}")
+            ):
+                await websocket.send_json(
+                    {
+                        "type": "error",
+                        "code": "rate_limit_exceeded",
+                        "message": "Limite de mensagens excedido. Tente novamente em instantes.",
+                    }
+                )
+                continue
+
+            if load_monitor.overloaded():
+                load_monitor.shed += 1
+                if settings.load_shed_mode == "reject":
+                    await websocket.send_json(
+                        {
+                            "type": "error",
+                            "code": "overloaded",
+                            "message": "Servidor sobrecarregado. Tente novamente em instantes.",
+                            "retry_after": load_monitor.retry_after_seconds,
+                        }
+                    )
+                    continue
+                reply = jsonable_encoder(chat_service.fallback_reply(request.message, session_id))
+                await websocket.send_json({"type": "chunk", "text": reply["response"]})
+                await websocket.send_json({"type": "done", **reply})
+                continue
+
+            with (
+                load_monitor.track(),
+                tracer.start_server_span(
+                    "WS /ws/chat message",
+                    websocket.headers.get("traceparent"),
+                    {"session.id": session_id},
+                ),
+            ):
+                events = chat_service.converse_stream(request.message, session_id)
+                if not await _stream_until_disconnect(
+                    websocket, events, pending, settings.ws_max_pending_frames
+                ):
+                    logger.info("Conexão WebSocket encerrada; turno cancelado.")
+                    return
+    except WebSocketDisconnect:
+        return
 
 
 @app.get("/api/conversation/{session_id}")
@@ -109,23 +564,76 @@ async def conversation_history(session_id: str):
     return JSONResponse(
         {
             "session_id": session_id,
-            "created_at": conversation.criado_em.isoformat(),
+            "created_at": conversation.created_at().isoformat(),
             "last_category": conversation.ultima_categoria,
+            "usage": conversation.usage.to_dict() if conversation.usage is not None else None,
+            "token_budget_remaining": (
+                max(0, chat_service.session_token_budget - conversation.tokens_used())
+                if chat_service.session_token_budget > 0
+                else None
+            ),
             "history_count": len(conversation.historico),
-            "history": [entry.model_dump(mode="json") for entry in conversation.historico],
+            "history": [entry.model_dump(mode="json") for entry in conversation.messages()],
         }
     )
 
 
+@app.get("/api/usage")
+async def usage(top: int = Query(default=10, ge=0, le=100)):
+    """Token and upstream-latency totals by model and category, plus the heaviest sessions."""
+    return JSONResponse(chat_service.usage_stats(top))
+
+
 @app.get("/api/stats")
 async def stats():
     total_conversations = len(chat_service.conversations)
     total_messages = sum(len(conv.historico) for conv in chat_service.conversations.values())
 
-    return JSONResponse(
-        {
-            "total_conversations": total_conversations,
-            "total_messages": total_messages,
-            "active_sessions": list(chat_service.conversations.keys()),
-        }
-    )
+    payload = {
+        "total_conversations": total_conversations,
+        "total_messages": total_messages,
+        "active_sessions": list(chat_service.conversations.keys()),
+        "evicted_sessions": chat_service.evicted_sessions,
+        "fast_path": chat_service.fast_path_stats(),
+        "cancelled": chat_service.cancellation_stats(),
+        "load": load_monitor.stats(),
+        "logging": {
+            "dropped_records": dropped_records(),
+            "suppressed_upstream_warnings": chat_service.upstream_warnings.suppressed_total,
+        },
+    }
+    if model_router is not None:
+        payload["router"] = model_router.stats()
+    if quota_scheduler is not None:
+        payload["quota_scheduler"] = quota_scheduler.stats()
+    if audit_log is not None:
+        payload["audit_log"] = audit_log.stats()
+    if idempotency_store is not None:
+        payload["idempotency"] = idempotency_store.stats()
+    if tracer.enabled:
+        payload["tracing"] = tracer.stats()
+    return JSONResponse(payload)
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles(request: Request):
+    require_admin(request)
+    return JSONResponse({"enabled": profiler.enabled, "profiles": profiler.summaries()})
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    request: Request,
+    format: str = Query(default="collapsed", pattern=f"^({'|'.join(PROFILE_FORMATS)})$"),
+):
+    require_admin(request)
+    record = profiler.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+
+    media_type = "application/octet-stream" if format == "pstats" else "text/plain; charset=utf-8"
+    headers = {}
+    if format == "pstats":
+        headers["Content-Disposition"] = f'attachment; filename="{profile_id}.pstats"'
+    return Response(content=record.render(format), media_type=media_type, headers=headers)
@@ -5,7 +5,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any
 
-from pydantic import BaseModel, ConfigDict, Field, model_validator
+from pydantic import BaseModel, Field, model_validator
 
 
 class ChatRequest(BaseModel):
@@ -29,6 +29,7 @@ class ChatResponse(BaseModel):
     timestamp: datetime
     bot_name: str = "Botinho"
     model: str
+    usage: dict[str, Any] | None = None
 
 
 class ApiError(BaseModel):
@@ -46,11 +47,5 @@ class ConversationMessage(BaseModel):
     bot: str
     categoria: str | None = None
     timestamp: datetime
+    usage: dict[str, Any] | None = None
 
-
-class ConversationData(BaseModel):
-    criado_em: datetime
-    ultima_categoria: str | None = None
-    historico: list[ConversationMessage] = Field(default_factory=list)
-
-    model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -0,0 +1,204 @@
+"""Opt-in request profiling with a bounded in-memory ring of recent profiles."""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+from uuid import uuid4
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .security import header_token_matches
+
+PROFILE_HEADER = "x-botinho-profile"
+PROFILE_ID_HEADER = "x-botinho-profile-id"
+PROFILE_FORMATS = ("collapsed", "pstats", "text")
+
+
+@dataclass(slots=True)
+class ProfileRecord:
+    profile_id: str
+    path: str
+    created_at: datetime
+    duration_ms: float
+    stats: pstats.Stats = field(repr=False)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "profile_id": self.profile_id,
+            "path": self.path,
+            "created_at": self.created_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 3),
+        }
+
+    def render(self, fmt: str) -> bytes:
+        if fmt == "pstats":
+            # Same payload as ``Stats.dump_stats``; load with ``pstats.Stats(path)``.
+            return marshal.dumps(self.stats.stats)  # type: ignore[attr-defined]
+        if fmt == "text":
+            buffer = io.StringIO()
+            stats = pstats.Stats(stream=buffer)
+            stats.add(self.stats)
+            stats.sort_stats("cumulative").print_stats(50)
+            return buffer.getvalue().encode("utf-8")
+        return collapse_stats(self.stats).encode("utf-8")
+
+
+class RequestProfiler:
+    """Decide which requests to profile and keep the last ``max_profiles`` results.
+
+    A request is profiled when profiling is enabled and either carries the
+    ``X-Botinho-Profile`` header with the admin token or is picked by
+    ``sample_rate``. ``cProfile`` is thread-wide, so while a request is being
+    profiled any other coroutine running on the event loop is captured too, and
+    at most one request is profiled at a time.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 0.0,
+        token: str = "",
+        max_profiles: int = 20,
+    ) -> None:
+        self.enabled = enabled
+        self.sample_rate = max(0.0, min(sample_rate, 1.0))
+        self.token = token
+        self._profiles: deque[ProfileRecord] = deque(maxlen=max(1, max_profiles))
+        self._lock = threading.Lock()
+
+    def should_profile(self, headers: Headers) -> bool:
+        if not self.enabled:
+            return False
+        if header_token_matches(headers.get(PROFILE_HEADER), self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self) -> cProfile.Profile | None:
+        """Enable a new profiler, or return ``None`` when one is already running."""
+        if not self._lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiling tool is active on this thread
+            self._lock.release()
+            return None
+        return profiler
+
+    def finish(
+        self, profiler: cProfile.Profile, profile_id: str, path: str, duration: float
+    ) -> ProfileRecord:
+        try:
+            profiler.disable()
+        finally:
+            self._lock.release()
+        record = ProfileRecord(
+            profile_id=profile_id,
+            path=path,
+            created_at=datetime.now(timezone.utc),
+            duration_ms=duration * 1000,
+            stats=pstats.Stats(profiler),
+        )
+        self._profiles.append(record)
+        return record
+
+    def summaries(self) -> list[dict[str, Any]]:
+        return [record.summary() for record in reversed(self._profiles)]
+
+    def get(self, profile_id: str) -> ProfileRecord | None:
+        for record in self._profiles:
+            if record.profile_id == profile_id:
+                return record
+        return None
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware wrapping selected paths in ``RequestProfiler``.
+
+    Registered as the outermost middleware so a profile covers the other
+    middlewares, body parsing, validation and the handler itself.
+    """
+
+    def __init__(
+        self, app: ASGIApp, profiler: RequestProfiler, paths: tuple[str, ...] = ("/api/chat",)
+    ) -> None:
+        self.app = app
+        self.profiler = profiler
+        self.paths = paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["path"] not in self.paths
+            or not self.profiler.should_profile(Headers(scope=scope))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = self.profiler.start()
+        if profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid4().hex
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER.encode("latin-1"), profile_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            self.profiler.finish(profiler, profile_id, scope["path"], perf_counter() - started)
+
+
+def collapse_stats(stats: pstats.Stats, max_depth: int = 64) -> str:
+    """Render ``stats`` as collapsed stacks (``a;b;c <microseconds>``).
+
+    ``cProfile`` only records caller/callee edges, so each function's own time is
+    attributed to a single stack built by following its heaviest caller chain.
+    The output loads directly into flamegraph.pl, speedscope or inferno.
+    """
+    raw: dict[tuple[str, int, str], Any] = stats.stats  # type: ignore[attr-defined]
+    lines: list[str] = []
+    for func, (_cc, _nc, own_time, _ct, _callers) in raw.items():
+        micros = int(own_time * 1_000_000)
+        if micros <= 0:
+            continue
+        stack = [func]
+        seen = {func}
+        current = func
+        while len(stack) < max_depth:
+            callers = raw.get(current, (0, 0, 0.0, 0.0, {}))[4]
+            candidates = [caller for caller in callers if caller not in seen]
+            if not candidates:
+                break
+            current = max(candidates, key=lambda caller: callers[caller][3])
+            seen.add(current)
+            stack.append(current)
+        lines.append(f"{';'.join(_frame_label(frame) for frame in reversed(stack))} {micros}")
+    lines.sort()
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def _frame_label(func: tuple[str, int, str]) -> str:
+    filename, lineno, name = func
+    if filename == "~":
+        return name.replace(";", ":")
+    return f"{Path(filename).name}:{name}:{lineno}".replace(";", ":")
@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
+import secrets
 import time
-from collections import defaultdict, deque
+from collections import OrderedDict, deque
 from collections.abc import Callable
 
 from fastapi import Request
@@ -11,22 +12,83 @@ from fastapi.responses import JSONResponse, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, requests_limit: int, window_seconds: int):
-        super().__init__(app)
+def header_token_matches(value: str | None, token: str) -> bool:
+    """Compare a request header with a configured secret in constant time.
+
+    Starlette decodes header bytes as latin-1, so the value is turned back into the
+    bytes the client sent and compared with the UTF-8 secret. Comparing ``str``
+    values raises ``TypeError`` on non-ASCII input.
+    """
+    if not value or not token:
+        return False
+    return secrets.compare_digest(value.encode("latin-1"), token.encode("utf-8"))
+
+
+class SlidingWindowRateLimiter:
+    """Per-key sliding-window limiter whose key table stays bounded.
+
+    Buckets idle for a full window are swept at most once per window, and at
+    most ``max_keys`` keys are tracked, so clients that are never seen again do
+    not accumulate. Every call, allowed or not, marks its key as recently seen
+    and the least recently seen key is dropped first, so a client that keeps
+    hitting its limit is never evicted in favour of idle ones and handed a fresh
+    window.
+    """
+
+    def __init__(self, requests_limit: int, window_seconds: float, max_keys: int = 100_000):
         self.requests_limit = requests_limit
         self.window_seconds = window_seconds
-        self._buckets: dict[str, deque[float]] = defaultdict(deque)
+        self.max_keys = max(1, max_keys)
+        self._buckets: OrderedDict[str, deque[float]] = OrderedDict()
+        self._last_sweep = 0.0
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        client_ip = request.client.host if request.client else "unknown"
-        now = time.time()
-        bucket = self._buckets[client_ip]
+    def allow(self, key: str, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        if now - self._last_sweep > self.window_seconds:
+            self._sweep(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+            bucket = self._buckets[key] = deque()
+        else:
+            self._buckets.move_to_end(key)
 
         while bucket and now - bucket[0] > self.window_seconds:
             bucket.popleft()
 
         if len(bucket) >= self.requests_limit:
+            return False
+
+        bucket.append(now)
+        return True
+
+    def _sweep(self, now: float) -> None:
+        self._last_sweep = now
+        expired = [
+            key
+            for key, bucket in self._buckets.items()
+            if not bucket or now - bucket[-1] > self.window_seconds
+        ]
+        for key in expired:
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, requests_limit: int, window_seconds: int, max_clients: int = 100_000):
+        super().__init__(app)
+        self.requests_limit = requests_limit
+        self.window_seconds = window_seconds
+        self._limiter = SlidingWindowRateLimiter(requests_limit, window_seconds, max_clients)
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        client_ip = request.client.host if request.client else "unknown"
+
+        if not self._limiter.allow(client_ip):
             return JSONResponse(
                 status_code=429,
                 content={
@@ -37,7 +99,6 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 },
             )
 
-        bucket.append(now)
         return await call_next(request)
 
 
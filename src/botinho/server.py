@@ -0,0 +1,98 @@
+"""Uvicorn launch profiles for development and multi-worker production."""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+from pathlib import Path
+from typing import IO, Any
+
+from .settings import Settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Exported by the launcher so every worker knows how many siblings share the box.
+WORKERS_ENV = "BOTINHO_SERVER_WORKERS"
+
+# Slot locks held by this process for its lifetime, by the path they were claimed for.
+_slot_locks: dict[Path, tuple[int, IO[bytes]]] = {}
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects affinity masks / container cpusets)."""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def resolve_workers(configured: int) -> int:
+    return configured if configured > 0 else available_cpus()
+
+
+def per_worker_path(path: Path, workers: int) -> Path:
+    """Give each worker its own file when several processes would share ``path``.
+
+    Appending and rotating one file from several processes interleaves batches
+    and races the rename, so ``logs/audit.jsonl`` becomes ``logs/audit.<slot>.jsonl``
+    in multi-worker mode. The slot is the lowest one whose lock no live process
+    holds, so a worker restarted by Uvicorn takes over the file of the one it
+    replaces instead of starting a new one. Without ``fcntl`` (Windows) the pid
+    is used instead.
+    """
+    if workers <= 1:
+        return path
+    if fcntl is None:
+        return path.with_name(f"{path.stem}.{os.getpid()}{path.suffix}")
+    return path.with_name(f"{path.stem}.{claim_worker_slot(path)}{path.suffix}")
+
+
+def claim_worker_slot(path: Path) -> int:
+    """Lock the lowest free slot for ``path`` and hold it until this process exits."""
+    claimed = _slot_locks.get(path)
+    if claimed is not None:
+        return claimed[0]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    slot = 0
+    while True:
+        handle = path.with_name(f".{path.name}.{slot}.lock").open("ab")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            slot += 1
+            continue
+        _slot_locks[path] = (slot, handle)
+        return slot
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def uvicorn_options(settings: Settings) -> dict[str, Any]:
+    """Keyword arguments for ``uvicorn.run`` for the configured environment.
+
+    Development keeps a single auto-reloading process. Production runs one worker
+    per available CPU (or ``BOTINHO_SERVER_WORKERS``) on uvloop and httptools when
+    installed, with keep-alive, backlog and concurrency limits from settings, and
+    waits up to ``BOTINHO_SERVER_GRACEFUL_SHUTDOWN_SECONDS`` for in-flight
+    requests before stopping.
+    """
+    options: dict[str, Any] = {"host": settings.host, "port": settings.port}
+    if settings.environment != "production":
+        return {**options, "reload": settings.environment == "development"}
+
+    return {
+        **options,
+        "workers": resolve_workers(settings.server_workers),
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "backlog": settings.server_backlog,
+        "timeout_keep_alive": settings.server_keep_alive_seconds,
+        "limit_concurrency": settings.server_limit_concurrency or None,
+        "timeout_graceful_shutdown": settings.server_graceful_shutdown_seconds,
+        "access_log": settings.server_access_log,
+    }
@@ -2,17 +2,30 @@
 
 from __future__ import annotations
 
+import asyncio
+import importlib.util
 import logging
 import re
 import textwrap
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterable
+from contextlib import aclosing
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from inspect import isawaitable
-from time import monotonic
+from time import monotonic, time
 from typing import Any
 from uuid import uuid4
 
-from ..knowledge_base import CATEGORY_KEYWORDS, KNOWLEDGE_BASE, SYNONYMS
-from ..models import ConversationData, ConversationMessage
+from ..audit import AuditLog
+from ..history import ConversationData
+from ..knowledge_index import MappedKnowledgeMatcher
+from ..logging_config import ThrottledLogger
+from ..tracing import SPAN_KIND_CLIENT, Tracer
+from ..usage import TurnUsage, UsageLedger, top_sessions
+from .knowledge_matcher import KnowledgeMatch, KnowledgeMatcher
+from .router import ModelRouter, Route
+from .scheduler import QuotaScheduler
 
 try:
     from google import genai
@@ -21,6 +34,11 @@ except ImportError:  # pragma: no cover
     genai = None
     genai_types = None
 
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
 
 # -- System instruction --------------------------------------------------------
 _SYSTEM_INSTRUCTION = textwrap.dedent("""\
@@ -50,17 +68,115 @@ _GENERATION_CONFIG: dict[str, Any] = {
 
 
 class GeminiClient:
-    def __init__(self, api_key: str, model_name: str) -> None:
+    """Thin wrapper over ``genai.Client`` with model fallback and an owned HTTP pool.
+
+    The SDK client is created by ``start`` (called from the app lifespan) on top of
+    an ``httpx.AsyncClient`` sized by ``pool_size`` with keep-alive, HTTP/2 when the
+    ``h2`` package is installed and explicit timeouts. ``start(warm_up=True)``
+    pre-opens connections so the first user request does not pay for TLS setup;
+    ``close`` releases the pool on shutdown. Without ``start`` the client is built
+    lazily on first use.
+
+    With ``context_cache=True`` the system instruction (and ``cached_knowledge``,
+    when given) is stored once per model as a Gemini cached-content resource that
+    chats reference instead of re-sending it. Caches are refreshed shortly before
+    their TTL expires; when creation fails (SDK without caching, prompt below the
+    model's minimum cacheable size, quota) chats fall back to inline instructions
+    and creation is retried after ``cache_retry_seconds``.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str,
+        pool_size: int = 32,
+        keepalive_expiry: float = 120.0,
+        connect_timeout: float = 5.0,
+        request_timeout: float = 60.0,
+        http2: bool = True,
+        logger: logging.Logger | None = None,
+        context_cache: bool = False,
+        cache_ttl_seconds: int = 3600,
+        cached_knowledge: str | None = None,
+        cache_retry_seconds: float = 300.0,
+    ) -> None:
         self.model_name = model_name
         self._fallback_models = self._build_model_candidates(model_name)
         self._model_index = 0
+        self._api_key = api_key
         self._has_api_key = bool(api_key)
         self._has_sdk = bool(genai)
         self.available = bool(self._has_api_key and self._has_sdk)
+        self.pool_size = max(1, pool_size)
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.logger = logger or logging.getLogger("botinho.gemini")
         self._client = None
+        self._http_client = None
+        self.context_cache = context_cache and hasattr(genai_types, "CreateCachedContentConfig")
+        self.cache_ttl_seconds = max(60, cache_ttl_seconds)
+        self.cached_knowledge = cached_knowledge
+        self.cache_retry_seconds = cache_retry_seconds
+        self._caches: dict[str, tuple[str, float]] = {}
+        self._cache_retry_at: dict[str, float] = {}
+        self._cache_lock = asyncio.Lock()
 
-        if self.available:
-            self._client = genai.Client(api_key=api_key)
+    async def start(self, warm_up: bool = False, warm_up_connections: int = 1) -> None:
+        if not self.available:
+            return
+        if self._client is None:
+            self._client = self._build_client()
+        if warm_up:
+            await self.warm_up(warm_up_connections)
+
+    async def warm_up(self, connections: int = 1) -> None:
+        """Open pooled connections with cheap metadata calls (no generation quota)."""
+        if self._client is None:
+            return
+        connections = max(1, min(connections, self.pool_size))
+        results = await asyncio.gather(
+            *(self._client.aio.models.get(model=self.model_name) for _ in range(connections)),
+            return_exceptions=True,
+        )
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            self.logger.warning("Aquecimento do cliente Gemini falhou: %s", failures[0])
+        else:
+            self.logger.info("Cliente Gemini aquecido (%d conexões).", connections)
+
+    async def close(self) -> None:
+        await self._delete_caches()
+        client, self._client = self._client, None
+        http_client, self._http_client = self._http_client, None
+        if client is not None:
+            aio_close = getattr(getattr(client, "aio", None), "aclose", None)
+            if aio_close is not None:
+                await aio_close()
+            if hasattr(client, "close"):
+                client.close()
+        if http_client is not None and not http_client.is_closed:
+            await http_client.aclose()
+
+    def _build_client(self) -> Any:
+        http_options: dict[str, Any] = {"timeout": int(self.request_timeout * 1000)}
+        http_option_fields = getattr(genai_types.HttpOptions, "model_fields", {})
+        if httpx is not None and "httpx_async_client" in http_option_fields:
+            self._http_client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self.request_timeout, connect=self.connect_timeout),
+            )
+            http_options["httpx_async_client"] = self._http_client
+        return genai.Client(
+            api_key=self._api_key,
+            http_options=genai_types.HttpOptions(**http_options),
+        )
 
     @staticmethod
     def _build_model_candidates(primary_model: str) -> list[str]:
@@ -85,8 +201,100 @@ class GeminiClient:
         self.model_name = self._fallback_models[self._model_index]
         return True
 
-    async def create_chat(self, history: list[Any]) -> Any:
-        """Create an async Gemini chat session pre-loaded with history."""
+    # -- Context cache ---------------------------------------------------------
+
+    async def _cached_content(self, model: str) -> str | None:
+        """Return a live cache name for ``model``, creating or extending it if due."""
+        if not self.context_cache or self._client is None:
+            return None
+        now = monotonic()
+        if self._cache_retry_at.get(model, 0.0) > now:
+            return None
+        cached = self._caches.get(model)
+        refresh_margin = min(300.0, self.cache_ttl_seconds / 4)
+        if cached is not None and cached[1] - refresh_margin > now:
+            return cached[0]
+
+        async with self._cache_lock:
+            cached = self._caches.get(model)
+            if cached is not None and cached[1] - refresh_margin > monotonic():
+                return cached[0]
+            ttl = f"{self.cache_ttl_seconds}s"
+            try:
+                if cached is not None and cached[1] > monotonic():
+                    await self._client.aio.caches.update(
+                        name=cached[0], config=genai_types.UpdateCachedContentConfig(ttl=ttl)
+                    )
+                    name = cached[0]
+                else:
+                    contents = None
+                    if self.cached_knowledge:
+                        contents = [
+                            genai_types.Content(
+                                role="user",
+                                parts=[genai_types.Part.from_text(text=self.cached_knowledge)],
+                            )
+                        ]
+                    created = await self._client.aio.caches.create(
+                        model=model,
+                        config=genai_types.CreateCachedContentConfig(
+                            system_instruction=_SYSTEM_INSTRUCTION,
+                            contents=contents,
+                            ttl=ttl,
+                            display_name="botinho-context",
+                        ),
+                    )
+                    name = created.name
+                    self.logger.info("Cache de contexto Gemini criado para %s: %s", model, name)
+            except Exception as exc:  # noqa: BLE001
+                self._caches.pop(model, None)
+                self._cache_retry_at[model] = monotonic() + self.cache_retry_seconds
+                self.logger.warning(
+                    "Cache de contexto indisponível para %s; usando instruções inline. erro=%s",
+                    model,
+                    str(exc)[:300],
+                )
+                return None
+            self._caches[model] = (name, monotonic() + self.cache_ttl_seconds)
+            return name
+
+    async def _delete_caches(self) -> None:
+        caches, self._caches = self._caches, {}
+        if self._client is None:
+            return
+        for name, _expires_at in caches.values():
+            try:
+                await self._client.aio.caches.delete(name=name)
+            except Exception as exc:  # noqa: BLE001
+                self.logger.info("Falha ao remover cache de contexto %s: %s", name, exc)
+
+    async def create_chat(
+        self,
+        history: list[Any],
+        model: str | None = None,
+        generation_overrides: dict[str, Any] | None = None,
+    ) -> Any:
+        """Create an async Gemini chat session pre-loaded with history.
+
+        ``model`` and ``generation_overrides`` come from the router; by default the
+        current model of the fallback chain and ``_GENERATION_CONFIG`` are used.
+        """
+        chat, _knowledge_cached = await self.open_chat(history, model, generation_overrides)
+        return chat
+
+    async def open_chat(
+        self,
+        history: list[Any],
+        model: str | None = None,
+        generation_overrides: dict[str, Any] | None = None,
+    ) -> tuple[Any, bool]:
+        """``create_chat`` that also reports whether the chat references the cached KB.
+
+        The cache is resolved (created or refreshed) here, so the answer holds for
+        this chat even when a refresh fails and it falls back to inline instructions.
+        """
+        if self.available and self._client is None:
+            self._client = self._build_client()
         if not self.available or not self._client:
             if not self._has_api_key:
                 reason = "configure GEMINI_API_KEY"
@@ -98,110 +306,411 @@ class GeminiClient:
                 f"Gemini indisponivel: {reason} para habilitar respostas de IA."
             )
 
+        model = model or self.model_name
+        generation = {**_GENERATION_CONFIG, **(generation_overrides or {})}
         config = None
+        cache_name = None
         if genai_types:
-            config = genai_types.GenerateContentConfig(
-                system_instruction=_SYSTEM_INSTRUCTION,
-                **_GENERATION_CONFIG,
-            )
+            cache_name = await self._cached_content(model)
+            if cache_name:
+                config = genai_types.GenerateContentConfig(cached_content=cache_name, **generation)
+            else:
+                config = genai_types.GenerateContentConfig(
+                    system_instruction=_SYSTEM_INSTRUCTION,
+                    **generation,
+                )
 
         chat = self._client.aio.chats.create(
-            model=self.model_name,
+            model=model,
             config=config,
             history=history,
         )
         if isawaitable(chat):
-            return await chat
-        return chat
+            chat = await chat
+        return chat, bool(cache_name and self.cached_knowledge)
+
+
+@dataclass(slots=True)
+class _Turn:
+    message: str
+    session_id: str
+    conversation: ConversationData
+    category: str
+    knowledge: str | None
+    continues_topic: bool
+    fast_path: bool
+    route: Route | None = None
+    served_model: str | None = None
+    over_budget: bool = False
+    usage: TurnUsage | None = None
+
+
+async def _single_chunk(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def _aiter(stream: AsyncIterator[Any] | Iterable[Any]) -> AsyncIterator[Any]:
+    if hasattr(stream, "__aiter__"):
+        try:
+            async for item in stream:
+                yield item
+        finally:
+            # Closing early (cancelled turn) must release the upstream response too.
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+    else:
+        for item in stream:
+            yield item
+
+
+BUDGET_ROUTE = "budget"
+BUDGET_FALLBACK_MODEL = "token-budget-fallback"
 
 
 class ChatService:
-    def __init__(self, model_client: GeminiClient, logger: logging.Logger | None = None) -> None:
+    def __init__(
+        self,
+        model_client: GeminiClient,
+        logger: logging.Logger | None = None,
+        audit_log: AuditLog | None = None,
+        knowledge_matcher: KnowledgeMatcher | MappedKnowledgeMatcher | None = None,
+        fast_path_thresholds: dict[str, float] | None = None,
+        fast_path_max_words: int = 12,
+        scheduler: QuotaScheduler | None = None,
+        history_capacity: int = 20,
+        max_sessions: int = 100_000,
+        session_ttl_seconds: float = 86_400.0,
+        router: ModelRouter | None = None,
+        tracer: Tracer | None = None,
+        upstream_log_interval: float = 60.0,
+        max_error_chars: int = 300,
+        session_token_budget: int = 0,
+        budget_mode: str = "fallback",
+        budget_model: str = "gemini-2.0-flash-lite",
+    ) -> None:
         self.model_client = model_client
         self.logger = logger or logging.getLogger("botinho.chat")
-        self.conversations: dict[str, ConversationData] = {}
+        self.upstream_warnings = ThrottledLogger(
+            self.logger, interval=upstream_log_interval, max_chars=max_error_chars
+        )
+        self.audit_log = audit_log
+        self.knowledge_matcher = knowledge_matcher or KnowledgeMatcher()
+        self.fast_path_thresholds = fast_path_thresholds or {}
+        self.fast_path_max_words = fast_path_max_words
+        self.scheduler = scheduler
+        self.router = router
+        self.history_capacity = history_capacity
+        self.max_sessions = max(1, max_sessions)
+        self.session_ttl_seconds = session_ttl_seconds
+        self.evicted_sessions = 0
+        self._next_idle_sweep = 0.0
+        self.tracer = tracer or Tracer()
+        self.total_turns = 0
+        self.fast_path_turns = 0
+        self.cancelled_turns = 0
+        self.cancelled_upstream_calls = 0
+        self.session_token_budget = session_token_budget
+        self.budget_mode = budget_mode
+        self.budget_route = Route(BUDGET_ROUTE, budget_model)
+        self.budget_limited_turns = 0
+        self.usage = UsageLedger()
+        # Least recently placed first; eviction scans look only at the front.
+        self.conversations: OrderedDict[str, ConversationData] = OrderedDict()
         self._gemini_cooldown_until = 0.0
         self._gemini_cooldown_logged = False
 
     # -- Session management ----------------------------------------------------
 
     def get_or_create_conversation(self, session_id: str | None) -> tuple[str, ConversationData]:
+        """Return the session, creating it if needed, and mark it as recently used.
+
+        Creating a session first drops those idle (no turn) for longer than
+        ``session_ttl_seconds``, then keeps at most ``max_sessions``, evicting a
+        session that was not used since it reached the front of the store. This is
+        the CLOCK approximation of LRU: a lookup only sets a flag, and sessions
+        are moved to the back when an eviction scan finds the flag set.
+        """
         resolved = session_id or f"session_{uuid4()}"
-        if resolved not in self.conversations:
-            self.conversations[resolved] = ConversationData(criado_em=datetime.now(timezone.utc))
-        return resolved, self.conversations[resolved]
+        conversation = self.conversations.get(resolved)
+        if conversation is not None:
+            conversation.recently_used = True
+            return resolved, conversation
+
+        now = time()
+        if now >= self._next_idle_sweep:
+            self._evict_idle_sessions(now)
+        while len(self.conversations) >= self.max_sessions:
+            oldest_id, oldest = self.conversations.popitem(last=False)
+            if oldest.recently_used:
+                oldest.recently_used = False
+                self.conversations[oldest_id] = oldest
+            else:
+                self.evicted_sessions += 1
+        conversation = ConversationData(criado_em=now, history_capacity=self.history_capacity)
+        self.conversations[resolved] = conversation
+        return resolved, conversation
+
+    def _evict_idle_sessions(self, now: float) -> None:
+        # At most once per second, so bursts of new sessions do not rescan the front.
+        self._next_idle_sweep = now + 1.0
+        if self.session_ttl_seconds <= 0:
+            return
+        cutoff = now - self.session_ttl_seconds
+        while self.conversations:
+            session_id, conversation = next(iter(self.conversations.items()))
+            if conversation.atualizado_em <= cutoff:
+                del self.conversations[session_id]
+                self.evicted_sessions += 1
+            elif conversation.recently_used:
+                conversation.recently_used = False
+                self.conversations.move_to_end(session_id)
+            else:
+                break
 
     # -- Category / knowledge helpers ------------------------------------------
 
     def detect_category(self, message: str) -> str:
-        normalized = self._normalize(message)
-        for category, keywords in CATEGORY_KEYWORDS.items():
-            if any(keyword in normalized for keyword in keywords):
-                return category
-        for base_term, aliases in SYNONYMS.items():
-            if any(alias in normalized for alias in aliases):
-                if base_term == "senha":
-                    return "procedimentos_ti"
-                if base_term in {"wifi", "email", "impressora", "sistema_lento"}:
-                    return "problemas_tecnicos"
-        return "conversa_geral"
+        return self.knowledge_matcher.detect_category(self._normalize(message))
 
     def search_knowledge(self, message: str) -> str | None:
-        normalized = self._normalize(message)
-        for _cat, topics in KNOWLEDGE_BASE.items():
-            for topic_key, topic_value in topics.items():
-                if any(token in normalized for token in topic_key.split("_")):
-                    return topic_value
-                if topic_key == "reset_senha" and any(
-                    alias in normalized for alias in SYNONYMS["senha"]
-                ):
-                    return topic_value
-                if topic_key == "wifi" and any(
-                    alias in normalized for alias in SYNONYMS["wifi"]
-                ):
-                    return topic_value
-                if topic_key == "email_lento" and any(
-                    alias in normalized for alias in SYNONYMS["email"]
-                ):
-                    return topic_value
-        return None
+        match = self.match_knowledge(message)
+        return match.text if match else None
+
+    def match_knowledge(self, message: str) -> KnowledgeMatch | None:
+        return self.knowledge_matcher.match(self._normalize(message))
+
+    def _should_use_fast_path(
+        self, message: str, match: KnowledgeMatch | None, conversation: ConversationData
+    ) -> bool:
+        """Serve a templated KB answer for confident, simple first questions."""
+        if match is None or conversation.historico:
+            return False
+        threshold = self.fast_path_thresholds.get(match.category)
+        if threshold is None or match.confidence < threshold:
+            return False
+        return len(message.split()) <= self.fast_path_max_words
 
     # -- Main conversation entry point -----------------------------------------
 
     async def converse(self, message: str, session_id: str | None = None) -> dict[str, Any]:
-        session_id, conversation = self.get_or_create_conversation(session_id)
-        category = self.detect_category(message)
-        knowledge = self.search_knowledge(message)
-        last_category = conversation.ultima_categoria
-        continues_topic = bool(
-            last_category and last_category == category and category != "conversa_geral"
-        )
+        with self.tracer.span("chat.converse"):
+            turn = self._start_turn(message, session_id)
+            if turn.fast_path:
+                response = self._local_fallback(turn.knowledge)
+            elif self._budget_fallback_applies(turn):
+                response = self._budget_fallback(turn)
+            else:
+                self._route(turn)
+                started = monotonic()
+                with self.tracer.span("chat.generate", {"chat.route": self._route_name(turn)}):
+                    try:
+                        response = await self._generate_response(
+                            message,
+                            turn.knowledge,
+                            turn.conversation,
+                            session_id=turn.session_id,
+                            turn=turn,
+                        )
+                    except asyncio.CancelledError:
+                        # The client went away: nothing is written to history.
+                        self.cancelled_turns += 1
+                        raise
+                self._record_route(turn, started)
+            return self._finish_turn(turn, response)
 
-        response = await self._generate_response(message, knowledge, conversation)
+    async def converse_stream(
+        self, message: str, session_id: str | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Stream a turn as ``chunk`` events followed by one ``done`` event.
 
-        conversation.historico.append(
-            ConversationMessage(
-                usuario=message,
-                bot=response,
-                categoria=category,
-                timestamp=datetime.now(timezone.utc),
+        The ``done`` event carries the same payload as ``converse``. History is
+        only written once the full response has been produced, so a stream that
+        is cancelled or closed early leaves no turn behind.
+        """
+        turn = self._start_turn(message, session_id)
+        parts: list[str] = []
+        if turn.fast_path:
+            chunks: AsyncIterator[str] = _single_chunk(self._local_fallback(turn.knowledge))
+        elif self._budget_fallback_applies(turn):
+            chunks = _single_chunk(self._budget_fallback(turn))
+        else:
+            self._route(turn)
+            chunks = self._stream_response(
+                message, turn.knowledge, turn.conversation, session_id=turn.session_id, turn=turn
             )
-        )
-        conversation.historico = conversation.historico[-20:]
-        conversation.ultima_categoria = category
+        started = monotonic()
+        with self.tracer.span(
+            "chat.generate", {"chat.streaming": True, "chat.route": self._route_name(turn)}
+        ):
+            try:
+                async with aclosing(chunks):
+                    async for chunk in chunks:
+                        parts.append(chunk)
+                        yield {"type": "chunk", "text": chunk}
+            except (asyncio.CancelledError, GeneratorExit):
+                self.cancelled_turns += 1
+                raise
+        self._record_route(turn, started)
+        yield {"type": "done", **self._finish_turn(turn, "".join(parts).strip())}
 
-        return {
+    def _start_turn(self, message: str, session_id: str | None) -> _Turn:
+        with self.tracer.span("chat.classify") as span:
+            session_id, conversation = self.get_or_create_conversation(session_id)
+            normalized = self._normalize(message)
+            category = self.knowledge_matcher.detect_category(normalized)
+            match = self.knowledge_matcher.match(normalized)
+            last_category = conversation.ultima_categoria
+            turn = _Turn(
+                message=message,
+                session_id=session_id,
+                conversation=conversation,
+                category=category,
+                knowledge=match.text if match else None,
+                continues_topic=bool(
+                    last_category and last_category == category and category != "conversa_geral"
+                ),
+                fast_path=self._should_use_fast_path(message, match, conversation),
+                over_budget=(
+                    self.session_token_budget > 0
+                    and conversation.tokens_used() >= self.session_token_budget
+                ),
+            )
+            span.set_attribute("chat.category", category)
+            span.set_attribute("chat.knowledge_hit", match is not None)
+            span.set_attribute("chat.fast_path", turn.fast_path)
+            return turn
+
+    # -- Model routing ---------------------------------------------------------
+
+    def _route(self, turn: _Turn) -> None:
+        if turn.over_budget:
+            # Only reached in "cheapest" mode; "fallback" never calls the model.
+            self.budget_limited_turns += 1
+            turn.route = self.budget_route
+        elif self.router is not None:
+            turn.route = self.router.route(
+                turn.message,
+                turn.category,
+                knowledge_hit=turn.knowledge is not None,
+                history_depth=len(turn.conversation.historico),
+            )
+
+    @staticmethod
+    def _route_name(turn: _Turn) -> str:
+        return turn.route.name if turn.route is not None else "default"
+
+    def _record_route(self, turn: _Turn, started: float) -> None:
+        if self.router is None or turn.route is None or turn.route is self.budget_route:
+            return
+        ok = turn.route.model is None or turn.served_model == turn.route.model
+        self.router.record(turn.route, monotonic() - started, ok=ok)
+
+    # -- Token budgets ---------------------------------------------------------
+
+    def _budget_fallback_applies(self, turn: _Turn) -> bool:
+        return turn.over_budget and self.budget_mode == "fallback"
+
+    def _budget_fallback(self, turn: _Turn) -> str:
+        self.budget_limited_turns += 1
+        turn.served_model = BUDGET_FALLBACK_MODEL
+        return self._local_fallback(turn.knowledge)
+
+    @staticmethod
+    def _start_usage(turn: _Turn | None, model: str) -> TurnUsage | None:
+        if turn is None:
+            return None
+        if turn.usage is None:
+            turn.usage = TurnUsage(model)
+        return turn.usage
+
+    async def _create_chat(
+        self, conversation: ConversationData, route: Route | None
+    ) -> tuple[Any, bool]:
+        """The chat plus whether it already carries the whole KB through a context cache."""
+        history = self._build_gemini_history(conversation)
+        options: dict[str, Any] = {}
+        if route is not None:
+            options = {"model": route.model, "generation_overrides": route.generation_overrides}
+        open_chat = getattr(self.model_client, "open_chat", None)
+        if open_chat is not None:
+            return await open_chat(history, **options)
+        return await self.model_client.create_chat(history, **options), False
+
+    def fallback_reply(self, message: str, session_id: str | None = None) -> dict[str, Any]:
+        """Answer from the knowledge base only, without touching the model client."""
+        turn = self._start_turn(message, session_id)
+        response = self._local_fallback(turn.knowledge)
+        return self._finish_turn(turn, response, model="load-shed-fallback")
+
+    def _finish_turn(self, turn: _Turn, response: str, model: str | None = None) -> dict[str, Any]:
+        conversation = turn.conversation
+        self.total_turns += 1
+        self.fast_path_turns += int(turn.fast_path)
+
+        conversation.add_turn(turn.message, response, turn.category, usage=turn.usage)
+        if turn.usage is not None:
+            self.usage.add(turn.usage, turn.category)
+
+        if model is None:
+            model = turn.served_model or self._response_model(turn)
+
+        result = {
             "response": response,
-            "confidence": 0.9 if knowledge else 0.7,
-            "context_found": bool(knowledge),
-            "continues_topic": continues_topic,
-            "session_id": session_id,
+            "confidence": 0.9 if turn.knowledge else 0.7,
+            "context_found": bool(turn.knowledge),
+            "continues_topic": turn.continues_topic,
+            "session_id": turn.session_id,
             "timestamp": datetime.now(timezone.utc),
-            "model": (
-                self.model_client.model_name
-                if self.model_client.available
-                else "knowledge-base-fallback"
-            ),
+            "model": model,
+            "usage": turn.usage.to_dict() if turn.usage is not None else None,
+        }
+        if self.audit_log is not None:
+            self.audit_log.record(
+                {
+                    "timestamp": result["timestamp"].isoformat(),
+                    "session_id": turn.session_id,
+                    "category": turn.category,
+                    "context_found": result["context_found"],
+                    "model": result["model"],
+                    "usage": result["usage"],
+                    "message": turn.message,
+                    "response": response,
+                }
+            )
+        return result
+
+    def _response_model(self, turn: _Turn) -> str:
+        if turn.fast_path:
+            return "knowledge-base-fast-path"
+        if self.model_client.available:
+            return self.model_client.model_name
+        return "knowledge-base-fallback"
+
+    def usage_stats(self, top: int = 10) -> dict[str, Any]:
+        sessions = ((session_id, conv.usage) for session_id, conv in self.conversations.items())
+        return {
+            **self.usage.to_dict(),
+            "top_sessions": top_sessions(sessions, top),
+            "budget": {
+                "session_token_budget": self.session_token_budget,
+                "mode": self.budget_mode,
+                "limited_turns": self.budget_limited_turns,
+            },
+        }
+
+    def cancellation_stats(self) -> dict[str, int]:
+        return {
+            "turns": self.cancelled_turns,
+            "upstream_calls": self.cancelled_upstream_calls,
+        }
+
+    def fast_path_stats(self) -> dict[str, Any]:
+        ratio = self.fast_path_turns / self.total_turns if self.total_turns else 0.0
+        return {
+            "turns": self.total_turns,
+            "fast_path_turns": self.fast_path_turns,
+            "fast_path_ratio": round(ratio, 4),
         }
 
     # -- Response generation ---------------------------------------------------
@@ -211,7 +720,7 @@ class ChatService:
         if not genai_types:
             return []
         history = []
-        for entry in conversation.historico[-10:]:
+        for entry in conversation.historico.last(10):
             history.append(
                 genai_types.Content(
                     role="user",
@@ -231,68 +740,236 @@ class ChatService:
         message: str,
         knowledge: str | None,
         conversation: ConversationData,
+        session_id: str = "",
+        turn: _Turn | None = None,
     ) -> str:
-        user_turn = message
-        if knowledge:
-            user_turn = (
-                f"{message}\n\n"
-                f"[Contexto da base de conhecimento corporativo: {knowledge}]"
-            )
-
         if self._is_gemini_in_cooldown():
-            return self._local_fallback(knowledge)
+            return self._local_answer(knowledge, turn)
 
-        for _attempt in range(4):
-            try:
-                history = self._build_gemini_history(conversation)
-                chat = await self.model_client.create_chat(history)
-                result = chat.send_message(message=user_turn)
-                if isawaitable(result):
-                    result = await result
-                text = (result.text or "").strip()
-                if text:
-                    return text
-            except Exception as exc:  # pragma: no cover
-                error_text = str(exc)
-                if self._is_quota_error(error_text):
-                    if (
-                        hasattr(self.model_client, "try_next_model")
-                        and self.model_client.try_next_model()
-                    ):
-                        self.logger.warning(
-                            "Quota no modelo atual. Tentando fallback de modelo Gemini: %s",
-                            self.model_client.model_name,
-                        )
+        route = turn.route if turn is not None and turn.route and turn.route.model else None
+        for attempt in range(4):
+            model = route.model if route is not None else self.model_client.model_name
+            with self.tracer.span(
+                "gemini.attempt",
+                {"gen_ai.request.model": model, "gemini.attempt": attempt},
+                kind=SPAN_KIND_CLIENT,
+            ) as span:
+                if self.scheduler is not None and not await self.scheduler.acquire(
+                    model,
+                    session_id,
+                    self._estimate_prompt_tokens(
+                        self._build_user_turn(message, knowledge), conversation
+                    ),
+                ):
+                    span.set_attribute("gemini.outcome", "quota_queue_full")
+                    self.logger.info(
+                        "Fila de quota do modelo %s cheia. Usando fallback local.", model
+                    )
+                    break
+
+                usage = self._start_usage(turn, model)
+                started = monotonic()
+                try:
+                    chat, knowledge_cached = await self._create_chat(conversation, route)
+                    result = chat.send_message(
+                        message=self._build_user_turn(message, knowledge, knowledge_cached)
+                    )
+                    if isawaitable(result):
+                        result = await result
+                    text = (result.text or "").strip()
+                    if text:
+                        span.set_attribute("gemini.outcome", "ok")
+                        if turn is not None:
+                            turn.served_model = model
+                        if usage is not None:
+                            usage.model = model
+                            usage.record_response(result)
+                            span.set_attribute("gen_ai.usage.input_tokens", usage.prompt_tokens)
+                            span.set_attribute("gen_ai.usage.output_tokens", usage.output_tokens)
+                        return text
+                    span.set_attribute("gemini.outcome", "empty")
+                except asyncio.CancelledError:
+                    # Abandoned by the client; skips the remaining fallback attempts too.
+                    self.cancelled_upstream_calls += 1
+                    span.set_attribute("gemini.outcome", "cancelled")
+                    raise
+                except Exception as exc:  # pragma: no cover
+                    error_text = str(exc)
+                    span.set_attribute("error.type", type(exc).__name__)
+                    if route is self.budget_route:
+                        # Over budget: answer locally rather than spend on the default chain.
+                        span.set_attribute("gemini.outcome", "budget_route_failed")
+                        break
+                    if route is not None:
+                        # A routed (lighter) model failed: retry on the default chain.
+                        span.set_attribute("gemini.outcome", "route_failed")
+                        span.add_event("router.fallback", {"route": route.name, "model": model})
+                        route = None
                         continue
+                    if self._is_quota_error(error_text):
+                        span.set_attribute("gemini.outcome", "quota_exceeded")
+                        if self._switch_model("quota_exceeded", span):
+                            self.upstream_warnings.warning(
+                                f"quota-switch:{model}",
+                                "Quota no modelo %s. Tentando fallback de modelo Gemini: %s",
+                                model,
+                                self.model_client.model_name,
+                            )
+                            continue
+
+                        retry_seconds = self._extract_retry_seconds(error_text) or 60.0
+                        retry_seconds = max(10.0, min(retry_seconds, 600.0))
+                        self._gemini_cooldown_until = monotonic() + retry_seconds
+                        self._gemini_cooldown_logged = False
+                        self.upstream_warnings.warning(
+                            f"quota:{ThrottledLogger.signature(error_text)}",
+                            "Quota Gemini excedida. Fallback local por %.0fs.",
+                            retry_seconds,
+                            error_text=error_text,
+                        )
+                        break
 
-                    retry_seconds = self._extract_retry_seconds(error_text) or 60.0
-                    retry_seconds = max(10.0, min(retry_seconds, 600.0))
-                    self._gemini_cooldown_until = monotonic() + retry_seconds
-                    self._gemini_cooldown_logged = False
-                    self.logger.warning(
-                        "Quota Gemini excedida. Fallback local por %.0fs. erro=%s",
-                        retry_seconds,
-                        error_text,
+                    if self._is_not_found_error(error_text):
+                        span.set_attribute("gemini.outcome", "model_not_found")
+                        if self._switch_model("model_not_found", span):
+                            self.upstream_warnings.warning(
+                                f"not-found:{model}",
+                                "Modelo Gemini %s inválido ou indisponível. Tentando fallback: %s",
+                                model,
+                                self.model_client.model_name,
+                            )
+                            continue
+                    else:
+                        span.set_attribute("gemini.outcome", "error")
+
+                    self.upstream_warnings.warning(
+                        f"error:{ThrottledLogger.signature(error_text)}",
+                        "Falha ao consultar Gemini. Usando fallback local.",
+                        error_text=error_text,
                     )
                     break
+                finally:
+                    if usage is not None:
+                        usage.latency_ms += (monotonic() - started) * 1000
 
-                if (
-                    self._is_not_found_error(error_text)
-                    and hasattr(self.model_client, "try_next_model")
-                    and self.model_client.try_next_model()
-                ):
-                    self.logger.warning(
-                        "Modelo Gemini inválido ou indisponível. Tentando fallback: %s",
-                        self.model_client.model_name,
-                    )
-                    continue
+        return self._local_answer(knowledge, turn)
 
-                self.logger.warning(
-                    "Falha ao consultar Gemini. Usando fallback local. erro=%s", error_text
+    def _local_answer(self, knowledge: str | None, turn: _Turn | None) -> str:
+        if turn is not None and turn.route is self.budget_route:
+            turn.served_model = BUDGET_FALLBACK_MODEL
+        return self._local_fallback(knowledge)
+
+    def _switch_model(self, reason: str, span: Any) -> bool:
+        """Advance to the next fallback model, recording the switch on ``span``."""
+        previous = self.model_client.model_name
+        if not (
+            hasattr(self.model_client, "try_next_model") and self.model_client.try_next_model()
+        ):
+            return False
+        span.add_event(
+            "gemini.model_switch",
+            {"from": previous, "to": self.model_client.model_name, "reason": reason},
+        )
+        return True
+
+    async def _stream_response(
+        self,
+        message: str,
+        knowledge: str | None,
+        conversation: ConversationData,
+        session_id: str = "",
+        turn: _Turn | None = None,
+    ) -> AsyncIterator[str]:
+        """Yield response text chunks, degrading to ``_generate_response`` on failure.
+
+        Errors before the first chunk fall back to the buffered path, which owns
+        model fallback, cooldown and local answers. Errors mid-stream end the
+        stream with whatever was already produced.
+        """
+        if (
+            not self.model_client.available
+            or not hasattr(self.model_client, "create_chat")
+            or self._is_gemini_in_cooldown()
+        ):
+            yield await self._generate_response(
+                message, knowledge, conversation, session_id, turn=turn
+            )
+            return
+
+        route = turn.route if turn is not None and turn.route and turn.route.model else None
+        model = route.model if route is not None else self.model_client.model_name
+        if self.scheduler is not None and not await self.scheduler.acquire(
+            model,
+            session_id,
+            self._estimate_prompt_tokens(self._build_user_turn(message, knowledge), conversation),
+        ):
+            yield self._local_fallback(knowledge)
+            return
+
+        emitted = False
+        usage = self._start_usage(turn, model)
+        started = monotonic()
+        try:
+            chat, knowledge_cached = await self._create_chat(conversation, route)
+            if not hasattr(chat, "send_message_stream"):
+                raise RuntimeError("Sessão de chat sem suporte a streaming")
+            stream = chat.send_message_stream(
+                message=self._build_user_turn(message, knowledge, knowledge_cached)
+            )
+            if isawaitable(stream):
+                stream = await stream
+            async with aclosing(_aiter(stream)) as upstream:
+                async for chunk in upstream:
+                    if usage is not None:
+                        usage.record_response(chunk)
+                    text = getattr(chunk, "text", None) or ""
+                    if text:
+                        if not emitted and turn is not None:
+                            turn.served_model = model
+                            if usage is not None:
+                                usage.model = model
+                        emitted = True
+                        yield text
+        except (asyncio.CancelledError, GeneratorExit):
+            self.cancelled_upstream_calls += 1
+            raise
+        except Exception as exc:  # pragma: no cover
+            if emitted:
+                self.upstream_warnings.warning(
+                    f"stream:{ThrottledLogger.signature(str(exc))}",
+                    "Streaming Gemini interrompido.",
+                    error_text=str(exc),
                 )
-                break
+                return
+            self.logger.info(
+                "Streaming Gemini indisponível, usando resposta completa. erro=%s",
+                self.upstream_warnings.truncate(str(exc)),
+            )
+        finally:
+            if usage is not None:
+                usage.latency_ms += (monotonic() - started) * 1000
 
-        return self._local_fallback(knowledge)
+        if not emitted:
+            yield await self._generate_response(
+                message, knowledge, conversation, session_id, turn=turn
+            )
+
+    @staticmethod
+    def _build_user_turn(
+        message: str, knowledge: str | None, knowledge_cached: bool = False
+    ) -> str:
+        """The message plus its KB snippet, unless the chat's context cache holds the KB."""
+        if not knowledge or knowledge_cached:
+            return message
+        return f"{message}\n\n[Contexto da base de conhecimento corporativo: {knowledge}]"
+
+    @staticmethod
+    def _estimate_prompt_tokens(user_turn: str, conversation: ConversationData) -> int:
+        """Rough prompt size (~4 chars per token) used for TPM pacing."""
+        chars = len(_SYSTEM_INSTRUCTION) + len(user_turn)
+        recent = conversation.historico.last(10)
+        chars += sum(len(entry.usuario) + len(entry.bot) for entry in recent)
+        return chars // 4 + 1
 
     def _is_gemini_in_cooldown(self) -> bool:
         remaining = self._gemini_cooldown_until - monotonic()
@@ -0,0 +1,139 @@
+"""Precompiled keyword matcher over the corporate knowledge base."""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from ..knowledge_base import CATEGORY_KEYWORDS, KNOWLEDGE_BASE, SYNONYMS
+
+# Topics that also match through a synonym group (topic key -> SYNONYMS key).
+TOPIC_SYNONYMS: dict[str, str] = {
+    "reset_senha": "senha",
+    "wifi": "wifi",
+    "email_lento": "email",
+}
+
+# Synonym groups that imply a category when no category keyword matched.
+SYNONYM_CATEGORIES: dict[str, str] = {
+    "senha": "procedimentos_ti",
+    "wifi": "problemas_tecnicos",
+    "email": "problemas_tecnicos",
+    "impressora": "problemas_tecnicos",
+    "sistema_lento": "problemas_tecnicos",
+}
+
+_SYNONYM_CONFIDENCE = 0.8
+
+# Words that carry no topic of their own; they do not count against coverage.
+_FILLER_WORDS = frozenset(
+    "a à ao as o os um uma de da do das dos e em na no nas nos para pra por com como qual "
+    "quais que é eu me meu minha meus minhas se oi olá ola favor preciso gostaria sobre".split()
+)
+_WORD = re.compile(r"\w+")
+
+
+def message_coverage(normalized: str, terms: Iterable[str]) -> float:
+    """Share of the message's content words that contain, or are part of, a term it matched."""
+    found = [term for term in terms if term in normalized]
+    words = hits = 0
+    for word in _WORD.findall(normalized):
+        if word in _FILLER_WORDS:
+            continue
+        words += 1
+        for term in found:
+            if term in word or word in term:
+                hits += 1
+                break
+    return hits / words if words else 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class KnowledgeMatch:
+    category: str
+    topic: str
+    text: str
+    # Inputs of ``confidence``, which is scored on read: only the fast path needs it.
+    normalized: str = field(default="", repr=False, compare=False)
+    terms: tuple[str, ...] = field(default=(), repr=False, compare=False)
+    scale: float = field(default=1.0, repr=False, compare=False)
+
+    @property
+    def confidence(self) -> float:
+        return self.scale * message_coverage(self.normalized, self.terms)
+
+
+@dataclass(frozen=True, slots=True)
+class _CompiledTopic:
+    category: str
+    topic: str
+    text: str
+    tokens: tuple[str, ...]
+    aliases: tuple[str, ...]
+
+
+class KnowledgeMatcher:
+    """Keyword lookups over ``KNOWLEDGE_BASE`` with per-match confidence.
+
+    Matching keeps the substring semantics of the original inline scans (first
+    topic in knowledge-base order wins) but builds the term tuples once instead
+    of splitting topic keys and resolving synonyms on every message. Inputs are
+    expected to be normalized (lower-case, collapsed whitespace).
+
+    Confidence is the share of the message's content words covered by the
+    topic's tokens and synonyms, so "vpn" alone scores ``1.0`` but "minha vpn
+    não conecta" does not. Matches found only through synonyms are scaled by
+    ``0.8``.
+    """
+
+    def __init__(
+        self,
+        knowledge_base: dict[str, dict[str, str]] = KNOWLEDGE_BASE,
+        category_keywords: dict[str, set[str]] = CATEGORY_KEYWORDS,
+        synonyms: dict[str, set[str]] = SYNONYMS,
+    ) -> None:
+        self._categories: tuple[tuple[str, tuple[str, ...]], ...] = tuple(
+            (category, tuple(sorted(keywords))) for category, keywords in category_keywords.items()
+        )
+        self._synonym_categories: tuple[tuple[str, tuple[str, ...]], ...] = tuple(
+            (SYNONYM_CATEGORIES[base_term], tuple(sorted(aliases)))
+            for base_term, aliases in synonyms.items()
+            if base_term in SYNONYM_CATEGORIES
+        )
+        self._topics: tuple[_CompiledTopic, ...] = tuple(
+            _CompiledTopic(
+                category=category,
+                topic=topic_key,
+                text=topic_value,
+                tokens=tuple(topic_key.split("_")),
+                aliases=tuple(sorted(synonyms.get(TOPIC_SYNONYMS.get(topic_key, ""), ()))),
+            )
+            for category, topics in knowledge_base.items()
+            for topic_key, topic_value in topics.items()
+        )
+
+    def detect_category(self, normalized: str) -> str:
+        for category, keywords in self._categories:
+            if any(keyword in normalized for keyword in keywords):
+                return category
+        for category, aliases in self._synonym_categories:
+            if any(alias in normalized for alias in aliases):
+                return category
+        return "conversa_geral"
+
+    def match(self, normalized: str) -> KnowledgeMatch | None:
+        for topic in self._topics:
+            if any(token in normalized for token in topic.tokens):
+                terms = (*topic.tokens, *topic.aliases)
+                return KnowledgeMatch(topic.category, topic.topic, topic.text, normalized, terms)
+            if topic.aliases and any(alias in normalized for alias in topic.aliases):
+                return KnowledgeMatch(
+                    topic.category,
+                    topic.topic,
+                    topic.text,
+                    normalized,
+                    topic.aliases,
+                    _SYNONYM_CONFIDENCE,
+                )
+        return None
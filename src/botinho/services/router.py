@@ -0,0 +1,114 @@
+"""Per-request model routing from signals the chat service already computes."""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+DEFAULT_ROUTE = "default"
+
+# Greetings, thanks and acknowledgements; a greeting turn uses only these words.
+GREETING_WORDS = frozenset(
+    "oi olá ola opa eai aí ai e bom boa dia tarde noite tudo bem beleza blz tranquilo "
+    "obrigado obrigada brigado brigada muito grato grata valeu vlw ok okay certo entendi "
+    "perfeito ótimo otimo legal show joia jóia combinado tchau até ate logo mais hello hi "
+    "thanks bye".split()
+)
+_WORD = re.compile(r"\w+")
+
+
+def is_greeting(message: str) -> bool:
+    """True when every word of ``message`` is a greeting or acknowledgement."""
+    words = _WORD.findall(message.lower())
+    return bool(words) and all(word in GREETING_WORDS for word in words)
+
+
+@dataclass(frozen=True, slots=True)
+class Route:
+    """A routing decision: ``model=None`` keeps the client's current model chain."""
+
+    name: str
+    model: str | None = None
+    generation_overrides: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class _RouteStats:
+    decisions: int = 0
+    errors: int = 0
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=512))
+
+    def summary(self) -> dict[str, Any]:
+        ordered = sorted(self.latencies)
+
+        def percentile(fraction: float) -> float | None:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 1)
+
+        return {
+            "decisions": self.decisions,
+            "errors": self.errors,
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+        }
+
+
+class ModelRouter:
+    """Send simple turns to a lighter model with a smaller output budget.
+
+    ``greeting``: greetings, thanks and acknowledgements made only of
+    ``GREETING_WORDS``, early in the session. Other small talk may be a real
+    question ("explique o que é DNS") and is not truncated. ``knowledge``: short
+    questions with a knowledge-base hit early in the session. Everything else
+    takes the ``default`` route (primary model and its fallback chain).
+    Decisions and latency per route are kept for tuning.
+    """
+
+    def __init__(
+        self,
+        light_model: str = "gemini-2.0-flash-lite",
+        max_words: int = 12,
+        max_history: int = 2,
+        knowledge_max_output_tokens: int = 256,
+        greeting_max_output_tokens: int = 128,
+    ) -> None:
+        self.max_words = max_words
+        self.max_history = max_history
+        self._routes = {
+            "greeting": Route(
+                "greeting", light_model, {"max_output_tokens": greeting_max_output_tokens}
+            ),
+            "knowledge": Route(
+                "knowledge", light_model, {"max_output_tokens": knowledge_max_output_tokens}
+            ),
+            DEFAULT_ROUTE: Route(DEFAULT_ROUTE),
+        }
+        self._stats: dict[str, _RouteStats] = {name: _RouteStats() for name in self._routes}
+
+    def route(
+        self, message: str, category: str, knowledge_hit: bool, history_depth: int
+    ) -> Route:
+        simple = len(message.split()) <= self.max_words and history_depth <= self.max_history
+        if simple and category == "conversa_geral" and not knowledge_hit and is_greeting(message):
+            name = "greeting"
+        elif simple and knowledge_hit:
+            name = "knowledge"
+        else:
+            name = DEFAULT_ROUTE
+        self._stats[name].decisions += 1
+        return self._routes[name]
+
+    def record(self, route: Route, latency_seconds: float, ok: bool = True) -> None:
+        stats = self._stats[route.name]
+        stats.latencies.append(latency_seconds)
+        if not ok:
+            stats.errors += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            name: {"model": self._routes[name].model, **stats.summary()}
+            for name, stats in self._stats.items()
+        }
@@ -0,0 +1,194 @@
+"""Quota-aware scheduling of upstream Gemini calls with per-session fairness."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Any
+
+
+@dataclass(slots=True)
+class _Ticket:
+    session_id: str
+    tokens: int
+    future: asyncio.Future[None]
+
+
+@dataclass(slots=True)
+class _Lane:
+    """Request and token buckets for one model plus its per-session wait queues."""
+
+    request_rate: float
+    token_rate: float
+    request_capacity: float
+    token_capacity: float
+    requests: float
+    tokens: float
+    updated: float
+    waiting: OrderedDict[str, deque[_Ticket]] = field(default_factory=OrderedDict)
+    queued: int = 0
+    queued_tokens: int = 0
+    granted: int = 0
+    shed: int = 0
+    dispatcher: asyncio.Task[None] | None = None
+
+    def refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.updated)
+        self.updated = now
+        self.requests = min(self.request_capacity, self.requests + elapsed * self.request_rate)
+        self.tokens = min(self.token_capacity, self.tokens + elapsed * self.token_rate)
+
+    def wait_time(self, tokens: int) -> float:
+        tokens = min(tokens, int(self.token_capacity))
+        request_wait = max(0.0, (1 - self.requests) / self.request_rate)
+        token_wait = max(0.0, (tokens - self.tokens) / self.token_rate)
+        return max(request_wait, token_wait)
+
+    def take(self, tokens: int) -> None:
+        self.requests -= 1
+        self.tokens -= min(tokens, self.token_capacity)
+        self.granted += 1
+
+    def expected_wait(self, tokens: int) -> float:
+        """Time until a new request would be granted behind everything already queued."""
+        request_wait = (self.queued + 1 - self.requests) / self.request_rate
+        token_wait = (self.queued_tokens + tokens - self.tokens) / self.token_rate
+        return max(0.0, request_wait, token_wait)
+
+    def next_ticket(self) -> _Ticket | None:
+        """Pop the head ticket of the next session in round-robin order."""
+        while self.waiting:
+            session_id, tickets = next(iter(self.waiting.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                self.waiting.move_to_end(session_id)
+            else:
+                del self.waiting[session_id]
+            self.queued -= 1
+            self.queued_tokens -= ticket.tokens
+            if not ticket.future.done():
+                return ticket
+        return None
+
+    def peek_ticket(self) -> _Ticket | None:
+        while self.waiting:
+            tickets = next(iter(self.waiting.values()))
+            if not tickets[0].future.done():
+                return tickets[0]
+            self.next_ticket()
+        return None
+
+
+class QuotaScheduler:
+    """Pace upstream calls to each model's RPM/TPM limits.
+
+    Each model gets a request bucket and a token bucket refilled continuously at
+    ``limit / 60`` per second. Their capacity only covers ``burst_seconds`` worth
+    of quota, so a spike is smoothed across the minute instead of exhausting it in
+    the first seconds. Callers that cannot be served immediately wait in
+    per-session queues drained round-robin, so one chatty session cannot starve
+    the others. When the expected wait exceeds ``max_wait_seconds`` the call is
+    shed and ``acquire`` returns ``False`` so the caller can fall back locally.
+
+    Limits are per API key; with ``workers`` processes sharing one key, each
+    paces itself to its exact ``1 / workers`` share, even when that is less than
+    one request per minute.
+    """
+
+    def __init__(
+        self,
+        rpm_limits: dict[str, int] | None = None,
+        tpm_limits: dict[str, int] | None = None,
+        default_rpm: int = 15,
+        default_tpm: int = 1_000_000,
+        burst_seconds: float = 6.0,
+        max_wait_seconds: float = 8.0,
+        workers: int = 1,
+    ) -> None:
+        self.rpm_limits = rpm_limits or {}
+        self.tpm_limits = tpm_limits or {}
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.burst_seconds = burst_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.workers = max(1, workers)
+        self._lanes: dict[str, _Lane] = {}
+
+    async def acquire(self, model: str, session_id: str, tokens: int = 0) -> bool:
+        lane = self._lane(model)
+        lane.refill(monotonic())
+        if not lane.queued and lane.wait_time(tokens) <= 0:
+            lane.take(tokens)
+            return True
+
+        if lane.expected_wait(tokens) > self.max_wait_seconds:
+            lane.shed += 1
+            return False
+
+        ticket = _Ticket(session_id, tokens, asyncio.get_running_loop().create_future())
+        lane.waiting.setdefault(session_id, deque()).append(ticket)
+        lane.queued += 1
+        lane.queued_tokens += tokens
+        if lane.dispatcher is None or lane.dispatcher.done():
+            lane.dispatcher = asyncio.create_task(self._dispatch(lane))
+
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # Granted right before cancellation: give the slot back.
+                lane.requests += 1
+                lane.tokens += tokens
+                lane.granted -= 1
+            raise
+        return True
+
+    async def _dispatch(self, lane: _Lane) -> None:
+        while True:
+            ticket = lane.peek_ticket()
+            if ticket is None:
+                return
+            lane.refill(monotonic())
+            wait = lane.wait_time(ticket.tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            ticket = lane.next_ticket()
+            if ticket is not None:
+                lane.take(ticket.tokens)
+                ticket.future.set_result(None)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {
+            model: {
+                "queued": lane.queued,
+                "granted": lane.granted,
+                "shed": lane.shed,
+                "waiting_sessions": len(lane.waiting),
+                "expected_wait_seconds": round(lane.expected_wait(0), 3),
+            }
+            for model, lane in self._lanes.items()
+        }
+
+    def _lane(self, model: str) -> _Lane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            rpm = self.rpm_limits.get(model, self.default_rpm) / self.workers
+            tpm = self.tpm_limits.get(model, self.default_tpm) / self.workers
+            request_rate = rpm / 60
+            token_rate = tpm / 60
+            request_capacity = max(1.0, request_rate * self.burst_seconds)
+            token_capacity = max(1.0, token_rate * self.burst_seconds)
+            lane = _Lane(
+                request_rate=request_rate,
+                token_rate=token_rate,
+                request_capacity=request_capacity,
+                token_capacity=token_capacity,
+                requests=request_capacity,
+                tokens=token_capacity,
+                updated=monotonic(),
+            )
+            self._lanes[model] = lane
+        return lane
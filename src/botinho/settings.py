@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from functools import lru_cache
+from typing import Literal
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -16,10 +17,39 @@ class Settings(BaseSettings):
     environment: str = Field(default="development", alias="BOTINHO_ENV")
     host: str = Field(default="127.0.0.1", alias="BOTINHO_HOST")
     port: int = Field(default=8000, alias="BOTINHO_PORT")
+    server_workers: int = Field(default=0, alias="BOTINHO_SERVER_WORKERS")
+    server_backlog: int = Field(default=2048, alias="BOTINHO_SERVER_BACKLOG")
+    server_keep_alive_seconds: int = Field(default=5, alias="BOTINHO_SERVER_KEEP_ALIVE_SECONDS")
+    server_limit_concurrency: int = Field(default=0, alias="BOTINHO_SERVER_LIMIT_CONCURRENCY")
+    server_graceful_shutdown_seconds: int = Field(
+        default=30, alias="BOTINHO_SERVER_GRACEFUL_SHUTDOWN_SECONDS"
+    )
+    server_access_log: bool = Field(default=False, alias="BOTINHO_SERVER_ACCESS_LOG")
     log_level: str = Field(default="INFO", alias="BOTINHO_LOG_LEVEL")
+    log_format: Literal["text", "json"] = Field(default="text", alias="BOTINHO_LOG_FORMAT")
+    log_queue_size: int = Field(default=10_000, alias="BOTINHO_LOG_QUEUE_SIZE")
+    log_upstream_error_interval_seconds: float = Field(
+        default=60.0, alias="BOTINHO_LOG_UPSTREAM_ERROR_INTERVAL_SECONDS"
+    )
+    log_max_error_chars: int = Field(default=300, alias="BOTINHO_LOG_MAX_ERROR_CHARS")
 
     gemini_api_key: str = Field(default="", alias="GEMINI_API_KEY")
     gemini_model: str = Field(default="gemini-2.0-flash", alias="BOTINHO_GEMINI_MODEL")
+    gemini_http_pool_size: int = Field(default=32, alias="BOTINHO_GEMINI_HTTP_POOL_SIZE")
+    gemini_http_keepalive_expiry: float = Field(
+        default=120.0, alias="BOTINHO_GEMINI_HTTP_KEEPALIVE_EXPIRY"
+    )
+    gemini_http2: bool = Field(default=True, alias="BOTINHO_GEMINI_HTTP2")
+    gemini_connect_timeout: float = Field(default=5.0, alias="BOTINHO_GEMINI_CONNECT_TIMEOUT")
+    gemini_request_timeout: float = Field(default=60.0, alias="BOTINHO_GEMINI_REQUEST_TIMEOUT")
+    gemini_warm_up: bool = Field(default=True, alias="BOTINHO_GEMINI_WARM_UP")
+    gemini_warm_up_connections: int = Field(default=2, alias="BOTINHO_GEMINI_WARM_UP_CONNECTIONS")
+    gemini_context_cache: bool = Field(default=False, alias="BOTINHO_GEMINI_CONTEXT_CACHE")
+    gemini_cache_ttl_seconds: int = Field(default=3600, alias="BOTINHO_GEMINI_CACHE_TTL_SECONDS")
+    gemini_cache_knowledge: bool = Field(default=True, alias="BOTINHO_GEMINI_CACHE_KNOWLEDGE")
+    gemini_cache_retry_seconds: float = Field(
+        default=300.0, alias="BOTINHO_GEMINI_CACHE_RETRY_SECONDS"
+    )
 
     cors_allowed_origins: list[str] = Field(
         default_factory=lambda: ["http://localhost:8000", "http://127.0.0.1:8000"],
@@ -28,6 +58,110 @@ class Settings(BaseSettings):
 
     rate_limit_requests: int = Field(default=60, alias="BOTINHO_RATE_LIMIT_REQUESTS")
     rate_limit_window_seconds: int = Field(default=60, alias="BOTINHO_RATE_LIMIT_WINDOW_SECONDS")
+    rate_limit_max_clients: int = Field(default=100_000, alias="BOTINHO_RATE_LIMIT_MAX_CLIENTS")
+
+    cancel_on_disconnect: bool = Field(default=True, alias="BOTINHO_CANCEL_ON_DISCONNECT")
+
+    idempotency_enabled: bool = Field(default=True, alias="BOTINHO_IDEMPOTENCY_ENABLED")
+    idempotency_ttl_seconds: float = Field(default=3600.0, alias="BOTINHO_IDEMPOTENCY_TTL_SECONDS")
+    idempotency_max_entries: int = Field(default=10_000, alias="BOTINHO_IDEMPOTENCY_MAX_ENTRIES")
+
+    knowledge_index_path: str = Field(default="", alias="BOTINHO_KNOWLEDGE_INDEX_PATH")
+
+    history_max_turns: int = Field(default=20, alias="BOTINHO_HISTORY_MAX_TURNS")
+    max_sessions: int = Field(default=100_000, alias="BOTINHO_MAX_SESSIONS")
+    session_ttl_seconds: float = Field(default=86_400.0, alias="BOTINHO_SESSION_TTL_SECONDS")
+    session_token_budget: int = Field(default=0, alias="BOTINHO_SESSION_TOKEN_BUDGET")
+    session_budget_mode: Literal["fallback", "cheapest"] = Field(
+        default="fallback", alias="BOTINHO_SESSION_BUDGET_MODE"
+    )
+    session_budget_model: str = Field(
+        default="gemini-2.0-flash-lite", alias="BOTINHO_SESSION_BUDGET_MODEL"
+    )
+
+    fast_path_enabled: bool = Field(default=True, alias="BOTINHO_FAST_PATH_ENABLED")
+    fast_path_thresholds: dict[str, float] = Field(
+        default_factory=lambda: {"procedimentos_ti": 0.9, "problemas_tecnicos": 0.9},
+        alias="BOTINHO_FAST_PATH_THRESHOLDS",
+    )
+    fast_path_max_words: int = Field(default=12, alias="BOTINHO_FAST_PATH_MAX_WORDS")
+
+    router_enabled: bool = Field(default=True, alias="BOTINHO_ROUTER_ENABLED")
+    router_light_model: str = Field(
+        default="gemini-2.0-flash-lite", alias="BOTINHO_ROUTER_LIGHT_MODEL"
+    )
+    router_max_words: int = Field(default=12, alias="BOTINHO_ROUTER_MAX_WORDS")
+    router_max_history: int = Field(default=2, alias="BOTINHO_ROUTER_MAX_HISTORY")
+    router_knowledge_max_output_tokens: int = Field(
+        default=256, alias="BOTINHO_ROUTER_KNOWLEDGE_MAX_OUTPUT_TOKENS"
+    )
+    router_greeting_max_output_tokens: int = Field(
+        default=128, alias="BOTINHO_ROUTER_GREETING_MAX_OUTPUT_TOKENS"
+    )
+
+    quota_scheduler_enabled: bool = Field(default=False, alias="BOTINHO_QUOTA_SCHEDULER_ENABLED")
+    gemini_rpm_limits: dict[str, int] = Field(
+        default_factory=lambda: {"gemini-2.0-flash": 15, "gemini-2.0-flash-lite": 30},
+        alias="BOTINHO_GEMINI_RPM_LIMITS",
+    )
+    gemini_tpm_limits: dict[str, int] = Field(
+        default_factory=lambda: {"gemini-2.0-flash": 1_000_000, "gemini-2.0-flash-lite": 1_000_000},
+        alias="BOTINHO_GEMINI_TPM_LIMITS",
+    )
+    gemini_default_rpm: int = Field(default=15, alias="BOTINHO_GEMINI_DEFAULT_RPM")
+    gemini_default_tpm: int = Field(default=1_000_000, alias="BOTINHO_GEMINI_DEFAULT_TPM")
+    quota_burst_seconds: float = Field(default=6.0, alias="BOTINHO_QUOTA_BURST_SECONDS")
+    quota_max_wait_seconds: float = Field(default=8.0, alias="BOTINHO_QUOTA_MAX_WAIT_SECONDS")
+
+    ws_heartbeat_interval_seconds: float = Field(
+        default=20.0, alias="BOTINHO_WS_HEARTBEAT_INTERVAL_SECONDS"
+    )
+    ws_idle_timeout_seconds: float = Field(default=300.0, alias="BOTINHO_WS_IDLE_TIMEOUT_SECONDS")
+    ws_rate_limit_messages: int = Field(default=20, alias="BOTINHO_WS_RATE_LIMIT_MESSAGES")
+    ws_rate_limit_window_seconds: int = Field(
+        default=60, alias="BOTINHO_WS_RATE_LIMIT_WINDOW_SECONDS"
+    )
+    ws_max_pending_frames: int = Field(default=8, alias="BOTINHO_WS_MAX_PENDING_FRAMES")
+
+    load_monitor_interval_seconds: float = Field(
+        default=0.1, alias="BOTINHO_LOAD_MONITOR_INTERVAL_SECONDS"
+    )
+    load_shed_max_lag_ms: float = Field(default=250.0, alias="BOTINHO_LOAD_SHED_MAX_LAG_MS")
+    load_shed_max_in_flight: int = Field(default=256, alias="BOTINHO_LOAD_SHED_MAX_IN_FLIGHT")
+    load_shed_mode: Literal["fallback", "reject"] = Field(
+        default="fallback", alias="BOTINHO_LOAD_SHED_MODE"
+    )
+    load_shed_retry_after_seconds: int = Field(
+        default=5, alias="BOTINHO_LOAD_SHED_RETRY_AFTER_SECONDS"
+    )
+
+    static_precompress: bool = Field(default=True, alias="BOTINHO_STATIC_PRECOMPRESS")
+    static_compress_min_size: int = Field(default=512, alias="BOTINHO_STATIC_COMPRESS_MIN_SIZE")
+    gzip_minimum_size: int = Field(default=1024, alias="BOTINHO_GZIP_MINIMUM_SIZE")
+    gzip_compress_level: int = Field(default=6, alias="BOTINHO_GZIP_COMPRESS_LEVEL")
+
+    admin_token: str = Field(default="", alias="BOTINHO_ADMIN_TOKEN")
+
+    profiling_enabled: bool = Field(default=False, alias="BOTINHO_PROFILING_ENABLED")
+    profiling_sample_rate: float = Field(default=0.0, alias="BOTINHO_PROFILING_SAMPLE_RATE")
+    profiling_max_profiles: int = Field(default=20, alias="BOTINHO_PROFILING_MAX_PROFILES")
+
+    audit_log_enabled: bool = Field(default=False, alias="BOTINHO_AUDIT_LOG_ENABLED")
+    audit_log_path: str = Field(default="logs/audit.jsonl", alias="BOTINHO_AUDIT_LOG_PATH")
+    audit_log_queue_size: int = Field(default=10_000, alias="BOTINHO_AUDIT_LOG_QUEUE_SIZE")
+    audit_log_batch_size: int = Field(default=200, alias="BOTINHO_AUDIT_LOG_BATCH_SIZE")
+    audit_log_flush_interval: float = Field(default=1.0, alias="BOTINHO_AUDIT_LOG_FLUSH_INTERVAL")
+    audit_log_max_bytes: int = Field(default=50 * 1024 * 1024, alias="BOTINHO_AUDIT_LOG_MAX_BYTES")
+
+    tracing_enabled: bool = Field(default=False, alias="BOTINHO_TRACING_ENABLED")
+    tracing_sample_rate: float = Field(default=0.1, alias="BOTINHO_TRACING_SAMPLE_RATE")
+    tracing_export_path: str = Field(
+        default="logs/traces.jsonl", alias="BOTINHO_TRACING_EXPORT_PATH"
+    )
+    tracing_otlp_endpoint: str = Field(default="", alias="BOTINHO_TRACING_OTLP_ENDPOINT")
+    tracing_service_name: str = Field(default="botinho", alias="BOTINHO_TRACING_SERVICE_NAME")
+    tracing_batch_size: int = Field(default=256, alias="BOTINHO_TRACING_BATCH_SIZE")
+    tracing_flush_interval: float = Field(default=5.0, alias="BOTINHO_TRACING_FLUSH_INTERVAL")
 
     @field_validator("cors_allowed_origins", mode="before")
     @classmethod
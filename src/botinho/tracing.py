@@ -0,0 +1,363 @@
+"""Minimal W3C trace-context propagation and batched OTLP/JSON span export.
+
+Spans continue the caller's ``traceparent`` and are exported as OTLP/JSON
+``ExportTraceServiceRequest`` documents: one JSON line per batch appended to a
+local file (the collector *file exporter* format) and/or POSTed to an OTLP/HTTP
+collector endpoint. Unsampled requests get a shared no-op span, so the cost of
+tracing that is disabled or not sampled is a couple of attribute lookups.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import re
+import secrets
+import urllib.request
+from contextvars import ContextVar, Token
+from pathlib import Path
+from time import time_ns
+from typing import Any
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+_current_span: ContextVar[Span | None] = ContextVar("botinho_current_span", default=None)
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str, bool] | None:
+    """Return ``(trace_id, parent_span_id, sampled)`` from a W3C ``traceparent``."""
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if not match:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 0x01)
+
+
+class _NoopSpan:
+    __slots__ = ()
+    recording = False
+
+    def __enter__(self) -> _NoopSpan:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:  # noqa: ANN001
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+    def add_event(self, name: str, attributes: dict[str, Any] | None = None) -> None:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = (
+        "tracer",
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "attributes",
+        "events",
+        "start_ns",
+        "end_ns",
+        "error",
+        "_token",
+    )
+    recording = True
+
+    def __init__(
+        self,
+        tracer: Tracer,
+        name: str,
+        trace_id: str,
+        parent_span_id: str | None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: dict[str, Any] | None = None,
+    ) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.attributes = dict(attributes or {})
+        self.events: list[tuple[int, str, dict[str, Any]]] = []
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: str | None = None
+        self._token: Token[Span | None] | None = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def __enter__(self) -> Span:
+        self.start_ns = time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:  # noqa: ANN001
+        self.end_ns = time_ns()
+        if exc is not None and not isinstance(exc, asyncio.CancelledError):
+            self.error = f"{exc_type.__name__}: {exc}"[:500]
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Async generators finalized by the loop exit in a different context.
+                _current_span.set(None)
+            self._token = None
+        self.tracer.exporter.export(self)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: dict[str, Any] | None = None) -> None:
+        self.events.append((time_ns(), name, dict(attributes or {})))
+
+    def to_otlp(self) -> dict[str, Any]:
+        payload: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_span_id:
+            payload["parentSpanId"] = self.parent_span_id
+        if self.events:
+            payload["events"] = [
+                {"timeUnixNano": str(ts), "name": name, "attributes": _otlp_attributes(attrs)}
+                for ts, name, attrs in self.events
+            ]
+        return payload
+
+
+class BatchSpanExporter:
+    """Buffer finished spans and flush them in batches from a background task."""
+
+    def __init__(
+        self,
+        file_path: Path | None = None,
+        endpoint: str = "",
+        service_name: str = "botinho",
+        batch_size: int = 256,
+        flush_interval: float = 5.0,
+        max_queue: int = 10_000,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.file_path = file_path
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.logger = logger or logging.getLogger("botinho.tracing")
+        self.exported = 0
+        self.dropped = 0
+        self._pending: list[Span] = []
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    def export(self, span: Span) -> None:
+        if len(self._pending) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._pending.append(span)
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="botinho-span-exporter")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    async def flush(self) -> None:
+        while self._pending:
+            batch = self._pending[: self.batch_size]
+            del self._pending[: self.batch_size]
+            try:
+                await asyncio.to_thread(self._write, self._encode(batch))
+                self.exported += len(batch)
+            except Exception as exc:  # noqa: BLE001
+                self.dropped += len(batch)
+                self.logger.warning("Falha ao exportar %d spans: %s", len(batch), exc)
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def _encode(self, batch: list[Span]) -> bytes:
+        document = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes({"service.name": self.service_name})
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "botinho"},
+                            "spans": [span.to_otlp() for span in batch],
+                        }
+                    ],
+                }
+            ]
+        }
+        return json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def _write(self, payload: bytes) -> None:
+        if self.file_path is not None:
+            self.file_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.file_path.open("ab") as handle:
+                handle.write(payload + b"\n")
+        if self.endpoint:
+            request = urllib.request.Request(
+                self.endpoint,
+                data=payload,
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=5) as response:  # noqa: S310
+                response.read()
+
+
+class Tracer:
+    """Create spans that continue the current (or incoming W3C) trace context.
+
+    Root spans are sampled with ``sample_rate`` unless the incoming
+    ``traceparent`` already carries a sampling decision (parent-based sampling).
+    Children of an unsampled or missing parent get ``NOOP_SPAN``.
+    """
+
+    def __init__(
+        self,
+        exporter: BatchSpanExporter | None = None,
+        enabled: bool = False,
+        sample_rate: float = 0.1,
+    ) -> None:
+        self.exporter = exporter or BatchSpanExporter()
+        self.enabled = enabled
+        self.sample_rate = max(0.0, min(sample_rate, 1.0))
+
+    def start_server_span(
+        self, name: str, traceparent: str | None, attributes: dict[str, Any] | None = None
+    ) -> Span | _NoopSpan:
+        if not self.enabled:
+            return NOOP_SPAN
+        incoming = parse_traceparent(traceparent)
+        if incoming is not None:
+            trace_id, parent_span_id, sampled = incoming
+        else:
+            trace_id, parent_span_id = secrets.token_hex(16), None
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled:
+            return NOOP_SPAN
+        return Span(self, name, trace_id, parent_span_id, SPAN_KIND_SERVER, attributes)
+
+    def span(
+        self, name: str, attributes: dict[str, Any] | None = None, kind: int = SPAN_KIND_INTERNAL
+    ) -> Span | _NoopSpan:
+        parent = _current_span.get()
+        if parent is None:
+            return NOOP_SPAN
+        return Span(self, name, parent.trace_id, parent.span_id, kind, attributes)
+
+    @staticmethod
+    def current_span() -> Span | _NoopSpan:
+        return _current_span.get() or NOOP_SPAN
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "pending": len(self.exporter._pending),
+            "exported": self.exporter.exported,
+            "dropped": self.exporter.dropped,
+        }
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening a server span per request under ``paths``."""
+
+    def __init__(self, app: ASGIApp, tracer: Tracer, paths: tuple[str, ...] = ("/api/",)) -> None:
+        self.app = app
+        self.tracer = tracer
+        self.paths = paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        span = self.tracer.start_server_span(
+            f"{scope['method']} {scope['path']}",
+            Headers(scope=scope).get("traceparent"),
+            {"http.request.method": scope["method"], "url.path": scope["path"]},
+        )
+        if not span.recording:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_trace(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.response.status_code", message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"traceparent", span.traceparent.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with span:
+            await self.app(scope, receive, send_with_trace)
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        encoded.append({"key": key, "value": typed})
+    return encoded
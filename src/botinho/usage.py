@@ -0,0 +1,124 @@
+"""Token and upstream-latency accounting per turn, session, model and category."""
+
+from __future__ import annotations
+
+import heapq
+from collections.abc import Iterable
+from typing import Any
+
+
+class TurnUsage:
+    """Upstream cost of one turn: tokens of the answering call, time of all attempts."""
+
+    __slots__ = (
+        "model",
+        "prompt_tokens",
+        "output_tokens",
+        "cached_tokens",
+        "total_tokens",
+        "latency_ms",
+    )
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self.total_tokens = 0
+        self.latency_ms = 0.0
+
+    def record_response(self, response: Any) -> None:
+        """Copy ``usage_metadata`` from a response or streamed chunk, if it has one.
+
+        Streamed chunks carry running totals, so the last chunk with metadata wins.
+        """
+        metadata = getattr(response, "usage_metadata", None)
+        if metadata is None:
+            return
+        self.prompt_tokens = getattr(metadata, "prompt_token_count", None) or 0
+        self.output_tokens = getattr(metadata, "candidates_token_count", None) or 0
+        self.cached_tokens = getattr(metadata, "cached_content_token_count", None) or 0
+        self.total_tokens = (
+            getattr(metadata, "total_token_count", None)
+            or self.prompt_tokens + self.output_tokens
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+            "total_tokens": self.total_tokens,
+            "latency_ms": round(self.latency_ms, 1),
+        }
+
+
+class UsageTotals:
+    __slots__ = (
+        "turns",
+        "prompt_tokens",
+        "output_tokens",
+        "cached_tokens",
+        "total_tokens",
+        "latency_ms",
+    )
+
+    def __init__(self) -> None:
+        self.turns = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self.total_tokens = 0
+        self.latency_ms = 0.0
+
+    def add(self, usage: TurnUsage) -> None:
+        self.turns += 1
+        self.prompt_tokens += usage.prompt_tokens
+        self.output_tokens += usage.output_tokens
+        self.cached_tokens += usage.cached_tokens
+        self.total_tokens += usage.total_tokens
+        self.latency_ms += usage.latency_ms
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+            "total_tokens": self.total_tokens,
+            "latency_ms_total": round(self.latency_ms, 1),
+            "latency_ms_avg": round(self.latency_ms / self.turns, 1) if self.turns else None,
+        }
+
+
+class UsageLedger:
+    """Worker-wide totals, broken down by model and by category (both small, fixed sets)."""
+
+    def __init__(self) -> None:
+        self.totals = UsageTotals()
+        self.by_model: dict[str, UsageTotals] = {}
+        self.by_category: dict[str, UsageTotals] = {}
+
+    def add(self, usage: TurnUsage, category: str | None) -> None:
+        self.totals.add(usage)
+        self.by_model.setdefault(usage.model, UsageTotals()).add(usage)
+        self.by_category.setdefault(category or "desconhecida", UsageTotals()).add(usage)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "totals": self.totals.to_dict(),
+            "by_model": {name: totals.to_dict() for name, totals in self.by_model.items()},
+            "by_category": {
+                name: totals.to_dict() for name, totals in self.by_category.items()
+            },
+        }
+
+
+def top_sessions(
+    sessions: Iterable[tuple[str, UsageTotals | None]], limit: int
+) -> list[dict[str, Any]]:
+    """The ``limit`` sessions with the most tokens, heaviest first."""
+    measured = ((session_id, totals) for session_id, totals in sessions if totals is not None)
+    heaviest = heapq.nlargest(limit, measured, key=lambda item: item[1].total_tokens)
+    return [{"session_id": session_id, **totals.to_dict()} for session_id, totals in heaviest]
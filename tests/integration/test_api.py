@@ -1,6 +1,14 @@
+import asyncio
+import json
+import re
+
+import pytest
 from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
 
+from src.botinho import main
 from src.botinho.main import app
+from src.botinho.security import SlidingWindowRateLimiter
 
 client = TestClient(app)
 
@@ -19,3 +27,312 @@ def test_chat_endpoint_accepts_legacy_payload():
     payload = response.json()
     assert "response" in payload
     assert "session_id" in payload
+
+
+def test_index_references_content_hashed_assets():
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+    assert "/static/css/app.css" not in response.text
+    assert re.search(r"/static/css/app\.[0-9a-f]{12}\.css", response.text)
+
+
+def test_hashed_asset_is_immutable_and_precompressed():
+    index_html = client.get("/").text
+    asset_url = re.search(r"/static/js/chat\.[0-9a-f]{12}\.js", index_html).group(0)
+
+    response = client.get(asset_url, headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["content-encoding"] == "gzip"
+    assert "appendMessage" in response.text
+
+
+def test_static_asset_revalidation_returns_not_modified():
+    first = client.get("/static/css/app.css")
+
+    second = client.get("/static/css/app.css", headers={"If-None-Match": first.headers["etag"]})
+
+    assert second.status_code == 304
+    assert second.content == b""
+
+
+def test_admin_profiles_hidden_without_admin_token():
+    response = client.get("/api/admin/profiles")
+
+    assert response.status_code == 404
+
+
+def test_admin_profiles_reject_non_ascii_token_with_403(monkeypatch):
+    monkeypatch.setattr(main.settings, "admin_token", "segredo")
+
+    response = client.get(
+        "/api/admin/profiles", headers={"X-Botinho-Admin-Token": "ségredo".encode()}
+    )
+
+    assert response.status_code == 403
+
+
+def test_websocket_chat_streams_chunks_and_keeps_session():
+    with client.websocket_connect("/ws/chat") as websocket:
+        session = websocket.receive_json()
+        websocket.send_json({"message": "Como resetar senha?"})
+
+        events = [websocket.receive_json()]
+        while events[-1]["type"] != "done":
+            events.append(websocket.receive_json())
+
+    assert session["type"] == "session"
+    assert events[0]["type"] == "chunk"
+    assert events[-1]["session_id"] == session["session_id"]
+    assert events[-1]["response"] == "".join(e["text"] for e in events if e["type"] == "chunk")
+    history = client.get(f"/api/conversation/{session['session_id']}").json()
+    assert history["history_count"] == 1
+
+
+def test_websocket_chat_rejects_invalid_frame_without_closing():
+    with client.websocket_connect("/ws/chat") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"message": ""})
+
+        error = websocket.receive_json()
+
+    assert error["type"] == "error"
+    assert error["code"] == "validation_error"
+
+
+def test_websocket_chat_answers_malformed_frames_and_keeps_serving():
+    with client.websocket_connect("/ws/chat") as websocket:
+        websocket.receive_json()
+        websocket.send_text("not json")
+        bad_text = websocket.receive_json()
+        websocket.send_bytes(b"\xff\xfe")
+        bad_bytes = websocket.receive_json()
+        websocket.send_json(["message"])
+        not_object = websocket.receive_json()
+        websocket.send_bytes(json.dumps({"message": "Oi"}).encode("utf-8"))
+        events = [websocket.receive_json()]
+        while events[-1]["type"] != "done":
+            events.append(websocket.receive_json())
+
+    for error in (bad_text, bad_bytes, not_object):
+        assert error["type"] == "error"
+        assert error["code"] == "validation_error"
+    assert events[-1]["response"]
+
+
+def test_websocket_rate_limit_survives_reconnects(monkeypatch):
+    monkeypatch.setattr(main, "ws_rate_limiter", SlidingWindowRateLimiter(1, 60))
+
+    with client.websocket_connect("/ws/chat") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"message": "Oi"})
+        while websocket.receive_json()["type"] != "done":
+            pass
+    with client.websocket_connect("/ws/chat") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"message": "Oi de novo"})
+        error = websocket.receive_json()
+
+    assert error["code"] == "rate_limit_exceeded"
+
+
+def test_websocket_closes_client_flooding_frames_during_a_reply(monkeypatch):
+    async def endless_stream(message, session_id):  # noqa: ANN001, ANN202
+        yield {"type": "chunk", "text": "..."}
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(main.chat_service, "converse_stream", endless_stream)
+    monkeypatch.setattr(main.settings, "ws_max_pending_frames", 2)
+
+    with client.websocket_connect("/ws/chat") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"message": "Oi"})
+        assert websocket.receive_json()["type"] == "chunk"
+        for _ in range(3):
+            websocket.send_json({"message": "De novo"})
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+
+    assert closed.value.code == 1008
+
+
+def test_chat_endpoint_sheds_load_with_local_answer(monkeypatch):
+    monkeypatch.setattr(main.load_monitor, "max_in_flight", 0)
+
+    response = client.post("/api/chat", json={"message": "Como configurar a VPN?"})
+
+    assert response.status_code == 200
+    assert response.json()["model"] == "load-shed-fallback"
+    assert response.json()["response"].startswith("VPN:")
+
+
+def test_load_shed_answer_is_not_replayed_once_load_drops(monkeypatch):
+    payload = {"message": "Como resetar a senha?"}
+    headers = {"Idempotency-Key": "shed-retry-1"}
+    monkeypatch.setattr(main.load_monitor, "max_in_flight", 0)
+
+    shed = client.post("/api/chat", json=payload, headers=headers)
+    monkeypatch.undo()
+    retry = client.post("/api/chat", json=payload, headers=headers)
+
+    assert shed.json()["model"] == "load-shed-fallback"
+    assert retry.json()["model"] != "load-shed-fallback"
+    assert "idempotent-replayed" not in retry.headers
+
+
+def test_chat_endpoint_rejects_with_retry_after_when_configured(monkeypatch):
+    monkeypatch.setattr(main.load_monitor, "max_in_flight", 0)
+    monkeypatch.setattr(main.settings, "load_shed_mode", "reject")
+
+    response = client.post("/api/chat", json={"message": "Oi"})
+    health = client.get("/health")
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+    assert health.status_code == 200
+
+
+def test_websocket_chat_sheds_load_like_http(monkeypatch):
+    monkeypatch.setattr(main.load_monitor, "max_in_flight", 0)
+    shed_before = main.load_monitor.shed
+
+    with client.websocket_connect("/ws/chat") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"message": "Como configurar a VPN?"})
+        chunk = websocket.receive_json()
+        done = websocket.receive_json()
+        monkeypatch.setattr(main.settings, "load_shed_mode", "reject")
+        websocket.send_json({"message": "Oi"})
+        rejected = websocket.receive_json()
+
+    assert done["model"] == "load-shed-fallback"
+    assert chunk["text"] == done["response"]
+    assert rejected["code"] == "overloaded"
+    assert rejected["retry_after"] == 5
+    assert main.load_monitor.shed == shed_before + 2
+
+
+def test_websocket_turn_counts_as_in_flight(monkeypatch):
+    observed = []
+
+    async def stream(message, session_id):  # noqa: ANN001, ANN202
+        observed.append(main.load_monitor.in_flight)
+        yield {"type": "done", "response": "ok"}
+
+    monkeypatch.setattr(main.chat_service, "converse_stream", stream)
+    before = main.load_monitor.in_flight
+
+    with client.websocket_connect("/ws/chat") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"message": "Oi"})
+        websocket.receive_json()
+
+    assert observed == [before + 1]
+    assert main.load_monitor.in_flight == before
+
+
+def test_chat_endpoint_replays_idempotent_retry_without_duplicate_turn():
+    payload = {"message": "Qual a política de férias?", "session_id": "idem-session"}
+    headers = {"Idempotency-Key": "retry-123"}
+
+    first = client.post("/api/chat", json=payload, headers=headers)
+    retry = client.post("/api/chat", json=payload, headers=headers)
+    conflict = client.post(
+        "/api/chat", json={**payload, "message": "Outra pergunta"}, headers=headers
+    )
+
+    assert first.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert conflict.status_code == 422
+    history = client.get("/api/conversation/idem-session").json()
+    assert history["history_count"] == 1
+
+
+def test_idempotency_key_reused_by_another_client_does_not_replay_its_reply():
+    payload = {"message": "Como resetar a senha?"}
+    headers = {"Idempotency-Key": "shared-key"}
+    first_client = TestClient(app, client=("10.9.0.1", 50000))
+    second_client = TestClient(app, client=("10.9.0.2", 50000))
+
+    first = first_client.post("/api/chat", json=payload, headers=headers)
+    second = second_client.post("/api/chat", json=payload, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert "idempotent-replayed" not in second.headers
+    assert second.json()["session_id"] != first.json()["session_id"]
+
+
+@pytest.mark.asyncio
+async def test_chat_endpoint_cancels_upstream_call_when_client_disconnects(monkeypatch):
+    started = asyncio.Event()
+
+    class HangingChat:
+        async def send_message(self, message):  # noqa: ANN001, ANN201
+            started.set()
+            await asyncio.Event().wait()
+
+    class HangingModelClient:
+        model_name = "hanging-model"
+        available = True
+
+        async def create_chat(self, history, **kwargs):  # noqa: ANN001, ANN003, ANN201
+            return HangingChat()
+
+    monkeypatch.setattr(main.chat_service, "model_client", HangingModelClient())
+    monkeypatch.setattr(main.chat_service, "scheduler", None)
+    monkeypatch.setattr(main.chat_service, "_gemini_cooldown_until", 0.0)
+    cancelled_before = main.chat_service.cancellation_stats()
+
+    body = json.dumps(
+        {"message": "Preciso de ajuda com um problema estranho", "session_id": "gone-session"}
+    ).encode()
+    inbound = [{"type": "http.request", "body": body, "more_body": False}]
+    client_left = asyncio.Event()
+    sent = []
+
+    async def receive():
+        if inbound:
+            return inbound.pop(0)
+        await client_left.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/chat",
+        "raw_path": b"/api/chat",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"content-type", b"application/json")],
+        "client": ("10.9.9.9", 50000),
+        "server": ("testserver", 80),
+    }
+    call = asyncio.create_task(app(scope, receive, send))
+    await asyncio.wait_for(started.wait(), timeout=5)
+    client_left.set()
+    await asyncio.wait_for(call, timeout=5)
+
+    assert sent[0]["status"] == 499
+    cancelled = main.chat_service.cancellation_stats()
+    assert cancelled["turns"] == cancelled_before["turns"] + 1
+    assert cancelled["upstream_calls"] == cancelled_before["upstream_calls"] + 1
+    assert len(main.chat_service.conversations["gone-session"].historico) == 0
+
+
+def test_usage_endpoint_reports_breakdowns_and_budget():
+    response = client.get("/api/usage", params={"top": 3})
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert {"totals", "by_model", "by_category", "top_sessions", "budget"} <= payload.keys()
+    assert len(payload["top_sessions"]) <= 3
@@ -0,0 +1,74 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from src.botinho.assets import NegotiatedGZipMiddleware, StaticAssetManifest, accepts_encoding
+
+
+@pytest.mark.parametrize(
+    ("header", "accepted"),
+    [
+        ("gzip", True),
+        ("gzip, br", True),
+        ("GZIP;q=0.5", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.0", False),
+        ("br, gzip;Q=0.000", False),
+        ("gzip;q=abc", False),
+        ("*", True),
+        ("*;q=0", False),
+        ("gzip;q=0, *", False),
+        ("deflate", False),
+        ("", False),
+    ],
+)
+def test_accepts_encoding_honours_quality_values(header, accepted):
+    assert accepts_encoding(header, "gzip") is accepted
+
+
+def _client(tmp_path, precompress: bool) -> TestClient:
+    (tmp_path / "app.js").write_text("console.log('botinho');\n" * 200, encoding="utf-8")
+    manifest = StaticAssetManifest(tmp_path, precompress=precompress)
+    app = FastAPI()
+    app.add_middleware(NegotiatedGZipMiddleware, minimum_size=512)
+
+    @app.get("/static/{asset_path:path}")
+    async def static(asset_path: str, request: Request):
+        return manifest.response(asset_path, request)
+
+    return TestClient(app)
+
+
+def test_refused_gzip_is_not_served_precompressed_or_compressed_on_the_fly(tmp_path):
+    for precompress in (True, False):
+        response = _client(tmp_path, precompress).get(
+            "/static/app.js", headers={"Accept-Encoding": "gzip;q=0"}
+        )
+
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert response.headers["etag"].startswith('W/"')
+
+
+def test_runtime_compressed_asset_keeps_a_weak_etag_that_revalidates(tmp_path):
+    client = _client(tmp_path, precompress=False)
+
+    response = client.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    revalidated = client.get(
+        "/static/app.js", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
+
+
+def test_precompressed_asset_keeps_an_encoding_specific_strong_etag(tmp_path):
+    response = _client(tmp_path, precompress=True).get(
+        "/static/app.js", headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert not response.headers["etag"].startswith("W/")
@@ -0,0 +1,66 @@
+import gzip
+import json
+
+import pytest
+
+from src.botinho.audit import AuditLog
+
+
+@pytest.mark.asyncio
+async def test_audit_log_flushes_batches_and_drains_on_stop(tmp_path):
+    audit_log = AuditLog(tmp_path / "audit.jsonl", batch_size=2, flush_interval=0.05)
+    await audit_log.start()
+
+    for index in range(5):
+        audit_log.record({"message": f"mensagem {index}"})
+    await audit_log.stop()
+
+    lines = (tmp_path / "audit.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["message"] for line in lines] == [
+        f"mensagem {index}" for index in range(5)
+    ]
+    assert audit_log.written == 5
+
+
+@pytest.mark.asyncio
+async def test_audit_log_writer_survives_a_batch_that_cannot_be_serialized(tmp_path):
+    audit_log = AuditLog(tmp_path / "audit.jsonl", batch_size=1, flush_interval=0.05)
+    await audit_log.start()
+    circular: dict = {}
+    circular["self"] = circular
+
+    audit_log.record({"message": circular})
+    audit_log.record({"message": "depois"})
+    await audit_log.stop()
+
+    lines = (tmp_path / "audit.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["message"] for line in lines] == ["depois"]
+    assert audit_log.dropped == 1
+    assert audit_log.written == 1
+
+
+@pytest.mark.asyncio
+async def test_audit_log_drops_and_counts_when_queue_is_full(tmp_path):
+    audit_log = AuditLog(tmp_path / "audit.jsonl", queue_size=2)
+
+    for index in range(5):
+        audit_log.record({"message": index})
+
+    assert audit_log.dropped == 3
+    assert audit_log.stats()["queued"] == 2
+
+
+@pytest.mark.asyncio
+async def test_audit_log_rotates_and_compresses_by_size(tmp_path):
+    audit_log = AuditLog(tmp_path / "audit.jsonl", batch_size=1, max_bytes=64)
+    await audit_log.start()
+
+    for index in range(3):
+        audit_log.record({"message": "x" * 40, "index": index})
+    await audit_log.stop()
+
+    rotated = sorted(tmp_path.glob("audit-*.jsonl.gz"))
+    assert len(rotated) == 2
+    with gzip.open(rotated[0], "rt", encoding="utf-8") as handle:
+        assert json.loads(handle.readline())["index"] == 0
+    assert json.loads((tmp_path / "audit.jsonl").read_text(encoding="utf-8"))["index"] == 2
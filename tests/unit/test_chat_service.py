@@ -1,6 +1,9 @@
+from time import monotonic, time
+
 import pytest
 
 from src.botinho.services.chat_service import ChatService, GeminiClient
+from src.botinho.services.router import ModelRouter
 
 
 class FakeChatSession:
@@ -143,6 +146,125 @@ async def test_gemini_client_accepts_non_awaitable_chat_create():
     assert isinstance(chat, FakeSyncChatSession)
 
 
+@pytest.mark.asyncio
+async def test_gemini_client_owns_pooled_http_client_between_start_and_close():
+    client = GeminiClient(api_key="fake-key", model_name="fake-model", pool_size=4)
+
+    await client.start()
+    http_client = client._http_client
+    await client.close()
+
+    assert http_client is not None
+    assert http_client.is_closed
+    assert client._client is None
+
+
+class FakeCachedContent:
+    name = "cachedContents/fake"
+
+
+class FakeAioCaches:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.created = 0
+        self.deleted: list[str] = []
+
+    async def create(self, model: str, config):  # noqa: ANN001, ANN201
+        self.created += 1
+        if self.fail:
+            raise RuntimeError("400 Cached content is too small")
+        return FakeCachedContent()
+
+    async def update(self, name: str, config):  # noqa: ANN001, ANN201
+        raise RuntimeError("404 cached content not found")
+
+    async def delete(self, name: str) -> None:
+        self.deleted.append(name)
+
+
+class RecordingChatSession:
+    def __init__(self, messages: list[str]) -> None:
+        self.messages = messages
+
+    def send_message(self, message: str):  # noqa: ANN001, ANN201
+        self.messages.append(message)
+        return FakeSyncResult()
+
+
+class RecordingAioChats:
+    def __init__(self) -> None:
+        self.configs: list = []
+        self.messages: list[str] = []
+
+    def create(self, model: str, config, history: list):  # noqa: ANN001, ANN201
+        self.configs.append(config)
+        return RecordingChatSession(self.messages)
+
+
+class FakeCachingGenAiClient:
+    def __init__(self, fail: bool = False) -> None:
+        self.aio = type("Aio", (), {})()
+        self.aio.caches = FakeAioCaches(fail)
+        self.aio.chats = RecordingAioChats()
+
+
+@pytest.mark.asyncio
+async def test_gemini_client_reuses_context_cache_and_skips_inline_knowledge():
+    client = GeminiClient(
+        api_key="fake-key", model_name="fake-model", context_cache=True, cached_knowledge="KB"
+    )
+    genai_client = FakeCachingGenAiClient()
+    client._client = genai_client
+
+    await client.create_chat(history=[])
+    _chat, knowledge_cached = await client.open_chat(history=[])
+
+    assert genai_client.aio.caches.created == 1
+    configs = genai_client.aio.chats.configs
+    assert [config.cached_content for config in configs] == ["cachedContents/fake"] * 2
+    assert all(config.system_instruction is None for config in configs)
+    assert knowledge_cached
+    assert ChatService._build_user_turn("vpn", "VPN: obrigatória", knowledge_cached) == "vpn"
+
+    await client.close()
+    assert genai_client.aio.caches.deleted == ["cachedContents/fake"]
+
+
+@pytest.mark.asyncio
+async def test_gemini_client_falls_back_to_inline_instructions_when_cache_fails():
+    client = GeminiClient(
+        api_key="fake-key", model_name="fake-model", context_cache=True, cached_knowledge="KB"
+    )
+    genai_client = FakeCachingGenAiClient(fail=True)
+    client._client = genai_client
+
+    await client.create_chat(history=[])
+    _chat, knowledge_cached = await client.open_chat(history=[])
+
+    assert genai_client.aio.caches.created == 1
+    assert not knowledge_cached
+    assert all(config.cached_content is None for config in genai_client.aio.chats.configs)
+    assert all(config.system_instruction for config in genai_client.aio.chats.configs)
+
+
+@pytest.mark.asyncio
+async def test_failed_cache_refresh_keeps_knowledge_snippet_in_the_turn():
+    client = GeminiClient(
+        api_key="fake-key", model_name="fake-model", context_cache=True, cached_knowledge="KB"
+    )
+    genai_client = FakeCachingGenAiClient()
+    client._client = genai_client
+    # A cache close to expiry: the next chat tries to extend it, and that fails.
+    client._caches["fake-model"] = ("cachedContents/fake", monotonic() + 30)
+    service = ChatService(model_client=client)
+    _session_id, conversation = service.get_or_create_conversation("s1")
+
+    await service._generate_response("vpn", "VPN: obrigatória", conversation)
+
+    assert genai_client.aio.chats.configs[0].cached_content is None
+    assert "VPN: obrigatória" in genai_client.aio.chats.messages[0]
+
+
 @pytest.mark.asyncio
 async def test_quota_error_enters_cooldown_and_skips_next_gemini_call():
     model_client = QuotaExceededModelClient()
@@ -178,3 +300,258 @@ async def test_quota_error_retries_with_fallback_model_before_cooldown():
     assert model_client.calls == 2
     assert model_client.model_name == "gemini-2.0-flash-lite"
     assert result["response"] == "Resposta sync"
+
+
+class CountingModelClient(FakeModelClient):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def create_chat(self, history: list) -> FakeChatSession:  # noqa: ANN001
+        self.calls += 1
+        return FakeChatSession()
+
+
+def test_match_knowledge_scores_exact_topic_above_synonym_match():
+    service = ChatService(model_client=FakeModelClient())
+
+    exact = service.match_knowledge("Como resetar a senha?")
+    synonym = service.match_knowledge("Não consigo fazer login")
+
+    assert exact.topic == "reset_senha"
+    assert exact.confidence == pytest.approx(1.0)
+    assert synonym.topic == "reset_senha"
+    assert synonym.confidence < exact.confidence
+
+
+@pytest.mark.asyncio
+async def test_fast_path_answers_confident_first_question_without_model():
+    model_client = CountingModelClient()
+    service = ChatService(
+        model_client=model_client, fast_path_thresholds={"procedimentos_ti": 0.9}
+    )
+
+    first = await service.converse("Como resetar a senha?", "s1")
+    follow_up = await service.converse("Como resetar a senha?", "s1")
+
+    assert model_client.calls == 1
+    assert first["model"] == "knowledge-base-fast-path"
+    assert first["response"].startswith("Reset de senha:")
+    assert follow_up["response"] == "Resposta fake"
+    assert service.fast_path_stats()["fast_path_ratio"] == pytest.approx(0.5)
+
+
+@pytest.mark.asyncio
+async def test_fast_path_leaves_problem_reports_to_the_model():
+    model_client = CountingModelClient()
+    service = ChatService(
+        model_client=model_client, fast_path_thresholds={"procedimentos_ti": 0.9}
+    )
+
+    result = await service.converse("Minha vpn não conecta")
+
+    assert service.match_knowledge("Minha vpn não conecta").topic == "vpn"
+    assert model_client.calls == 1
+    assert result["response"] == "Resposta fake"
+
+
+@pytest.mark.asyncio
+async def test_fast_path_skips_categories_without_threshold():
+    model_client = CountingModelClient()
+    service = ChatService(
+        model_client=model_client, fast_path_thresholds={"procedimentos_ti": 0.9}
+    )
+
+    result = await service.converse("Meu wifi caiu")
+
+    assert model_client.calls == 1
+    assert result["model"] == "fake-model"
+
+
+class FakeStreamingChatSession:
+    async def send_message_stream(self, message: str):  # noqa: ANN001, ANN201
+        class _Chunk:
+            def __init__(self, text: str) -> None:
+                self.text = text
+
+        async def _stream():  # noqa: ANN202
+            for text in ("Resposta ", "em ", "partes"):
+                yield _Chunk(text)
+
+        return _stream()
+
+
+class FakeStreamingModelClient(FakeModelClient):
+    async def create_chat(self, history: list) -> FakeStreamingChatSession:  # noqa: ANN001
+        return FakeStreamingChatSession()
+
+
+@pytest.mark.asyncio
+async def test_converse_stream_yields_chunks_then_records_full_turn():
+    service = ChatService(model_client=FakeStreamingModelClient())
+
+    events = [event async for event in service.converse_stream("teste", "s1")]
+
+    assert [event["text"] for event in events[:-1]] == ["Resposta ", "em ", "partes"]
+    assert events[-1]["type"] == "done"
+    assert events[-1]["response"] == "Resposta em partes"
+    assert service.conversations["s1"].historico[-1].bot == "Resposta em partes"
+
+
+@pytest.mark.asyncio
+async def test_converse_stream_falls_back_to_buffered_response_without_streaming():
+    service = ChatService(model_client=FakeSyncModelClient())
+
+    events = [event async for event in service.converse_stream("teste")]
+
+    assert events[0] == {"type": "chunk", "text": "Resposta sync"}
+    assert events[-1]["response"] == "Resposta sync"
+
+
+class RoutingModelClient(FakeModelClient):
+    model_name = "primary-model"
+
+    def __init__(self, fail_models: tuple[str, ...] = ()) -> None:
+        self.fail_models = fail_models
+        self.calls: list[tuple[str | None, dict | None]] = []
+
+    async def create_chat(  # noqa: ANN201
+        self, history: list, model: str | None = None, generation_overrides: dict | None = None
+    ):
+        self.calls.append((model, generation_overrides))
+        if model in self.fail_models:
+            raise RuntimeError("404 NOT_FOUND model")
+        return FakeChatSession()
+
+
+@pytest.mark.asyncio
+async def test_router_sends_simple_turn_to_light_model_and_reports_it():
+    model_client = RoutingModelClient()
+    service = ChatService(model_client=model_client, router=ModelRouter(light_model="lite"))
+
+    result = await service.converse("oi, tudo bem?")
+
+    assert model_client.calls == [("lite", {"max_output_tokens": 128})]
+    assert result["model"] == "lite"
+    assert service.router.stats()["greeting"]["decisions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_router_falls_back_to_default_chain_when_light_model_fails():
+    model_client = RoutingModelClient(fail_models=("lite",))
+    service = ChatService(model_client=model_client, router=ModelRouter(light_model="lite"))
+
+    result = await service.converse("oi, tudo bem?")
+
+    assert [model for model, _ in model_client.calls] == ["lite", None]
+    assert result["response"] == "Resposta fake"
+    assert result["model"] == "primary-model"
+    assert service.router.stats()["greeting"]["errors"] == 1
+
+
+def test_conversations_are_bounded_by_count_and_idle_ttl(monkeypatch):
+    service = ChatService(model_client=FakeModelClient(), max_sessions=2, session_ttl_seconds=60)
+
+    service.get_or_create_conversation("s1")
+    service.get_or_create_conversation("s2")
+    service.get_or_create_conversation("s1")
+    service.get_or_create_conversation("s3")
+    assert list(service.conversations) == ["s1", "s3"]
+    assert service.evicted_sessions == 1
+
+    clock = time() + 120
+    monkeypatch.setattr("src.botinho.services.chat_service.time", lambda: clock)
+    service.get_or_create_conversation("s4")
+    assert list(service.conversations) == ["s4"]
+    assert service.evicted_sessions == 3
+
+
+class MeteredChatSession:
+    async def send_message(self, message: str):  # noqa: ANN001, ANN201
+        class _Usage:
+            prompt_token_count = 40
+            candidates_token_count = 20
+            cached_content_token_count = 30
+            total_token_count = 60
+
+        class _Result:
+            text = "Resposta medida"
+            usage_metadata = _Usage()
+
+        return _Result()
+
+
+class MeteredModelClient(RoutingModelClient):
+    async def create_chat(  # noqa: ANN201
+        self, history: list, model: str | None = None, generation_overrides: dict | None = None
+    ):
+        self.calls.append((model, generation_overrides))
+        if model in self.fail_models:
+            raise RuntimeError("503 UNAVAILABLE")
+        return MeteredChatSession()
+
+
+@pytest.mark.asyncio
+async def test_turn_usage_is_recorded_per_turn_session_model_and_category():
+    service = ChatService(model_client=MeteredModelClient())
+
+    result = await service.converse("Preciso de ajuda com um problema estranho", "s1")
+    await service.converse("E mais uma dúvida sobre o mesmo problema", "s1")
+
+    assert result["usage"]["model"] == "primary-model"
+    assert result["usage"]["prompt_tokens"] == 40
+    assert result["usage"]["cached_tokens"] == 30
+    assert result["usage"]["latency_ms"] >= 0
+    conversation = service.conversations["s1"]
+    assert conversation.tokens_used() == 120
+    assert conversation.messages()[0].usage["output_tokens"] == 20
+
+    stats = service.usage_stats()
+    assert stats["totals"]["turns"] == 2
+    assert stats["by_model"]["primary-model"]["total_tokens"] == 120
+    assert sum(entry["turns"] for entry in stats["by_category"].values()) == 2
+    assert stats["top_sessions"][0]["session_id"] == "s1"
+
+
+@pytest.mark.asyncio
+async def test_session_over_token_budget_falls_back_locally_or_to_cheapest_model():
+    model_client = MeteredModelClient()
+    service = ChatService(model_client=model_client, session_token_budget=50)
+
+    await service.converse("Preciso de ajuda com um problema estranho", "s1")
+    limited = await service.converse("E mais uma dúvida sobre o mesmo problema", "s1")
+
+    assert limited["model"] == "token-budget-fallback"
+    assert limited["usage"] is None
+    assert len(model_client.calls) == 1
+
+    cheap_client = MeteredModelClient()
+    cheap = ChatService(
+        model_client=cheap_client,
+        session_token_budget=50,
+        budget_mode="cheapest",
+        budget_model="lite",
+    )
+    await cheap.converse("Preciso de ajuda com um problema estranho", "s1")
+    routed = await cheap.converse("E mais uma dúvida sobre o mesmo problema", "s1")
+
+    assert cheap_client.calls[-1][0] == "lite"
+    assert routed["model"] == "lite"
+    assert cheap.usage_stats()["budget"]["limited_turns"] == 1
+
+
+@pytest.mark.asyncio
+async def test_over_budget_session_never_fails_over_to_primary_model():
+    model_client = MeteredModelClient(fail_models=("lite",))
+    service = ChatService(
+        model_client=model_client,
+        session_token_budget=50,
+        budget_mode="cheapest",
+        budget_model="lite",
+    )
+
+    await service.converse("Preciso de ajuda com um problema estranho", "s1")
+    limited = await service.converse("Como configurar a VPN?", "s1")
+
+    assert [model for model, _ in model_client.calls] == [None, "lite"]
+    assert limited["model"] == "token-budget-fallback"
+    assert service.conversations["s1"].tokens_used() == 60
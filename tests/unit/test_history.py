@@ -0,0 +1,27 @@
+from src.botinho.history import ConversationData, HistoryRecord, HistoryRing
+
+
+def test_history_ring_keeps_newest_records_in_order():
+    ring = HistoryRing(capacity=3)
+
+    for index in range(5):
+        ring.append(HistoryRecord(f"u{index}", f"b{index}", "conversa_geral"))
+
+    assert len(ring) == 3
+    assert [record.usuario for record in ring] == ["u2", "u3", "u4"]
+    assert [record.usuario for record in ring.last(2)] == ["u3", "u4"]
+    assert ring[-1].bot == "b4"
+    assert ring[0].bot == "b2"
+    assert [record.usuario for record in ring[-2:]] == ["u3", "u4"]
+
+
+def test_conversation_converts_to_api_models_at_boundary():
+    conversation = ConversationData(criado_em=0.0, history_capacity=2)
+
+    conversation.add_turn("Oi", "Olá!", "conversa_geral")
+    messages = conversation.messages()
+
+    assert conversation.ultima_categoria == "conversa_geral"
+    assert conversation.created_at().year == 1970
+    assert messages[0].model_dump(mode="json")["usuario"] == "Oi"
+    assert messages[0].timestamp.tzinfo is not None
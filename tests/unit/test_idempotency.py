@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from src.botinho.idempotency import IdempotencyConflict, IdempotencyStore
+
+
+@pytest.mark.asyncio
+async def test_concurrent_repeat_awaits_pending_result_and_runs_once():
+    store = IdempotencyStore()
+    calls = 0
+    release = asyncio.Event()
+
+    async def turn():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"response": "ok"}
+
+    original = asyncio.create_task(store.run("k1", "fp", turn))
+    await asyncio.sleep(0)
+    repeat = asyncio.create_task(store.run("k1", "fp", turn))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await original == ({"response": "ok"}, False)
+    assert await repeat == ({"response": "ok"}, True)
+    assert await store.run("k1", "fp", turn) == ({"response": "ok"}, True)
+    assert calls == 1
+    assert store.stats()["replayed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_run_is_forgotten_and_mismatched_payload_conflicts():
+    store = IdempotencyStore()
+
+    async def failing():
+        raise RuntimeError("upstream")
+
+    async def succeeding():
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        await store.run("k1", "fp", failing)
+    assert await store.run("k1", "fp", succeeding) == ("ok", False)
+    with pytest.raises(IdempotencyConflict):
+        await store.run("k1", "other-fp", succeeding)
+
+
+@pytest.mark.asyncio
+async def test_store_is_bounded_and_expires_entries():
+    store = IdempotencyStore(ttl_seconds=0.0, max_entries=2)
+
+    async def turn():
+        return "ok"
+
+    for key in ("a", "b", "c"):
+        await store.run(key, "fp", turn)
+    assert store.stats()["entries"] <= 2
+
+    assert await store.run("a", "fp", turn) == ("ok", False)
+    assert store.stats()["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_waiter_takes_over_when_original_run_is_cancelled():
+    store = IdempotencyStore()
+    calls = 0
+
+    async def turn():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.Event().wait()
+        return "ok"
+
+    original = asyncio.create_task(store.run("k1", "fp", turn))
+    await asyncio.sleep(0)
+    repeat = asyncio.create_task(store.run("k1", "fp", turn))
+    await asyncio.sleep(0)
+    original.cancel()
+
+    assert await repeat == ("ok", False)
+    assert calls == 2
+    with pytest.raises(asyncio.CancelledError):
+        await original
+
+
+@pytest.mark.asyncio
+async def test_same_key_from_another_client_runs_separately():
+    store = IdempotencyStore()
+
+    async def first():
+        return {"session_id": "first-client-session"}
+
+    async def second():
+        return {"session_id": "second-client-session"}
+
+    assert await store.run("k1", "fp", first, scope="10.0.0.1") == (await first(), False)
+    assert await store.run("k1", "fp", second, scope="10.0.0.2") == (await second(), False)
+    assert await store.run("k1", "fp", second, scope="10.0.0.1") == (await first(), True)
+
+
+@pytest.mark.asyncio
+async def test_full_store_never_evicts_a_pending_entry():
+    store = IdempotencyStore(max_entries=1)
+    calls = 0
+    release = asyncio.Event()
+
+    async def slow():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "slow"
+
+    async def fast():
+        return "fast"
+
+    original = asyncio.create_task(store.run("slow", "fp", slow))
+    await asyncio.sleep(0)
+    assert await store.run("fast", "fp", fast) == ("fast", False)
+    repeat = asyncio.create_task(store.run("slow", "fp", slow))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await original == ("slow", False)
+    assert await repeat == ("slow", True)
+    assert calls == 1
+    assert await store.run("another", "fp", fast) == ("fast", False)
+    assert store.stats()["entries"] == 1
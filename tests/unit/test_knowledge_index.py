@@ -0,0 +1,109 @@
+import pytest
+
+from src.botinho import knowledge_index
+from src.botinho.knowledge_index import (
+    SOURCE_DIGEST,
+    MappedKnowledgeMatcher,
+    build_index,
+    load_knowledge_matcher,
+    main,
+    source_digest,
+    write_index,
+)
+from src.botinho.services.knowledge_matcher import KnowledgeMatcher
+
+MESSAGES = [
+    "como resetar minha senha?",
+    "o wifi caiu de novo",
+    "qual o horário de trabalho",
+    "minha impressora travou",
+    "oi tudo bem",
+    "outlook lento demais",
+    "pc lento",
+    "política de home office",
+    "preciso de acesso a vpn",
+    "login bloqueado",
+    "openvpn nao conecta",
+    "aterro sanitário",
+    "esqueci as senhas",
+    "meu notebook travou",
+]
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    path = tmp_path / "knowledge.idx"
+    main(["build", "--output", str(path)])
+    return path
+
+
+def test_mapped_matcher_agrees_with_in_process_matcher(index_path):
+    mapped = MappedKnowledgeMatcher(index_path)
+    reference = KnowledgeMatcher()
+    try:
+        for message in MESSAGES:
+            assert mapped.detect_category(message) == reference.detect_category(message)
+            assert mapped.match(message) == reference.match(message)
+            assert getattr(mapped.match(message), "confidence", None) == getattr(
+                reference.match(message), "confidence", None
+            )
+    finally:
+        mapped.close()
+
+
+def test_mapped_matcher_matches_terms_inside_words_like_in_process_matcher(index_path):
+    mapped = MappedKnowledgeMatcher(index_path)
+    try:
+        assert mapped.match("openvpn nao conecta").topic == "vpn"
+        assert mapped.detect_category("openvpn nao conecta") == "procedimentos_ti"
+    finally:
+        mapped.close()
+
+
+def test_mapped_matcher_finds_overlapping_and_one_byte_terms(tmp_path):
+    category_keywords = {"alfa": {"a", "ab", "aba", "abc", "b c", "ç"}, "beta": {"abcd", "zz"}}
+    knowledge_base = {"alfa": {"a_b": "Texto A.", "ç_x": "Texto Ç."}, "beta": {"zz": "Texto Z."}}
+    synonyms = {"senha": {"q", "qa"}}
+    path = tmp_path / "custom.idx"
+    write_index(path, build_index(knowledge_base, category_keywords, synonyms))
+    mapped = MappedKnowledgeMatcher(path)
+    reference = KnowledgeMatcher(knowledge_base, category_keywords, synonyms)
+    try:
+        for message in ["abcd", "xabax", "b c", "bc", "çx", "zzz", "z", "qa", "q z", "d", ""]:
+            assert mapped.detect_category(message) == reference.detect_category(message)
+            assert mapped.match(message) == reference.match(message)
+            assert getattr(mapped.match(message), "confidence", None) == getattr(
+                reference.match(message), "confidence", None
+            )
+    finally:
+        mapped.close()
+
+
+def test_source_digest_stamp_matches_this_build():
+    assert source_digest() == SOURCE_DIGEST, (
+        "knowledge base changed: set SOURCE_DIGEST in knowledge_index.py to "
+        f"{source_digest().hex()!r}"
+    )
+
+
+def test_loader_checks_freshness_without_hashing_the_knowledge_base(index_path, monkeypatch):
+    def fail():
+        raise AssertionError("source_digest() called while opening the index")
+
+    monkeypatch.setattr(knowledge_index, "source_digest", fail)
+    matcher = load_knowledge_matcher(index_path)
+    try:
+        assert isinstance(matcher, MappedKnowledgeMatcher)
+    finally:
+        matcher.close()
+
+
+def test_loader_falls_back_for_missing_or_stale_index(tmp_path):
+    assert isinstance(load_knowledge_matcher(tmp_path / "missing.idx"), KnowledgeMatcher)
+
+    stale = tmp_path / "stale.idx"
+    write_index(stale, build_index(knowledge_base={"outra": {"tema": "Outro texto."}}))
+    assert isinstance(load_knowledge_matcher(stale), KnowledgeMatcher)
+
+    (tmp_path / "garbage.idx").write_bytes(b"not an index")
+    assert isinstance(load_knowledge_matcher(tmp_path / "garbage.idx"), KnowledgeMatcher)
@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+import pytest
+
+from src.botinho.load_shedding import LoadMonitor
+
+
+@pytest.mark.asyncio
+async def test_load_monitor_measures_blocked_event_loop():
+    monitor = LoadMonitor(interval=0.01, max_lag_ms=20, smoothing=1.0)
+    await monitor.start()
+    await asyncio.sleep(0.02)
+
+    time.sleep(0.1)
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+
+    assert monitor.max_observed_lag_ms >= 50
+    assert monitor.stats()["loop_lag_max_ms"] >= 50
+
+
+def test_load_monitor_flags_overload_by_in_flight_requests():
+    monitor = LoadMonitor(max_in_flight=2)
+
+    with monitor.track():
+        assert not monitor.overloaded()
+        with monitor.track():
+            assert monitor.overloaded()
+
+    assert monitor.in_flight == 0
+    assert not monitor.overloaded()
@@ -0,0 +1,51 @@
+import json
+import logging
+import queue
+
+from src.botinho.logging_config import DroppingQueueHandler, JsonFormatter, ThrottledLogger
+
+
+def test_throttled_logger_deduplicates_and_truncates(caplog):
+    throttled = ThrottledLogger(logging.getLogger("botinho.test"), interval=60.0, max_chars=20)
+    error = "429 RESOURCE_EXHAUSTED " + "x" * 500
+    key = ThrottledLogger.signature(error)
+
+    with caplog.at_level(logging.WARNING, logger="botinho.test"):
+        for _ in range(5):
+            throttled.warning(key, "Quota Gemini excedida.", error_text=error)
+
+    assert len(caplog.records) == 1
+    assert "caracteres" in caplog.records[0].getMessage()
+    assert len(caplog.records[0].getMessage()) < 100
+    assert throttled.suppressed_total == 4
+
+    throttled._seen[key][0] -= 61
+    with caplog.at_level(logging.WARNING, logger="botinho.test"):
+        throttled.warning(key, "Quota Gemini excedida.", error_text=error)
+    assert "4 ocorrências repetidas suprimidas" in caplog.records[-1].getMessage()
+
+
+def test_signature_groups_errors_differing_only_in_numbers():
+    first = ThrottledLogger.signature("Quota exceeded, retry in 12.5s")
+    second = ThrottledLogger.signature("Quota exceeded, retry in 48.1s")
+    assert first == second
+
+
+def test_queue_handler_drops_when_full_and_json_formats_records():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    logger = logging.getLogger("botinho.test.queue")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        logger.warning("primeiro %s", "registro")
+        logger.warning("segundo")
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+    assert handler.dropped == 1
+    record = handler.queue.get_nowait()
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["message"] == "primeiro registro"
+    assert payload["level"] == "WARNING"
+    assert payload["logger"] == "botinho.test.queue"
@@ -0,0 +1,59 @@
+import asyncio
+import marshal
+
+import pytest
+from starlette.datastructures import Headers
+
+from src.botinho.profiling import ProfilingMiddleware, RequestProfiler
+
+
+def _slow_keyword_scan() -> int:
+    return sum(len(str(index)) for index in range(20_000))
+
+
+async def _app(scope, receive, send):  # noqa: ANN001
+    await asyncio.sleep(0)
+    _slow_keyword_scan()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def test_profiler_requires_enabled_flag_and_matching_token():
+    disabled = RequestProfiler(enabled=False, token="segredo")
+    enabled = RequestProfiler(enabled=True, token="segredo")
+
+    assert not disabled.should_profile(Headers({"x-botinho-profile": "segredo"}))
+    assert not enabled.should_profile(Headers({"x-botinho-profile": "errado"}))
+    assert enabled.should_profile(Headers({"x-botinho-profile": "segredo"}))
+
+
+def test_profiler_rejects_non_ascii_token_header_instead_of_raising():
+    profiler = RequestProfiler(enabled=True, token="segredo")
+    raw = Headers(raw=[(b"x-botinho-profile", "segrédo".encode())])
+
+    assert not profiler.should_profile(raw)
+    assert not profiler.should_profile(Headers({"x-botinho-profile": "ségredo"}))
+    assert RequestProfiler(enabled=True, token="segrédo").should_profile(raw)
+
+
+@pytest.mark.asyncio
+async def test_profiling_middleware_stores_bounded_profiles_in_all_formats():
+    profiler = RequestProfiler(enabled=True, sample_rate=1.0, max_profiles=2)
+    middleware = ProfilingMiddleware(_app, profiler=profiler)
+    sent = []
+
+    async def send(message):  # noqa: ANN001
+        sent.append(message)
+
+    for _ in range(3):
+        await middleware({"type": "http", "path": "/api/chat", "headers": []}, None, send)
+
+    summaries = profiler.summaries()
+    assert len(summaries) == 2
+    profile_id = summaries[0]["profile_id"]
+    assert (b"x-botinho-profile-id", profile_id.encode()) in sent[-2]["headers"]
+
+    record = profiler.get(profile_id)
+    assert "_slow_keyword_scan" in record.render("collapsed").decode()
+    assert "_slow_keyword_scan" in record.render("text").decode()
+    assert isinstance(marshal.loads(record.render("pstats")), dict)
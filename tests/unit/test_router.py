@@ -0,0 +1,54 @@
+import pytest
+
+from src.botinho.services.router import ModelRouter, is_greeting
+
+
+def test_router_sends_simple_turns_to_light_model_with_smaller_budget():
+    router = ModelRouter(light_model="lite", max_words=8, max_history=2)
+
+    greeting = router.route("oi, tudo bem?", "conversa_geral", False, history_depth=0)
+    knowledge = router.route("como resetar a senha?", "procedimentos_ti", True, history_depth=1)
+    long_question = router.route(" ".join(["palavra"] * 20), "procedimentos_ti", True, 0)
+    deep_session = router.route("e agora?", "procedimentos_ti", True, history_depth=5)
+
+    assert (greeting.name, greeting.model) == ("greeting", "lite")
+    assert greeting.generation_overrides["max_output_tokens"] == 128
+    assert (knowledge.name, knowledge.model) == ("knowledge", "lite")
+    assert long_question.name == deep_session.name == "default"
+    assert long_question.model is None
+
+
+@pytest.mark.parametrize(
+    "message", ["oi", "Olá!", "bom dia", "oi, tudo bem?", "obrigado!", "valeu, até mais", "ok"]
+)
+def test_greetings_and_acknowledgements_take_the_greeting_route(message):
+    route = ModelRouter().route(message, "conversa_geral", False, history_depth=0)
+
+    assert is_greeting(message)
+    assert route.name == "greeting"
+
+
+@pytest.mark.parametrize(
+    "message",
+    ["explique o que é DNS", "oi, o que é phishing?", "qual a diferença entre RAM e SSD", "?"],
+)
+def test_short_small_talk_questions_keep_the_default_route(message):
+    route = ModelRouter().route(message, "conversa_geral", False, history_depth=0)
+
+    assert not is_greeting(message)
+    assert route.name == "default"
+    assert route.model is None
+    assert route.generation_overrides == {}
+
+
+def test_router_reports_decisions_and_latency_per_route():
+    router = ModelRouter()
+    route = router.route("oi", "conversa_geral", False, 0)
+    router.record(route, 0.2)
+    router.record(route, 0.4, ok=False)
+
+    stats = router.stats()["greeting"]
+    assert stats["decisions"] == 1
+    assert stats["errors"] == 1
+    assert stats["latency_p50_ms"] == 400.0
+    assert router.stats()["default"]["latency_p50_ms"] is None
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from src.botinho.services.scheduler import QuotaScheduler
+
+
+@pytest.mark.asyncio
+async def test_scheduler_interleaves_sessions_round_robin():
+    scheduler = QuotaScheduler(rpm_limits={"m": 1200}, burst_seconds=0.0, max_wait_seconds=5)
+    granted: list[str] = []
+
+    async def call(session_id: str) -> None:
+        await scheduler.acquire("m", session_id)
+        granted.append(session_id)
+
+    tasks = [asyncio.create_task(call("chatty")) for _ in range(4)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(call("quiet")))
+    await asyncio.gather(*tasks)
+
+    assert granted.index("quiet") <= 2
+    assert scheduler.stats()["m"]["granted"] == 5
+
+
+@pytest.mark.asyncio
+async def test_scheduler_sheds_when_expected_wait_exceeds_limit():
+    scheduler = QuotaScheduler(rpm_limits={"m": 6}, burst_seconds=0.0, max_wait_seconds=1.0)
+
+    first = await scheduler.acquire("m", "a")
+    second = await scheduler.acquire("m", "b")
+
+    assert first is True
+    assert second is False
+    assert scheduler.stats()["m"]["shed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_paces_token_budget():
+    scheduler = QuotaScheduler(
+        rpm_limits={"m": 6000}, tpm_limits={"m": 6000}, burst_seconds=1.0, max_wait_seconds=5
+    )
+
+    assert await scheduler.acquire("m", "a", tokens=100)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    assert await scheduler.acquire("m", "a", tokens=10)
+
+    assert loop.time() - started >= 0.05
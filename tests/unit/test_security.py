@@ -0,0 +1,29 @@
+from src.botinho.security import SlidingWindowRateLimiter
+
+
+def test_rate_limiter_forgets_idle_clients_and_caps_keys():
+    limiter = SlidingWindowRateLimiter(requests_limit=2, window_seconds=10, max_keys=3)
+
+    assert limiter.allow("a", now=100.0)
+    assert limiter.allow("a", now=101.0)
+    assert not limiter.allow("a", now=102.0)
+
+    for index, key in enumerate(("b", "c", "d")):
+        assert limiter.allow(key, now=103.0 + index)
+    assert len(limiter) == 3
+    assert "a" not in limiter._buckets
+
+    assert limiter.allow("e", now=200.0)
+    assert len(limiter) == 1
+
+
+def test_rate_limited_client_is_not_evicted_before_idle_ones():
+    limiter = SlidingWindowRateLimiter(requests_limit=1, window_seconds=60, max_keys=2)
+
+    assert limiter.allow("busy", now=100.0)
+    assert limiter.allow("idle", now=101.0)
+    assert not limiter.allow("busy", now=102.0)
+    assert limiter.allow("new", now=103.0)
+
+    assert "idle" not in limiter._buckets
+    assert not limiter.allow("busy", now=104.0)
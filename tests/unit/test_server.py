@@ -0,0 +1,81 @@
+from typing import IO
+
+import pytest
+
+from src.botinho import server
+from src.botinho.server import per_worker_path, uvicorn_options
+from src.botinho.services.scheduler import QuotaScheduler
+from src.botinho.settings import Settings
+
+
+def test_development_profile_is_single_reloading_process():
+    options = uvicorn_options(Settings(BOTINHO_ENV="development"))
+
+    assert options["reload"] is True
+    assert "workers" not in options
+
+
+def test_production_profile_uses_workers_and_limits_from_settings():
+    settings = Settings(
+        BOTINHO_ENV="production",
+        BOTINHO_SERVER_WORKERS=3,
+        BOTINHO_SERVER_BACKLOG=512,
+        BOTINHO_SERVER_LIMIT_CONCURRENCY=0,
+    )
+
+    options = uvicorn_options(settings)
+
+    assert options["workers"] == 3
+    assert options["backlog"] == 512
+    assert options["limit_concurrency"] is None
+    assert options["timeout_graceful_shutdown"] == settings.server_graceful_shutdown_seconds
+    assert options["loop"] in {"uvloop", "asyncio"}
+    assert options["http"] in {"httptools", "h11"}
+    assert "reload" not in options
+
+    auto = uvicorn_options(Settings(BOTINHO_ENV="production", BOTINHO_SERVER_WORKERS=0))
+    assert auto["workers"] >= 1
+
+
+def test_workers_get_their_own_files_and_quota_share(tmp_path):
+    path = tmp_path / "audit.jsonl"
+
+    assert per_worker_path(path, 1) == path
+    own = per_worker_path(path, 4)
+    assert own.parent == tmp_path
+    assert own != path
+    assert per_worker_path(path, 4) == own
+
+    scheduler = QuotaScheduler(rpm_limits={"m": 60}, workers=4)
+    assert scheduler._lane("m").request_rate == 15 / 60
+
+
+@pytest.mark.skipif(server.fcntl is None, reason="slot locks need fcntl")
+def test_restarted_worker_reuses_the_file_of_the_worker_it_replaces(tmp_path):
+    path = tmp_path / "audit.jsonl"
+
+    def other_worker() -> tuple[str, IO[bytes]]:
+        # Each claim opens its own lock file handle, which flock treats like another process.
+        name = per_worker_path(path, 4).name
+        _slot, handle = server._slot_locks.pop(path)
+        return name, handle
+
+    first, first_lock = other_worker()
+    second, second_lock = other_worker()
+    assert (first, second) == ("audit.0.jsonl", "audit.1.jsonl")
+
+    second_lock.close()
+    replacement, replacement_lock = other_worker()
+    assert replacement == "audit.1.jsonl"
+
+    first_lock.close()
+    replacement_lock.close()
+
+
+def test_worker_quota_shares_add_up_to_the_key_limit():
+    for workers in (1, 4, 7, 16, 32):
+        scheduler = QuotaScheduler(default_rpm=15, default_tpm=1_000_000, workers=workers)
+        lane = scheduler._lane("m")
+
+        assert lane.request_rate * 60 * workers == pytest.approx(15)
+        assert lane.token_rate * 60 * workers == pytest.approx(1_000_000)
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.botinho.tracing import (
+    NOOP_SPAN,
+    BatchSpanExporter,
+    Tracer,
+    TracingMiddleware,
+    parse_traceparent,
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+def test_parse_traceparent_validates_format_and_flags():
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") == (TRACE_ID, PARENT_ID, False)
+    assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+
+def test_tracer_returns_noop_span_when_disabled_or_unsampled():
+    assert Tracer(enabled=False).start_server_span("GET /", None) is NOOP_SPAN
+    assert Tracer(enabled=True, sample_rate=0.0).start_server_span("GET /", None) is NOOP_SPAN
+    unsampled = f"00-{TRACE_ID}-{PARENT_ID}-00"
+    assert Tracer(enabled=True, sample_rate=1.0).start_server_span("x", unsampled) is NOOP_SPAN
+    assert Tracer(enabled=True).span("orphan") is NOOP_SPAN
+
+
+@pytest.mark.asyncio
+async def test_spans_continue_incoming_trace_and_export_otlp_json(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(BatchSpanExporter(file_path=path), enabled=True, sample_rate=0.0)
+
+    with tracer.start_server_span("POST /api/chat", f"00-{TRACE_ID}-{PARENT_ID}-01") as root:
+        with tracer.span("gemini.attempt", {"gen_ai.request.model": "m1"}) as child:
+            child.add_event("gemini.model_switch", {"from": "m1", "to": "m2"})
+    await tracer.exporter.flush()
+
+    document = json.loads(path.read_text("utf-8"))
+    spans = document["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    by_name = {span["name"]: span for span in spans}
+    assert by_name["POST /api/chat"]["traceId"] == TRACE_ID
+    assert by_name["POST /api/chat"]["parentSpanId"] == PARENT_ID
+    assert by_name["gemini.attempt"]["parentSpanId"] == root.span_id
+    assert by_name["gemini.attempt"]["events"][0]["name"] == "gemini.model_switch"
+    assert tracer.stats()["exported"] == 2
+
+
+def test_tracing_middleware_returns_traceparent_header():
+    tracer = Tracer(enabled=True, sample_rate=1.0)
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        with tracer.span("inner"):
+            return {"ok": True}
+
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+    response = TestClient(app).get(
+        "/api/ping", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+    )
+
+    returned = parse_traceparent(response.headers["traceparent"])
+    assert returned is not None and returned[0] == TRACE_ID
+    assert [span.name for span in tracer.exporter._pending] == ["inner", "GET /api/ping"]